@@ -1,16 +1,30 @@
-import io, os, json
+import io, os, json, re
 
 class AdvHandle:
     """Handle intensifying adverbs"""
 
     loc_words = []
     loc_types = []
+    loc_form = {}       # Index: form -> (type, column)
+    loc_col = {}        # Index: column -> form
+    loc_columns = {}    # Ordered count keys per method: "full", "compact"
+    loc_typecol = {}    # Index: type -> column in the "compact" method
+    loc_trie = {}       # Token trie for single- and multi-word forms
+    loc_first = frozenset()     # First tokens of the forms: every hit starts with one
     errHandle = None
+    reNalpha = re.compile(r"[^\w]")
 
     # ======================= CLASS INITIALIZER ========================================
     def __init__(self, oErr):
         # Initialize a local array of word-elements
         self.loc_words = []
+        self.loc_types = []
+        self.loc_form = {}
+        self.loc_col = {}
+        self.loc_columns = {"full": [], "compact": []}
+        self.loc_typecol = {}
+        self.loc_trie = {}
+        self.loc_first = frozenset()
         self.errHandle = oErr
 
     def Load(self, fThis):
@@ -37,6 +51,8 @@ class AdvHandle:
                     # Check if this type is already in our list
                     if not sType in self.loc_types:
                         self.loc_types.append(sType)
+                # Compile the lookup index
+                self.compileIndex()
                 # Return okay
                 return True
             # Getting here means something went wrong
@@ -46,47 +62,111 @@ class AdvHandle:
             self.errHandle.DoError("advHandle/load")
             return False
 
+    def compileIndex(self):
+        """Build the dictionaries that make lookups independent of the lexicon size"""
+
+        self.loc_form = {}
+        self.loc_col = {}
+        self.loc_trie = {}
+        lFull = []
+        for w in self.loc_words:
+            sForm = w['wform']
+            # The first occurrence of a form wins, just like the former list scan
+            if sForm not in self.loc_form:
+                self.loc_form[sForm] = (w['wtype'], w['col'])
+            self.loc_col[w['col']] = sForm
+            lFull.append(sForm)
+            # Add the form to the trie, tokenized the same way ntk tokenizes text
+            lTokens = [t.lower() for t in re.sub(self.reNalpha, " ", sForm).split()]
+            if len(lTokens) > 0:
+                oNode = self.loc_trie
+                for sToken in lTokens:
+                    oNode = oNode.setdefault(sToken, {})
+                # The key None marks the end of a form: (form, type, column)
+                if None not in oNode:
+                    oNode[None] = (sForm, w['wtype'], w['col'])
+        # Column order is the order of the JSON file (full) or of the types (compact)
+        self.loc_columns = {"full": lFull, "compact": list(self.loc_types)}
+        self.loc_typecol = {sType: iCol for iCol, sType in enumerate(self.loc_types)}
+        self.loc_first = frozenset(self.loc_trie)
+
     def getCol(self, sWrd):
         """ get the column where this word belongs"""
-        sWrd = sWrd.lower()
-        for w in self.loc_words:
-            if w['wform'] == sWrd:
-                return w['col']
-        # Otherwise return empty
-        return 0
+        oFound = self.loc_form.get(sWrd.lower())
+        if oFound is None:
+            # Otherwise return empty
+            return 0
+        return oFound[1]
 
     def getWord(self, iCol):
         """ get the word belonging to this column"""
-        for w in self.loc_words:
-            if w['col'] == iCol:
-                return w['wform']
         # Otherwise return empty
-        return ""
+        return self.loc_col.get(iCol, "")
 
     def getType(self, sWrd):
         """get the adverb type for this word"""
-        sWrd = sWrd.lower()
-        for w in self.loc_words:
-            if w['wform'] == sWrd:
-                return w['wtype']
-        # Otherwise return empty
-        return ""
+        oFound = self.loc_form.get(sWrd.lower())
+        if oFound is None:
+            # Otherwise return empty
+            return ""
+        return oFound[0]
+
+    def scan(self, lTokens):
+        """Find the single- and multi-word forms in the lowercase token list [lTokens]
+
+        Returns a list of (start, end, form, type, column) tuples. Matching is
+        leftmost-longest and hits do not overlap, so "heel erg" is one hit
+        when the lexicon has it, and two hits ("heel", "erg") when it has not.
+        """
+
+        lHits = []
+        oRoot = self.loc_trie
+        iLen = len(lTokens)
+        i = 0
+        while i < iLen:
+            oNode = oRoot.get(lTokens[i])
+            if oNode is None:
+                i += 1
+                continue
+            # Follow the trie as far as the tokens allow, remembering the last complete form
+            oFound = oNode.get(None)
+            iEnd = i + 1
+            j = i + 1
+            while j < iLen:
+                oNode = oNode.get(lTokens[j])
+                if oNode is None:
+                    break
+                j += 1
+                if None in oNode:
+                    oFound = oNode[None]
+                    iEnd = j
+            if oFound is None:
+                i += 1
+            else:
+                lHits.append((i, iEnd, oFound[0], oFound[1], oFound[2]))
+                i = iEnd
+        return lHits
+
+    def hasCandidate(self, lTokens):
+        """Check whether any of the lowercase tokens [lTokens] can start a form
+
+        A paragraph without such a token has no hit in any of its sentences.
+        """
+        return not self.loc_first.isdisjoint(lTokens)
+
+    def getTypeCol(self, sType):
+        """get the "compact" column of this adverb type"""
+        return self.loc_typecol.get(sType, 0)
+
+    def getColumns(self, sMethod):
+        """Get the ordered list of count keys for method [sMethod]"""
+        return self.loc_columns.get(sMethod, [])
 
     def getTypeCountObject(self, sMethod):
         """Create a new object to count the types defined in [loc_words]"""
 
-        oNew = {}
-        for w in self.loc_words:
-            if sMethod == "full":
-                sWord = w['wform']
-                oNew[sWord] = 0
-            elif sMethod == "compact":
-                wtype = w['wtype']
-                if wtype not in oNew:
-                    oNew[wtype] = 0
-
-        # Return the result
-        return oNew
+        # The keys are precomputed, so this no longer walks [loc_words]
+        return dict.fromkeys(self.getColumns(sMethod), 0)
 
     def addTypes(self, lstThis, sMethod):
         """Add the types we have to the list [lstThis]"""
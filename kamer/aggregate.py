@@ -0,0 +1,241 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    aggregate
+# Goal :    Totals of the intensifier counts and sentiment per party, year and/or speaker,
+#           accumulated in NumPy arrays without making a row per sentence
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import io, csv, importlib.util
+
+# ============================= LOCAL VARIABLES ====================================
+# Group name -> (attribute of a speaker turn record, column name in the output)
+oGroups = {"party":   ("partij",   "Partij"),
+           "year":    ("jaar_van", "Jaar_start"),
+           "speaker": ("aanspr",   "Aanspreek")}
+lTotals = ["Sentences", "Hit_sentences", "Hit_rate", "Polarity_n", "Polarity_sum", "Polarity_mean",
+           "Subjectivity_n", "Subjectivity_sum", "Subjectivity_mean"]
+iChunk = 65536          # Number of utterances collected before they are added to the arrays
+np = None               # The numpy module, once it has been loaded
+
+# ----------------------------------------------------------------------------------
+# Name :    check_groups
+# Goal :    Return an error message if [sGroups] cannot be aggregated on, otherwise ""
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def check_groups(sGroups):
+    lGroups = sGroups.split(",")
+    for sGroup in lGroups:
+        if not sGroup in oGroups:
+            return "Unknown aggregate group: " + sGroup + " (choose from " + ", ".join(oGroups) + ")"
+    if len(set(lGroups)) != len(lGroups):
+        return "Aggregate groups occur twice: " + sGroups
+    if importlib.util.find_spec("numpy") == None:
+        return "Aggregate mode needs the python package numpy"
+    return ""
+
+# ----------------------------------------------------------------------------------
+# Name :    Aggregator
+# Goal :    Group keys are interned to consecutive ids; the ids index the rows of the
+#           arrays, the lexicon columns index the columns of the count array
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Aggregator:
+    """Aggregated counts per group"""
+
+    def __init__(self, lGroups, lColumns):
+        global np
+        if np is None:
+            import numpy
+            np = numpy
+        self.groups = list(lGroups)
+        self.columns = list(lColumns)
+        self.attributes = [oGroups[sGroup][0] for sGroup in self.groups]
+        self.ids = {}           # Group key -> id
+        self.keys = []          # Id -> group key
+        self.size = 0           # Number of rows the arrays have room for
+        self.counts = np.zeros((0, len(self.columns)), np.int64)
+        self.sentences = np.zeros(0, np.int64)
+        self.hits = np.zeros(0, np.int64)
+        self.polar_n = np.zeros(0, np.int64)
+        self.polar_sum = np.zeros(0, np.float64)
+        self.subj_n = np.zeros(0, np.int64)
+        self.subj_sum = np.zeros(0, np.float64)
+        self.reserve(64)
+
+    def reserve(self, iSize):
+        """Make sure the arrays have room for [iSize] groups"""
+
+        if iSize <= self.size:
+            return
+        iNew = max(iSize, 2 * self.size)
+        def grow(arThis):
+            arNew = np.zeros((iNew,) + arThis.shape[1:], arThis.dtype)
+            arNew[:len(arThis)] = arThis
+            return arNew
+        self.counts = grow(self.counts)
+        self.sentences = grow(self.sentences)
+        self.hits = grow(self.hits)
+        self.polar_n = grow(self.polar_n)
+        self.polar_sum = grow(self.polar_sum)
+        self.subj_n = grow(self.subj_n)
+        self.subj_sum = grow(self.subj_sum)
+        self.size = iNew
+
+    def getId(self, tKey):
+        """Get the id of group [tKey], adding the group if it is new"""
+
+        iId = self.ids.get(tKey)
+        if iId is None:
+            iId = len(self.keys)
+            self.ids[tKey] = iId
+            self.keys.append(tKey)
+        return iId
+
+    def add_utterances(self, oUtts):
+        """Add the utterances of [oUtts] (e.g. ntk.iterUtterances) to the totals"""
+
+        lAttr = self.attributes
+        getId = self.getId
+        # The sentences of a speaker turn share one turn record: its group id is looked up once
+        oTurnIds = {}
+        lIds = []
+        lHitIds = []
+        lCntIds = []
+        lCntCols = []
+        lCntN = []
+        lPolIds = []
+        lPol = []
+        lSubjIds = []
+        lSubj = []
+        try:
+            for oUtt in oUtts:
+                oTurn = oUtt.turn
+                iId = oTurnIds.get(oTurn)
+                if iId is None:
+                    # An empty speaker or party is the same as a missing one, as in the CSV output
+                    iId = oTurnIds[oTurn] = getId(tuple(getattr(oTurn, sAttr) or "" for sAttr in lAttr))
+                lIds.append(iId)
+                if len(oUtt.count) > 0:
+                    lHitIds.append(iId)
+                    for iCol, iCount in oUtt.count:
+                        lCntIds.append(iId)
+                        lCntCols.append(iCol)
+                        lCntN.append(iCount)
+                if oUtt.polar is not None:
+                    lPolIds.append(iId)
+                    lPol.append(oUtt.polar)
+                if oUtt.subj is not None:
+                    lSubjIds.append(iId)
+                    lSubj.append(oUtt.subj)
+                if len(lIds) >= iChunk:
+                    self.add_arrays(lIds, lHitIds, lCntIds, lCntCols, lCntN, lPolIds, lPol, lSubjIds, lSubj)
+                    lIds, lHitIds, lCntIds, lCntCols, lCntN, lPolIds, lPol, lSubjIds, lSubj = [], [], [], [], [], [], [], [], []
+        finally:
+            # When [oUtts] fails halfway, the utterances it gave so far are kept
+            self.add_arrays(lIds, lHitIds, lCntIds, lCntCols, lCntN, lPolIds, lPol, lSubjIds, lSubj)
+
+    def add_arrays(self, lIds, lHitIds, lCntIds, lCntCols, lCntN, lPolIds, lPol, lSubjIds, lSubj):
+        """Add one chunk of collected utterances with a few vectorized operations"""
+
+        iGroups = len(self.keys)
+        self.reserve(iGroups)
+        if len(lIds) > 0:
+            self.sentences[:iGroups] += np.bincount(lIds, minlength=iGroups)
+        if len(lHitIds) > 0:
+            self.hits[:iGroups] += np.bincount(lHitIds, minlength=iGroups)
+        if len(lCntIds) > 0:
+            np.add.at(self.counts, (np.array(lCntIds), np.array(lCntCols)), np.array(lCntN, np.int64))
+        if len(lPolIds) > 0:
+            self.polar_n[:iGroups] += np.bincount(lPolIds, minlength=iGroups)
+            self.polar_sum[:iGroups] += np.bincount(lPolIds, weights=lPol, minlength=iGroups)
+        if len(lSubjIds) > 0:
+            self.subj_n[:iGroups] += np.bincount(lSubjIds, minlength=iGroups)
+            self.subj_sum[:iGroups] += np.bincount(lSubjIds, weights=lSubj, minlength=iGroups)
+
+    def merge(self, oOther):
+        """Add the totals of another aggregator with the same groups and columns"""
+
+        if oOther.groups != self.groups or oOther.columns != self.columns:
+            raise ValueError("Aggregates with different groups or columns cannot be merged")
+        iOther = len(oOther.keys)
+        if iOther == 0:
+            return
+        # Row i of [oOther] is row arMap[i] here; the ids are unique, so += is safe
+        arMap = np.array([self.getId(tKey) for tKey in oOther.keys])
+        self.reserve(len(self.keys))
+        self.counts[arMap] += oOther.counts[:iOther]
+        self.sentences[arMap] += oOther.sentences[:iOther]
+        self.hits[arMap] += oOther.hits[:iOther]
+        self.polar_n[arMap] += oOther.polar_n[:iOther]
+        self.polar_sum[arMap] += oOther.polar_sum[:iOther]
+        self.subj_n[arMap] += oOther.subj_n[:iOther]
+        self.subj_sum[arMap] += oOther.subj_sum[:iOther]
+
+    def getFields(self):
+        """Get the header of the table"""
+        return [oGroups[sGroup][1] for sGroup in self.groups] + lTotals + self.columns
+
+    def iterRows(self):
+        """Yield the rows of the table, sorted on the group keys"""
+
+        for iId in sorted(range(len(self.keys)), key=lambda iId: self.keys[iId]):
+            iSent = int(self.sentences[iId])
+            iHits = int(self.hits[iId])
+            iPol = int(self.polar_n[iId])
+            iSubj = int(self.subj_n[iId])
+            fPol = float(self.polar_sum[iId])
+            fSubj = float(self.subj_sum[iId])
+            yield list(self.keys[iId]) + \
+                  [iSent, iHits, iHits / iSent if iSent > 0 else "",
+                   iPol, fPol, fPol / iPol if iPol > 0 else "",
+                   iSubj, fSubj, fSubj / iSubj if iSubj > 0 else ""] + \
+                  self.counts[iId].tolist()
+
+    def write(self, flOutput):
+        """Write the table as tab-separated text"""
+
+        with io.open(flOutput, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, csv.excel_tab, lineterminator="\n")
+            writer.writerow(self.getFields())
+            writer.writerows(self.iterRows())
+        return len(self.keys)
+
+# ----------------------------------------------------------------------------------
+# Name :    read_table
+# Goal :    Load a table written by Aggregator.write, so that it can be merged
+#           Only the sums are read: rates and means are computed again
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def read_table(flInput):
+    with io.open(flInput, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f, csv.excel_tab)
+        lHeader = next(reader)
+        oNames = {oGroups[sGroup][1]: sGroup for sGroup in oGroups}
+        lGroups = []
+        for sName in lHeader:
+            if not sName in oNames:
+                break
+            lGroups.append(oNames[sName])
+        iGroups = len(lGroups)
+        if lHeader[iGroups:iGroups + len(lTotals)] != lTotals:
+            raise ValueError("Not an aggregate table: " + flInput)
+        iBase = iGroups + len(lTotals)
+        oAgg = Aggregator(lGroups, lHeader[iBase:])
+        lRows = list(reader)
+        oAgg.reserve(len(lRows))
+        for row in lRows:
+            iId = oAgg.getId(tuple(row[:iGroups]))
+            lTot = row[iGroups:iBase]
+            oAgg.sentences[iId] += int(lTot[0])
+            oAgg.hits[iId] += int(lTot[1])
+            oAgg.polar_n[iId] += int(lTot[3])
+            oAgg.polar_sum[iId] += float(lTot[4])
+            oAgg.subj_n[iId] += int(lTot[6])
+            oAgg.subj_sum[iId] += float(lTot[7])
+            oAgg.counts[iId] += np.array([int(x) for x in row[iBase:]], np.int64)
+    return oAgg
@@ -0,0 +1,958 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    bench
+# Goal :    Micro-benchmarks for the kamer intensifier pipeline
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import sys, getopt, time, timeit, random, tracemalloc, tempfile, os, subprocess, shutil, json, platform, gc
+import xml.etree.ElementTree as ET
+import util, advhandle, ntk, segment, sentiana, corpus, speakers, dedup
+
+# ============================= LOCAL VARIABLES ====================================
+errHandle = util.ErrHandle()
+lSizes = [50, 500, 5000]
+sSentiment = "off"      # Sentiment backend of the stage and end-to-end benchmarks (-e)
+fTolerance = 10.0       # Percentage a metric may get worse before it counts as a regression (-t)
+iRepeat = 3             # The stage and end-to-end timings are the best of this many runs (-r)
+
+# ----------------------------------------------------------------------------------
+# Name :    make_lexicon
+# Goal :    Create an AdvHandle with [iSize] synthetic forms, spread over a few types
+#           Every [iMulti]-th form consists of two tokens
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def make_lexicon(iSize, iTypes = 5, iMulti = 0):
+    oAdv = advhandle.AdvHandle(errHandle)
+    iCol = 0
+    for iForm in range(iSize):
+        sType = "type" + str(iForm % iTypes)
+        sForm = "w" + str(iForm)
+        # Every [iMulti]-th form is a multi-word form
+        if iMulti > 0 and iForm % iMulti == 0:
+            sForm = "m" + str(iForm) + " w" + str(iForm)
+        oAdv.loc_words.append({"wtype": sType, "wform": sForm, "col": iCol})
+        iCol += 1
+        if not sType in oAdv.loc_types:
+            oAdv.loc_types.append(sType)
+    oAdv.compileIndex()
+    return oAdv
+
+# ----------------------------------------------------------------------------------
+# Name :    scan_type
+# Goal :    Reference implementation: the linear list scan AdvHandle used before
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def scan_type(oAdv, sWrd):
+    sWrd = sWrd.lower()
+    for w in oAdv.loc_words:
+        if w['wform'] == sWrd:
+            return w['wtype']
+    return ""
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_lexicon
+# Goal :    Compare getType lookups against the linear scan for several lexicon sizes
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_lexicon(iTokens = 20000):
+    oRnd = random.Random(1)
+    for iSize in lSizes:
+        oAdv = make_lexicon(iSize)
+        # About one token in ten is a hit, the rest is ordinary text
+        lTokens = []
+        for i in range(iTokens):
+            if oRnd.random() < 0.1:
+                lTokens.append("w" + str(oRnd.randrange(iSize)))
+            else:
+                lTokens.append("tok" + str(i))
+        # The linear scan gets fewer tokens, otherwise the big lexicons take minutes
+        lScan = lTokens[:max(200, iTokens * 50 // iSize)]
+        fScan = timeit.timeit(lambda: [scan_type(oAdv, t) for t in lScan], number=1)
+        fIndex = timeit.timeit(lambda: [oAdv.getType(t) for t in lTokens], number=1)
+        fScanRate = len(lScan) / fScan
+        fIndexRate = len(lTokens) / fIndex
+        print("lexicon %5d forms: scan %12.0f tok/s   index %12.0f tok/s   speed-up %8.1fx" %
+              (iSize, fScanRate, fIndexRate, fIndexRate / fScanRate))
+    return True
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_trie
+# Goal :    Show that scanning a sentence costs the same, whatever the lexicon size
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_trie(iSentences = 20000, iWords = 20):
+    oRnd = random.Random(2)
+    for iSize in lSizes:
+        oAdv = make_lexicon(iSize, iMulti = 4)
+        lSentences = []
+        for i in range(iSentences):
+            lTokens = []
+            for j in range(iWords):
+                fChance = oRnd.random()
+                iForm = oRnd.randrange(iSize)
+                if fChance < 0.05:
+                    lTokens.extend(["m" + str(iForm), "w" + str(iForm)])
+                elif fChance < 0.1:
+                    lTokens.append("w" + str(iForm))
+                else:
+                    lTokens.append("tok" + str(j))
+            lSentences.append(lTokens)
+        iHits = 0
+        fStart = timeit.default_timer()
+        for lTokens in lSentences:
+            iHits += len(oAdv.scan(lTokens))
+        fTime = timeit.default_timer() - fStart
+        print("lexicon %5d forms: %8.2f us/sentence   %10.0f sentences/s   %d hits" %
+              (iSize, 1000000 * fTime / iSentences, iSentences / fTime, iHits))
+    return True
+
+# ----------------------------------------------------------------------------------
+# Name :    make_session
+# Goal :    Write a synthetic type A (handeling) document with [iTurns] speaker turns
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def make_session(flOut, iTurns, iParagraphs = 5, iSentences = 4):
+    oRnd = random.Random(3)
+    lWords = ["de", "minister", "is", "heel", "erg", "zeer", "het", "kabinet", "voorstel", "wat"]
+    with open(flOut, "w", encoding="utf8") as f:
+        f.write("Preamble that is not XML\n")
+        f.write("<handeling><frontm><vergjaar>2010-2011</vergjaar></frontm><part><item>\n")
+        for iTurn in range(iTurns):
+            f.write("<spreker><wie><aanspr>Spreker " + str(iTurn % 50) + "</aanspr>")
+            f.write("<partij>Partij " + str(iTurn % 7) + "</partij></wie>\n")
+            for iPar in range(iParagraphs):
+                lSent = []
+                for iSent in range(iSentences):
+                    lSent.append(" ".join(oRnd.choice(lWords) for i in range(12)))
+                f.write("<al>" + ".\n".join(lSent) + ".</al>\n")
+            f.write("</spreker>\n")
+        f.write("</item></part></handeling>\n")
+
+# ----------------------------------------------------------------------------------
+# Name :    peak_memory
+# Goal :    Run [fn] and return (result, seconds, peak traced memory in MB)
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def peak_memory(fn, *args):
+    tracemalloc.start()
+    fStart = timeit.default_timer()
+    oResult = fn(*args)
+    fTime = timeit.default_timer() - fStart
+    iCurrent, iPeak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return oResult, fTime, iPeak / (1024 * 1024)
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_load
+# Goal :    Compare peak memory of the tree loader and the streaming pipeline
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_load(lTurns = [1000, 10000]):
+    oAdv = make_lexicon(50)
+    sDir = tempfile.mkdtemp()
+    for sLines in ["hit", "all"]:
+        # With 'hit' nothing matches the synthetic lexicon, so only the loader uses memory
+        # tracemalloc only sees the memory of the standard library parser
+        oNtk = ntk.ntk(errHandle, "compact", sLines, sXml = "etree")
+        # Sentiment is not what we measure here
+        oNtk.snt.get_analysis_batch = lambda lSent: [(0.0, 0.0)] * len(lSent)
+        for iTurns in lTurns:
+            flThis = os.path.join(sDir, "session" + str(iTurns) + ".xml")
+            make_session(flThis, iTurns)
+            fSize = os.path.getsize(flThis) / (1024 * 1024)
+            lTree, fTree, fTreePeak = peak_memory(
+                lambda: oNtk.getUtteranceList(oNtk.load(flThis), flThis, oAdv))
+            # The streamed utterances are consumed, like the CSV writer does
+            iStream, fStream, fStreamPeak = peak_memory(
+                lambda: sum(1 for oUtt in oNtk.iterUtterances(flThis, oAdv)))
+            print("lines %-3s file %7.1f MB: tree %6.2fs peak %7.1f MB   stream %6.2fs peak %7.1f MB" %
+                  (sLines, fSize, fTree, fTreePeak, fStream, fStreamPeak))
+            os.remove(flThis)
+    os.rmdir(sDir)
+    return True
+
+# ----------------------------------------------------------------------------------
+# Name :    load_text
+# Goal :    Reference implementation: ntk.load as it was before the byte-level reader
+#           Decode the whole file, split it in lines, join them again and parse the text
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def load_text(flInput):
+    with open(flInput, encoding="utf8") as f:
+        lLine = f.readlines()
+    for i in range(len(lLine)):
+        if "<" in lLine[i][0:2]:
+            lLine = lLine[i:]
+            break
+    return ET.fromstring("".join(lLine))
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_reader
+# Goal :    Compare the memory-mapped byte reader of ntk.load with the text reader it
+#           replaced, on many small type A and type B files
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_reader(iFiles = 400, iTurns = 20):
+    oMetrics = {}
+    sDir = tempfile.mkdtemp()
+    try:
+        flAdverb, lFiles = corpus.make_corpus(sDir, iFiles, iTurns)
+        fSize = sum(os.path.getsize(flThis) for flThis in lFiles) / (1024 * 1024)
+        oNtk = ntk.ntk(errHandle, "full", "all", "off", "etree")
+        lText, fText = best_time(lambda: [load_text(flThis) for flThis in lFiles])
+        lMap, fMap = best_time(lambda: [oNtk.load(flThis) for flThis in lFiles])
+        oMetrics['text_files_per_s'] = iFiles / fText
+        oMetrics['mmap_files_per_s'] = iFiles / fMap
+        print("text reader %9.1f files/s %8.1f MB/s" % (iFiles / fText, fSize / fText))
+        print("mmap reader %9.1f files/s %8.1f MB/s" % (iFiles / fMap, fSize / fMap))
+        if any(ET.tostring(elText) != ET.tostring(elMap) for elText, elMap in zip(lText, lMap)):
+            print("The readers give DIFFERENT trees")
+            return False
+    finally:
+        shutil.rmtree(sDir)
+    return oMetrics
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_xml
+# Goal :    Compare the etree and lxml backends on type A and type B documents, and
+#           check that both give exactly the same utterances (also via ntk.load)
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_xml(iFiles = 4, iTurns = 500):
+    if ntk.check_xml("lxml") != "":
+        print("lxml is not installed: nothing to compare")
+        return {}
+    oMetrics = {}
+    bSame = True
+    sDir = tempfile.mkdtemp()
+    try:
+        for sXmlType in ["a", "b"]:
+            flAdverb, lFiles = corpus.make_corpus(os.path.join(sDir, sXmlType), iFiles, iTurns, sTypes = sXmlType)
+            oAdv = advhandle.AdvHandle(errHandle)
+            oAdv.Load(flAdverb)
+            oResults = {}
+            for sXml in ["etree", "lxml"]:
+                oNtk = ntk.ntk(errHandle, "full", "all", "off", sXml)
+                # The parser only: speaker turns
+                iTurnsFound, fParse = best_time(lambda: sum(1 for flThis in lFiles for oTurn in oNtk.iterTurns(flThis)))
+                # The whole extraction
+                iSent, fUtt = best_time(lambda: sum(1 for flThis in lFiles for oUtt in oNtk.iterUtterances(flThis, oAdv)))
+                oMetrics[sXml + "_" + sXmlType + "_turns_per_s"] = iTurnsFound / fParse
+                oMetrics[sXml + "_" + sXmlType + "_sentences_per_s"] = iSent / fUtt
+                print("type %s %-5s parse %9.0f turns/s   extract %9.0f sentences/s" %
+                      (sXmlType, sXml, iTurnsFound / fParse, iSent / fUtt))
+                # What the comparison looks at: everything that goes into an output row
+                oResults[sXml] = [[(oUtt.jaar_van, oUtt.jaar_tot, oUtt.aanspr, oUtt.partij, oUtt.s, oUtt.count)
+                                   for oUtt in oNtk.iterUtterances(flThis, oAdv)] +
+                                  [(oUtt.jaar_van, oUtt.jaar_tot, oUtt.aanspr, oUtt.partij, oUtt.s, oUtt.count)
+                                   for oUtt in oNtk.getUtteranceList(oNtk.load(flThis), flThis, oAdv)]
+                                  for flThis in lFiles]
+            if oResults["etree"] != oResults["lxml"]:
+                print("type %s: the backends give DIFFERENT utterances" % sXmlType)
+                bSame = False
+            print("type %s: lxml is %.2fx as fast in parsing, %.2fx in the whole extraction" %
+                  (sXmlType, oMetrics["lxml_" + sXmlType + "_turns_per_s"] / oMetrics["etree_" + sXmlType + "_turns_per_s"],
+                   oMetrics["lxml_" + sXmlType + "_sentences_per_s"] / oMetrics["etree_" + sXmlType + "_sentences_per_s"]))
+    finally:
+        shutil.rmtree(sDir)
+    return oMetrics if bSame else False
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_prefilter
+# Goal :    Sentences per second in "hit" mode with and without the paragraph prefilter,
+#           at a few intensifier densities, and check that both give the same utterances
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_prefilter(iFiles = 4, iTurns = 300, lDensity = [0.001, 0.005, 0.02]):
+    oMetrics = {}
+    bSame = True
+    sDir = tempfile.mkdtemp()
+    try:
+        for fDensity in lDensity:
+            flAdverb, lFiles = corpus.make_corpus(os.path.join(sDir, str(fDensity)), iFiles, iTurns,
+                                                  fDensity = fDensity)
+            oAdv = advhandle.AdvHandle(errHandle)
+            oAdv.Load(flAdverb)
+            sName = "density_" + str(fDensity)
+            oResults = {}
+            oTimes = {}
+            for bPrefilter in [False, True]:
+                oNtk = ntk.ntk(errHandle, "full", "hit", sSentiment, "etree", bPrefilter)
+                # Time the paragraph stage only: the documents are parsed beforehand
+                lAl = [elAl for flThis in lFiles for elAl in oNtk.load(flThis).iter("al")]
+                oNtk.adv = oAdv
+                oTurn = oNtk.turns.get("2010", "2011", "De heer Jansen", "VVD")
+                iSent, oTimes[bPrefilter] = best_time(lambda: sum(1 for elAl in lAl
+                                                                  for oUtt in oNtk.process_text(elAl, oTurn)))
+                oMetrics[sName + ("_prefilter" if bPrefilter else "_full") + "_paragraphs_per_s"] = \
+                    len(lAl) / oTimes[bPrefilter]
+                # What the comparison looks at: everything that goes into an output row
+                oNtk.checked = oNtk.skipped = 0
+                oResults[bPrefilter] = [[(oUtt.jaar_van, oUtt.jaar_tot, oUtt.aanspr, oUtt.partij, oUtt.s,
+                                          oUtt.polar, oUtt.subj, oUtt.count)
+                                         for oUtt in oNtk.iterUtterances(flThis, oAdv)] for flThis in lFiles]
+            fSkip = 100.0 * oNtk.skipped / max(oNtk.checked, 1)
+            oMetrics[sName + "_skip_rate"] = fSkip
+            print("density %.3f: %5.1f%% of the paragraphs skipped, %9.0f -> %9.0f paragraphs/s (%.2fx)" %
+                  (fDensity, fSkip, len(lAl) / oTimes[False], len(lAl) / oTimes[True], oTimes[False] / oTimes[True]))
+            if oResults[False] != oResults[True]:
+                print("density %.3f: the prefilter gives DIFFERENT utterances" % fDensity)
+                bSame = False
+    finally:
+        shutil.rmtree(sDir)
+    return oMetrics if bSame else False
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_dedup
+# Goal :    Sentences per second with and without the dedup table on a corpus where
+#           each document is printed [iCopies] times, and check that both give the same
+#           utterances
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_dedup(iFiles = 4, iTurns = 300, iCopies = 3):
+    oMetrics = {}
+    sDir = tempfile.mkdtemp()
+    try:
+        flAdverb, lFiles = corpus.make_corpus(os.path.join(sDir, "in"), iFiles, iTurns)
+        # The same session again, as another publication
+        for flThis in list(lFiles):
+            for iCopy in range(1, iCopies):
+                flCopy = flThis.replace(".xml", "-%d.xml" % iCopy)
+                shutil.copyfile(flThis, flCopy)
+                lFiles.append(flCopy)
+        oAdv = advhandle.AdvHandle(errHandle)
+        oAdv.Load(flAdverb)
+        oResults = {}
+        for iDedup in [0, dedup.iTableSize]:
+            sName = "dedup" if iDedup > 0 else "plain"
+            def run():
+                # A new handler (and table) per run: every run starts without memory
+                oRun = ntk.ntk(errHandle, "full", "all", sSentiment, "etree", True, iDedup)
+                return sum(1 for flThis in lFiles for oUtt in oRun.iterUtterances(flThis, oAdv))
+            iSent, fTime = best_time(run)
+            oMetrics[sName + "_sentences_per_s"] = iSent / fTime
+            oNtk = ntk.ntk(errHandle, "full", "all", sSentiment, "etree", True, iDedup)
+            oResults[sName] = [(oUtt.jaar_van, oUtt.jaar_tot, oUtt.aanspr, oUtt.partij, oUtt.s,
+                                oUtt.polar, oUtt.subj, oUtt.count)
+                               for flThis in lFiles for oUtt in oNtk.iterUtterances(flThis, oAdv)]
+            print("%-5s %9.0f sentences/s" % (sName, iSent / fTime))
+        oStats = oNtk.get_stats()
+        print("dedup: %d of %d sentences reused, %.2fx as fast" %
+              (oStats['reused'], oStats['reused'] + oStats['computed'],
+               oMetrics["dedup_sentences_per_s"] / oMetrics["plain_sentences_per_s"]))
+        if oResults["plain"] != oResults["dedup"]:
+            print("dedup gives DIFFERENT utterances")
+            return False
+    finally:
+        shutil.rmtree(sDir)
+    return oMetrics
+
+# ----------------------------------------------------------------------------------
+# Name :    allocations
+# Goal :    Build objects with [fn] and return (memory in MB, number of memory blocks)
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def allocations(fn):
+    tracemalloc.start()
+    oKeep = fn()
+    oSnapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    lStats = oSnapshot.statistics("filename")
+    iSize = sum(oStat.size for oStat in lStats)
+    iBlocks = sum(oStat.count for oStat in lStats)
+    return iSize / (1024 * 1024), iBlocks
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_records
+# Goal :    Memory of 100k utterances as dicts with count dicts vs. Utterance records
+#           The parser gives each speaker turn its own strings; a turn has [iTurn] sentences
+# History:
+# 18/oct/2026    ERK Created
+# 18/oct/2026    ERK Utterance records share the speaker turn record
+# ----------------------------------------------------------------------------------
+def bench_records(iSentences = 100000, iTurn = 20):
+    oRnd = random.Random(4)
+    for sMethod in ["compact", "full"]:
+        oAdv = make_lexicon(500)
+        iColumns = len(oAdv.getColumns(sMethod))
+        # One sentence in five has a single hit
+        lHits = [oRnd.randrange(iColumns) if oRnd.random() < 0.2 else -1 for i in range(iSentences)]
+
+        def turn_strings(i):
+            # New string objects, just like the text of the elements of a new turn
+            return ["".join(["20", "10"]), "".join(["20", "11"]), "".join(["De ", "heer ", corpus.lNames[i % 5]]),
+                    "".join(["VV", "D"])]
+
+        def make_dicts():
+            lUtt = []
+            lKeys = oAdv.getColumns(sMethod)
+            for i, iHit in enumerate(lHits):
+                if i % iTurn == 0:
+                    lTurn = turn_strings(i // iTurn)
+                oCount = oAdv.getTypeCountObject(sMethod)
+                if iHit >= 0:
+                    oCount[lKeys[iHit]] += 1
+                lUtt.append({'jaar_van': lTurn[0], 'jaar_tot': lTurn[1], 'aanspr': lTurn[2], 'partij': lTurn[3],
+                             's': "zin", 'polar': 0.0, 'subj': 0.0, 'count': oCount})
+            return lUtt
+
+        def make_records():
+            lUtt = []
+            oTurns = speakers.Turns()
+            for i, iHit in enumerate(lHits):
+                if i % iTurn == 0:
+                    oTurn = oTurns.get(*turn_strings(i // iTurn))
+                tCount = ((iHit, 1),) if iHit >= 0 else ()
+                lUtt.append(ntk.Utterance(oTurn, "zin", 0.0, 0.0, tCount))
+            return lUtt
+
+        fDict, iDict = allocations(make_dicts)
+        fRec, iRec = allocations(make_records)
+        print("%-7s per %d sentences: dict %8.1f MB %9d blocks   record %8.1f MB %9d blocks" %
+              (sMethod, iSentences, fDict, iDict, fRec, iRec))
+    return True
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_startup
+# Goal :    Time the startup of 'kamer.py -h' and of importing kamer in a fresh interpreter
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_startup(iRuns = 10):
+    sDir = os.path.dirname(os.path.abspath(__file__))
+    oCommands = {"python -c pass": [sys.executable, "-c", "pass"],
+                 "import kamer": [sys.executable, "-c",
+                                  "import sys, kamer; sys.exit('pattern' in sys.modules)"],
+                 "kamer.py -h": [sys.executable, "kamer.py", "-h"]}
+    for sName in oCommands:
+        lTimes = []
+        for i in range(iRuns):
+            fStart = timeit.default_timer()
+            oDone = subprocess.run(oCommands[sName], cwd=sDir, stdout=subprocess.DEVNULL)
+            lTimes.append(timeit.default_timer() - fStart)
+        lTimes.sort()
+        sNote = "" if oDone.returncode == 0 else "   (pattern was imported!)"
+        print("%-16s min %7.1f ms   median %7.1f ms%s" %
+              (sName, 1000 * lTimes[0], 1000 * lTimes[len(lTimes) // 2], sNote))
+    return True
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_segment
+# Goal :    Sentences per second of the former segmentation and the Segmenter paths
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_segment(iParagraphs = 20000):
+    oRnd = random.Random(5)
+    lWords = ["De", "minister", "is", "heel", "erg", "zeer", "het", "kabinet,", "voorstel", "(wat)", "2010-2011"]
+    lBreak = [". ", "? ", "! ", ".\n", ". "]
+    lParagraphs = []
+    for i in range(iParagraphs):
+        lParagraphs.append("".join(" ".join(oRnd.choice(lWords) for j in range(12)) + oRnd.choice(lBreak)
+                                   for k in range(4)))
+    iSentences = sum(len(segment.reference(sPar)) for sPar in lParagraphs)
+    oVariants = {"former": lambda sPar: segment.reference(sPar),
+                 "regex": lambda sPar: list(oRegex.segment(sPar)),
+                 "translate": lambda sPar: list(oTrans.segment(sPar))}
+    oRegex = segment.Segmenter(False)
+    oTrans = segment.Segmenter(True)
+    for sName in oVariants:
+        fn = oVariants[sName]
+        fTime = timeit.timeit(lambda: [fn(sPar) for sPar in lParagraphs], number=1)
+        print("%-10s %10.0f sentences/s" % (sName, iSentences / fTime))
+    return True
+
+# ----------------------------------------------------------------------------------
+# Name :    best_time
+# Goal :    Run [fn] [iRepeat] times and return (result, fastest time in seconds)
+#           The fastest run is the least disturbed by the rest of the machine
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def best_time(fn, *args):
+    fBest = None
+    for i in range(max(iRepeat, 1)):
+        # Like timeit: no garbage collection during the timed run
+        gc.collect()
+        gc.disable()
+        try:
+            fStart = timeit.default_timer()
+            oResult = fn(*args)
+            fTime = timeit.default_timer() - fStart
+        finally:
+            gc.enable()
+        if fBest == None or fTime < fBest:
+            fBest = fTime
+    return oResult, fBest
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_stages
+# Goal :    Speed of the separate stages on a synthetic corpus:
+#           ntk.load, ntk.process_text, AdvHandle.getType, SentiAna.get_analysis
+#           and the streaming file pipeline (with its peak memory)
+#           Returns the metrics, so that they can be compared with a baseline
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_stages(iFiles = 8, iTurns = 200):
+    oMetrics = {}
+    sDir = tempfile.mkdtemp()
+    try:
+        flAdverb, lFiles = corpus.make_corpus(sDir, iFiles, iTurns)
+        fSize = sum(os.path.getsize(flThis) for flThis in lFiles) / (1024 * 1024)
+        oAdv = advhandle.AdvHandle(errHandle)
+        oAdv.Load(flAdverb)
+        oNtk = ntk.ntk(errHandle, "full", "all", "off", "etree")
+        oNtk.adv = oAdv
+
+        # ntk.load: read and parse into a tree
+        oResult, fTime = best_time(lambda: [oNtk.load(flThis) for flThis in lFiles])
+        oMetrics['load_files_per_s'] = iFiles / fTime
+        print("ntk.load          %10.1f files/s   %8.1f MB/s" % (iFiles / fTime, fSize / fTime))
+
+        # ntk.process_text on all paragraphs of the corpus
+        lAl = []
+        for flThis in lFiles:
+            lAl.extend(oNtk.load(flThis).iter("al"))
+        oTurn = oNtk.getTurn(["2010", "2011"], "De heer", "VVD")
+        iSentences, fTime = best_time(lambda: sum(1 for elAl in lAl
+                                                  for oUtt in oNtk.process_text(elAl, oTurn)))
+        oMetrics['process_text_sentences_per_s'] = iSentences / fTime
+        print("ntk.process_text  %10.0f sentences/s (%d sentences)" % (iSentences / fTime, iSentences))
+
+        # AdvHandle.getType on all tokens of the corpus
+        oSeg = segment.Segmenter()
+        lTokens = [sTok for elAl in lAl for sText, lWords in oSeg.segment(elAl.text) for sTok in lWords]
+        oResult, fTime = best_time(lambda: [oAdv.getType(sTok) for sTok in lTokens])
+        oMetrics['gettype_tokens_per_s'] = len(lTokens) / fTime
+        print("AdvHandle.getType %10.0f tokens/s" % (len(lTokens) / fTime))
+
+        # SentiAna.get_analysis without cache, so that the backend itself is measured
+        oSnt = sentiana.SentiAna(errHandle, sSentiment, 0)
+        if sSentiment == "off":
+            print("SentiAna          skipped: sentiment is off (use -e)")
+        elif oSnt.check_backend():
+            lSent = [sText for elAl in lAl[:500] for sText, lWords in oSeg.segment(elAl.text)]
+            oResult, fTime = best_time(lambda: [oSnt.get_analysis(sText) for sText in lSent])
+            oMetrics['sentiment_sentences_per_s'] = len(lSent) / fTime
+            print("SentiAna (%s) %10.0f sentences/s" % (sSentiment, len(lSent) / fTime))
+        else:
+            print("SentiAna (%s)  skipped: backend not available" % sSentiment)
+
+        # The streaming pipeline: file -> utterances
+        def stream():
+            iCount = 0
+            for flThis in lFiles:
+                for oUtt in oNtk.iterUtterances(flThis, oAdv):
+                    iCount += 1
+            return iCount
+        iSentences, fTime = best_time(stream)
+        iSentences, fTraced, fPeak = peak_memory(stream)
+        oMetrics['stream_files_per_s'] = iFiles / fTime
+        oMetrics['stream_sentences_per_s'] = iSentences / fTime
+        oMetrics['stream_peak_mb'] = fPeak
+        print("ntk.iterUtterances %9.1f files/s   %8.0f sentences/s   peak %6.1f MB" %
+              (iFiles / fTime, iSentences / fTime, fPeak))
+    finally:
+        shutil.rmtree(sDir)
+    return oMetrics
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_end2end
+# Goal :    Speed and peak memory of a complete kamer.intensifiers run on a synthetic corpus
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_end2end(iFiles = 16, iTurns = 200):
+    # Only imported here: the other benchmarks do not need the command line module
+    import kamer
+    oMetrics = {}
+    sDir = tempfile.mkdtemp()
+    try:
+        flAdverb, lFiles = corpus.make_corpus(os.path.join(sDir, "in"), iFiles, iTurns)
+        flOutput = os.path.join(sDir, "out.csv")
+        oArgs = {'input': os.path.join(sDir, "in"), 'output': flOutput, 'adverb': flAdverb,
+                 'method': "full", 'lines': "all", 'scope': "line", 'jobs': 1, 'sentiment': sSentiment}
+        # The status lines of kamer are not part of the benchmark output
+        bOk, fTime = best_time(quiet, kamer.intensifiers, oArgs)
+        with open(flOutput, encoding="utf8") as f:
+            iSentences = sum(1 for sLine in f) - 1
+        bOk, fTraced, fPeak = peak_memory(quiet, kamer.intensifiers, oArgs)
+        oMetrics['files_per_s'] = iFiles / fTime
+        oMetrics['sentences_per_s'] = iSentences / fTime
+        oMetrics['peak_mb'] = fPeak
+        print("kamer.intensifiers %8.1f files/s   %8.0f sentences/s   peak %6.1f MB   (%d files, %d sentences%s)" %
+              (iFiles / fTime, iSentences / fTime, fPeak, iFiles, iSentences, "" if bOk else ", FAILED"))
+    finally:
+        shutil.rmtree(sDir)
+    return oMetrics
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_serve
+# Goal :    Latency of a small batch through a warm `kamer.py serve` (Unix socket) against
+#           a `kamer.py` subprocess per batch, and the throughput with [iClients] clients
+#           Also checks that the service gives the same rows as the batch run
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_serve(iRequests = 50, iClients = 4, iTurns = 20):
+    # Only imported here: the other benchmarks do not need it
+    import serve, csv, threading
+    oMetrics = {}
+    sDir = tempfile.mkdtemp()
+    sHere = os.path.dirname(os.path.abspath(__file__))
+    oServer = None
+    try:
+        flAdverb, lFiles = corpus.make_corpus(os.path.join(sDir, "in"), 1, iTurns)
+        flSocket = os.path.join(sDir, "kamer.sock")
+        flOutput = os.path.join(sDir, "out.csv")
+        lOptions = ["-a", flAdverb, "-m", "full", "-e", sSentiment]
+        # Cold: one process per batch, as the dashboards do now
+        lCommand = [sys.executable, "kamer.py", "-i", os.path.join(sDir, "in"), "-o", flOutput] + lOptions
+        lCold = []
+        for iRun in range(iRepeat):
+            fStart = timeit.default_timer()
+            subprocess.run(lCommand, cwd=sHere, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            lCold.append(timeit.default_timer() - fStart)
+        # Warm: the service is started once
+        oServer = subprocess.Popen([sys.executable, "kamer.py", "serve", "-u", flSocket, "-j", str(iClients)] + lOptions,
+                                   cwd=sHere, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        fStart = timeit.default_timer()
+        while not os.path.exists(flSocket):
+            if oServer.poll() != None or timeit.default_timer() - fStart > 60:
+                print("The service did not start")
+                return False
+            time.sleep(0.05)
+        oClient = serve.Client(flSocket = flSocket)
+        # Same rows as the batch run: compare them as text
+        with open(flOutput, encoding="utf8", newline="") as f:
+            lExpect = list(csv.reader(f, csv.excel_tab))
+        lRows = oClient.files(lFiles)
+        lFields = lExpect[0]
+        lGot = [["" if oRow[sField] == None else str(oRow[sField]) for sField in lFields] for oRow in lRows]
+        bSame = lGot == lExpect[1:]
+        if not bSame:
+            print("The service gives DIFFERENT rows than the batch run")
+        oTimes = {"files": [], "text": []}
+        lText = ["Dit is heel erg belangrijk. Wij zijn het er zeer mee eens!", "Dat is nauwelijks een antwoord."]
+        for iRequest in range(iRequests):
+            fStart = timeit.default_timer()
+            oClient.files(lFiles)
+            oTimes["files"].append(timeit.default_timer() - fStart)
+            fStart = timeit.default_timer()
+            oClient.text(lText, "2010-2011", "De heer Jansen", "VVD")
+            oTimes["text"].append(timeit.default_timer() - fStart)
+        oClient.close()
+        # Throughput: clients side by side, each with its own connection
+        def client_loop():
+            oThis = serve.Client(flSocket = flSocket)
+            for iRequest in range(iRequests):
+                oThis.files(lFiles)
+            oThis.close()
+        lThreads = [threading.Thread(target=client_loop) for iClient in range(iClients)]
+        fStart = timeit.default_timer()
+        for oThread in lThreads:
+            oThread.start()
+        for oThread in lThreads:
+            oThread.join()
+        fAll = timeit.default_timer() - fStart
+        fCold = min(lCold)
+        print("one file of %d sentences: subprocess %7.1f ms" % (len(lRows), 1000 * fCold))
+        for sName in ["files", "text"]:
+            lSorted = sorted(oTimes[sName])
+            fMedian = lSorted[len(lSorted) // 2]
+            oMetrics[sName + "_median_ms"] = 1000 * fMedian
+            print("warm /%-5s median %7.2f ms   p95 %7.2f ms   (%.0fx faster than a subprocess)" %
+                  (sName, 1000 * fMedian, 1000 * lSorted[int(0.95 * len(lSorted))], fCold / fMedian))
+        oMetrics['cold_ms'] = 1000 * fCold
+        oMetrics['requests_per_s'] = iClients * iRequests / fAll
+        print("%d clients: %7.1f requests/s" % (iClients, iClients * iRequests / fAll))
+    finally:
+        if oServer != None:
+            oServer.terminate()
+            oServer.wait()
+        shutil.rmtree(sDir)
+    return oMetrics if bSame else False
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_shards
+# Goal :    Run [iShards] shards of a corpus (--shard i/N) as separate processes on this
+#           machine and merge them; compare with one run over all files
+#           Checks that the merge gives the same bytes, and that it refuses a missing shard
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_shards(iFiles = 24, iTurns = 100, iShards = 3):
+    oMetrics = {}
+    sDir = tempfile.mkdtemp()
+    sHere = os.path.dirname(os.path.abspath(__file__))
+    try:
+        flAdverb, lFiles = corpus.make_corpus(os.path.join(sDir, "in"), iFiles, iTurns)
+        lOptions = ["-a", flAdverb, "-m", "full", "-e", sSentiment, "-i", os.path.join(sDir, "in")]
+        def kamer(lArgs):
+            return subprocess.Popen([sys.executable, "kamer.py"] + lArgs, cwd=sHere,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        flSingle = os.path.join(sDir, "single.csv")
+        fStart = timeit.default_timer()
+        kamer(lOptions + ["-o", flSingle]).wait()
+        fSingle = timeit.default_timer() - fStart
+        # All shards side by side, as on a cluster
+        lOutputs = [os.path.join(sDir, "shard%d.csv" % iShard) for iShard in range(1, iShards + 1)]
+        fStart = timeit.default_timer()
+        lProcs = [kamer(lOptions + ["-S", "%d/%d" % (iShard, iShards), "-o", lOutputs[iShard - 1]])
+                  for iShard in range(1, iShards + 1)]
+        for oProc in lProcs:
+            oProc.wait()
+        fShards = timeit.default_timer() - fStart
+        flMerged = os.path.join(sDir, "merged.csv")
+        fStart = timeit.default_timer()
+        kamer(["merge", "-o", flMerged] + lOutputs).wait()
+        fMerge = timeit.default_timer() - fStart
+        with open(flSingle, "rb") as f:
+            bSingle = f.read()
+        bSame = os.path.exists(flMerged)
+        if bSame:
+            with open(flMerged, "rb") as f:
+                bSame = f.read() == bSingle
+        if not bSame:
+            print("The merged shards are DIFFERENT from the single run")
+        # A merge without all shards must not give an output
+        flPart = os.path.join(sDir, "part.csv")
+        kamer(["merge", "-o", flPart] + lOutputs[1:]).wait()
+        if os.path.exists(flPart):
+            print("The merge did NOT notice the missing shard")
+            bSame = False
+        # Balance: the bytes of the input per shard
+        lBytes = []
+        for flThis in lOutputs:
+            with open(flThis + ".shard.json", encoding="utf8") as f:
+                oManifest = json.load(f)
+            lBytes.append(sum(os.path.getsize(sFile) for iPos, sRel, sFile, iRows, bOk in oManifest['files']))
+        oMetrics['single_s'] = fSingle
+        oMetrics['shards_s'] = fShards
+        oMetrics['merge_s'] = fMerge
+        print("single run     %7.2f s   (%d files, %d bytes of rows)" % (fSingle, iFiles, len(bSingle)))
+        print("%d shards       %7.2f s   (side by side on %d CPUs)" % (iShards, fShards, os.cpu_count()))
+        print("merge          %7.2f s" % fMerge)
+        print("input bytes per shard: %s   (largest/smallest %.3f)" %
+              (", ".join(str(iBytes) for iBytes in lBytes), max(lBytes) / max(min(lBytes), 1)))
+    finally:
+        shutil.rmtree(sDir)
+    return oMetrics if bSame else False
+
+# ----------------------------------------------------------------------------------
+# Name :    bench_folia
+# Goal :    Throughput and peak memory of the streaming FoLiA export (ntkfolia) of one
+#           large synthetic session, at two session sizes: the peak should not grow
+#           with the session, unlike the document tree of the same FoLiA (only built
+#           for the first size: it takes about ten times the size of the FoLiA)
+#           Also checks that the FoLiA is well-formed and has every sentence
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def bench_folia(lTurns = [1000, 4000]):
+    # Only imported here: ntkfolia is the project next to this one
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ntkfolia"))
+    import ntkfolia
+    oMetrics = {}
+    bOk = True
+    sDir = tempfile.mkdtemp()
+    try:
+        for iTurns in lTurns:
+            flAdverb, lFiles = corpus.make_corpus(os.path.join(sDir, "in%d" % iTurns), 1, iTurns)
+            flOut = os.path.join(sDir, "session%d%s" % (iTurns, ntkfolia.sSuffix))
+            oAdv = advhandle.AdvHandle(errHandle)
+            oAdv.Load(flAdverb)
+            # tracemalloc only sees the memory of the standard library parser
+            oNtk = ntk.ntk(errHandle, "full", "all", sSentiment, "etree")
+            (bDone, oCounts), fTime = best_time(ntkfolia.export_file, oNtk, oAdv, lFiles[0], flOut)
+            (bDone, oCounts), fTraced, fPeak = peak_memory(ntkfolia.export_file, oNtk, oAdv, lFiles[0], flOut)
+            if iTurns == lTurns[0]:
+                # The same FoLiA as a document tree, for comparison
+                oTree, fTreeTime, fTreePeak = peak_memory(ET.parse, flOut)
+                oTree = None
+            iSentences = 0
+            for sEvent, el in ET.iterparse(flOut):
+                if el.tag == "{" + ntkfolia.sFoliaNs + "}s":
+                    iSentences += 1
+                    el.clear()
+            if not bDone or iSentences != oCounts['sentences']:
+                print("The FoLiA of %d turns is NOT complete: %d of %d sentences" %
+                      (iTurns, iSentences, oCounts.get('sentences', 0)))
+                bOk = False
+            fSize = os.path.getsize(lFiles[0]) / (1024 * 1024)
+            fFolia = oCounts['bytes'] / (1024 * 1024)
+            print("session %5.1f MB -> FoLiA %6.1f MB: %6.2fs  %8.0f tokens/s  %5.1f MB/s   peak %6.1f MB%s" %
+                  (fSize, fFolia, fTime, oCounts['tokens'] / fTime, fFolia / fTime, fPeak,
+                   "   (tree %.1f MB)" % fTreePeak if iTurns == lTurns[0] else ""))
+            oMetrics['tokens_per_s'] = oCounts['tokens'] / fTime
+            oMetrics['mb_per_s'] = fFolia / fTime
+            oMetrics['peak_mb'] = fPeak
+    finally:
+        shutil.rmtree(sDir)
+    return oMetrics if bOk else False
+
+# ----------------------------------------------------------------------------------
+# Name :    quiet
+# Goal :    Call [fn] while its messages on stderr are suppressed
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def quiet(fn, *args):
+    oStderr = sys.stderr
+    sys.stderr = open(os.devnull, "w")
+    try:
+        return fn(*args)
+    finally:
+        sys.stderr.close()
+        sys.stderr = oStderr
+
+# ----------------------------------------------------------------------------------
+# Name :    compare_baseline
+# Goal :    Compare the metrics of this run with a saved baseline
+#           Rates (names with "per_s") should not go down, memory ("mb") should not go up
+#           Returns the number of regressions
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def compare_baseline(oResults, flBaseline):
+    with open(flBaseline, encoding="utf8") as f:
+        oBaseline = json.load(f)
+    if oBaseline.get('sentiment') != sSentiment:
+        print("Note: the baseline was made with sentiment '%s', this run uses '%s'" %
+              (oBaseline.get('sentiment'), sSentiment))
+    oBaseline = oBaseline['results']
+    iRegress = 0
+    for sName in oResults:
+        if not sName in oBaseline:
+            continue
+        for sMetric, fValue in oResults[sName].items():
+            fBase = oBaseline[sName].get(sMetric)
+            if fBase == None or fBase == 0:
+                continue
+            fChange = 100.0 * (fValue - fBase) / fBase
+            # Positive [fWorse] means the metric got worse
+            fWorse = -fChange if "per_s" in sMetric else fChange
+            sFlag = ""
+            if fWorse > fTolerance:
+                sFlag = "   REGRESSION"
+                iRegress += 1
+            print("%-8s %-30s %12.1f -> %12.1f  %+7.1f%%%s" % (sName, sMetric, fBase, fValue, fChange, sFlag))
+    return iRegress
+
+# ----------------------------------------------------------------------------------
+# Name :    save_baseline
+# Goal :    Save the metrics of this run as the baseline for later runs
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def save_baseline(oResults, flBaseline):
+    oBaseline = {'python': platform.python_version(), 'platform': platform.platform(),
+                 'sentiment': sSentiment, 'results': oResults}
+    # Keep the metrics of benchmarks that did not run this time
+    if os.path.isfile(flBaseline):
+        with open(flBaseline, encoding="utf8") as f:
+            oOld = json.load(f)['results']
+        for sName in oOld:
+            if not sName in oResults:
+                oResults[sName] = oOld[sName]
+    with open(flBaseline, "w", encoding="utf8") as f:
+        json.dump(oBaseline, f, indent=2, sort_keys=True)
+
+# ============================= BENCHMARK REGISTRY =================================
+oBenchmarks = {"lexicon": bench_lexicon,
+               "trie": bench_trie,
+               "load": bench_load,
+               "xml": bench_xml,
+               "reader": bench_reader,
+               "prefilter": bench_prefilter,
+               "dedup": bench_dedup,
+               "records": bench_records,
+               "startup": bench_startup,
+               "segment": bench_segment,
+               "stages": bench_stages,
+               "end2end": bench_end2end,
+               "serve": bench_serve,
+               "shards": bench_shards,
+               "folia": bench_folia}
+
+# ----------------------------------------------------------------------------------
+# Name :    main
+# Goal :    Run one or all of the benchmarks
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def main(prgName, argv) :
+  global sSentiment, fTolerance, iRepeat
+  lRun = []
+  flSave = ''         # Save the metrics as baseline in this file
+  flCompare = ''      # Compare the metrics with the baseline in this file
+  oResults = {}       # Benchmark -> metrics (for the benchmarks that return them)
+  iFailed = 0         # Number of benchmarks that found a wrong result
+
+  sSyntax = prgName + ' [-b <benchmark>] [-e <sentiment>] [-s <save baseline>] [-c <compare baseline>] ' + \
+            '[-t <tolerance %>] [-r <repeat>]  (benchmarks: ' + ", ".join(oBenchmarks) + ')'
+  try:
+    opts, args = getopt.getopt(argv, "hb:e:s:c:t:r:", ["benchmark=","sentiment=","save=","compare=","tolerance=","repeat="])
+  except getopt.GetoptError:
+    print(sSyntax)
+    sys.exit(2)
+  for opt, arg in opts:
+    if opt == '-h':
+      print(sSyntax)
+      sys.exit(0)
+    elif opt in ("-b", "--benchmark"):
+      lRun.append(arg)
+    elif opt in ("-e", "--sentiment"):
+      sSentiment = arg
+    elif opt in ("-s", "--save"):
+      flSave = arg
+    elif opt in ("-c", "--compare"):
+      flCompare = arg
+    elif opt in ("-t", "--tolerance"):
+      fTolerance = float(arg)
+    elif opt in ("-r", "--repeat"):
+      iRepeat = int(arg)
+  if len(lRun) == 0:
+    lRun = list(oBenchmarks)
+  for sName in lRun:
+    if not sName in oBenchmarks:
+      errHandle.Status("Unknown benchmark: " + sName)
+      continue
+    errHandle.Status("Benchmark: " + sName)
+    oResult = oBenchmarks[sName]()
+    if isinstance(oResult, dict):
+      oResults[sName] = oResult
+    elif oResult is False:
+      errHandle.Status("Benchmark failed: " + sName)
+      iFailed += 1
+  iRegress = iFailed
+  if flCompare != '':
+    errHandle.Status("Compared with baseline " + flCompare + " (tolerance %.0f%%)" % fTolerance)
+    iRegress += compare_baseline(oResults, flCompare)
+    errHandle.Status("%d regressions" % iRegress)
+  if flSave != '':
+    save_baseline(oResults, flSave)
+    errHandle.Status("Baseline saved in " + flSave)
+  return iRegress
+
+# ----------------------------------------------------------------------------------
+# Goal :  If user calls this as main, then follow up on it
+# ----------------------------------------------------------------------------------
+if __name__ == "__main__":
+  sys.exit(1 if main(sys.argv[0], sys.argv[1:]) > 0 else 0)
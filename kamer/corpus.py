@@ -0,0 +1,193 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    corpus
+# Goal :    Deterministic generator of synthetic NTK documents and adverb definitions
+#           Type A is <handeling>, type B is <officiele-publicatie>, just like the real archives
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import sys, getopt, os, json, random
+from xml.sax.saxutils import escape
+
+# ============================= LOCAL VARIABLES ====================================
+lFiller = ["de", "het", "een", "minister", "kabinet", "voorstel", "is", "niet", "dat", "wij", "zij",
+           "motie", "kamer", "vraag", "antwoord", "over", "voor", "met", "geld", "begroting", "wet",
+           "heeft", "zal", "moet", "onderwijs", "zorg", "burgers", "gemeenten", "land", "jaar"]
+lParties = ["VVD", "PvdA", "CDA", "D66", "SP", "GroenLinks", "PVV", "ChristenUnie", "SGP"]
+lNames = ["Jansen", "de Vries", "Bakker", "Visser", "Smit", "Meijer", "de Boer", "Mulder", "Bos", "Vos"]
+lBreaks = [". ", "? ", "! ", ".\n"]
+
+# ----------------------------------------------------------------------------------
+# Name :    make_forms
+# Goal :    Get [iForms] synthetic adverb forms; every [iMulti]-th form has two words
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def make_forms(iForms, iMulti = 0):
+    lForms = []
+    for iForm in range(iForms):
+        if iMulti > 0 and iForm % iMulti == iMulti - 1:
+            lForms.append("in mate" + str(iForm))
+        else:
+            lForms.append("adv" + str(iForm))
+    return lForms
+
+# ----------------------------------------------------------------------------------
+# Name :    make_adverbs
+# Goal :    Write an adverb JSON file (the format AdvHandle.Load reads) with [iForms]
+#           forms spread over [iTypes] types. Returns the list of forms.
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def make_adverbs(flOut, iForms = 20, iTypes = 2, iMulti = 0):
+    lForms = make_forms(iForms, iMulti)
+    lWords = []
+    for iType in range(iTypes):
+        lWords.append({"type": "type" + str(iType),
+                       "form": [sForm for iForm, sForm in enumerate(lForms) if iForm % iTypes == iType]})
+    with open(flOut, "w", encoding="utf8") as f:
+        json.dump({"words": lWords}, f, indent=1)
+    return lForms
+
+# ----------------------------------------------------------------------------------
+# Name :    make_paragraph
+# Goal :    Get the text of one <al>: [iSentences] sentences of [iWords] words,
+#           where each word is an adverb form with a chance of [fDensity]
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def make_paragraph(oRnd, iSentences, iWords, fDensity, lForms):
+    lText = []
+    for iSent in range(iSentences):
+        lSent = []
+        for iWord in range(iWords):
+            if len(lForms) > 0 and oRnd.random() < fDensity:
+                lSent.append(oRnd.choice(lForms))
+            else:
+                lSent.append(oRnd.choice(lFiller))
+        lSent[0] = lSent[0].capitalize()
+        lText.append(" ".join(lSent) + oRnd.choice(lBreaks))
+    return escape("".join(lText).strip())
+
+# ----------------------------------------------------------------------------------
+# Name :    make_document
+# Goal :    Write a synthetic type A ("a") or type B ("b") document
+#           The same arguments always give the same document
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def make_document(flOut, sXmlType = "a", iTurns = 100, iParagraphs = 3, iSentences = 4, iWords = 12,
+                  fDensity = 0.02, lForms = [], iSeed = 1, iYear = 2010):
+    oRnd = random.Random(iSeed)
+    with open(flOut, "w", encoding="utf8") as f:
+        if sXmlType == "a":
+            # Type A starts with a few lines that are not XML
+            f.write("Handelingen Tweede Kamer\n")
+            f.write("<handeling><frontm><vergjaar>%d-%d</vergjaar></frontm>\n<part><item>\n" % (iYear, iYear + 1))
+        else:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write('<officiele-publicatie><metadata><meta name="DC.identifier" content="h-tk-%d%d-%d-%d"/></metadata>\n' %
+                    (iYear, iYear + 1, iSeed % 100 + 1, iSeed % 7 + 1))
+            f.write("<handelingen><agendapunt>\n")
+        for iTurn in range(iTurns):
+            sName = oRnd.choice(lNames)
+            sParty = oRnd.choice(lParties)
+            # One turn in ten is the chairman (type B skips those)
+            bChair = iTurn % 10 == 9
+            lAl = ["<al>" + make_paragraph(oRnd, iSentences, iWords, fDensity, lForms) + "</al>"
+                   for iPar in range(iParagraphs)]
+            if sXmlType == "a":
+                if bChair:
+                    f.write("<spreker><wie><aanspr>De voorzitter</aanspr></wie>")
+                else:
+                    f.write("<spreker><wie><aanspr>De heer " + escape(sName) + "</aanspr><partij>" +
+                            sParty + "</partij></wie>")
+                f.write("\n".join(lAl) + "</spreker>\n")
+            else:
+                if bChair:
+                    f.write("<spreekbeurt><spreker><voorvoegsels></voorvoegsels><naam><achternaam>voorzitter" +
+                            "</achternaam></naam></spreker>")
+                else:
+                    f.write("<spreekbeurt><spreker><voorvoegsels>De heer</voorvoegsels><naam><achternaam>" +
+                            escape(sName) + "</achternaam></naam><politiek>" + sParty + "</politiek></spreker>")
+                f.write("<tekst>" + "\n".join(lAl) + "</tekst></spreekbeurt>\n")
+        if sXmlType == "a":
+            f.write("</item></part></handeling>\n")
+        else:
+            f.write("</agendapunt></handelingen></officiele-publicatie>\n")
+
+# ----------------------------------------------------------------------------------
+# Name :    make_corpus
+# Goal :    Write [iFiles] documents and an adverb file into directory [sDir]
+#           The documents alternate between type A and type B
+#           Returns (adverb file, list of document files)
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def make_corpus(sDir, iFiles = 10, iTurns = 100, iParagraphs = 3, iSentences = 4, iWords = 12,
+                fDensity = 0.02, iForms = 20, iTypes = 2, iMulti = 4, sTypes = "ab"):
+    if not os.path.isdir(sDir):
+        os.makedirs(sDir)
+    flAdverb = os.path.join(sDir, "adverbs.json")
+    lForms = make_adverbs(flAdverb, iForms, iTypes, iMulti)
+    lFiles = []
+    for iFile in range(iFiles):
+        sXmlType = sTypes[iFile % len(sTypes)]
+        flThis = os.path.join(sDir, "%s-%04d.xml" % (sXmlType, iFile))
+        make_document(flThis, sXmlType, iTurns, iParagraphs, iSentences, iWords, fDensity, lForms,
+                      iSeed = iFile + 1, iYear = 1995 + iFile % 25)
+        lFiles.append(flThis)
+    return flAdverb, lFiles
+
+# ----------------------------------------------------------------------------------
+# Name :    main
+# Goal :    Write a synthetic corpus from the command line
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def main(prgName, argv) :
+  sDir = ''
+  oArgs = {}
+
+  sSyntax = prgName + ' -o <directory> [-n <files>] [-t <turns>] [-p <paragraphs>] [-s <sentences>] ' + \
+            '[-w <words>] [-d <density>] [-f <forms>] [-x <types: a|b|ab>]'
+  try:
+    opts, args = getopt.getopt(argv, "ho:n:t:p:s:w:d:f:x:",
+                               ["outputdir=","files=","turns=","paragraphs=","sentences=","words=","density=","forms=","types="])
+  except getopt.GetoptError:
+    print(sSyntax)
+    sys.exit(2)
+  for opt, arg in opts:
+    if opt == '-h':
+      print(sSyntax)
+      sys.exit(0)
+    elif opt in ("-o", "--outputdir"):
+      sDir = arg
+    elif opt in ("-n", "--files"):
+      oArgs['iFiles'] = int(arg)
+    elif opt in ("-t", "--turns"):
+      oArgs['iTurns'] = int(arg)
+    elif opt in ("-p", "--paragraphs"):
+      oArgs['iParagraphs'] = int(arg)
+    elif opt in ("-s", "--sentences"):
+      oArgs['iSentences'] = int(arg)
+    elif opt in ("-w", "--words"):
+      oArgs['iWords'] = int(arg)
+    elif opt in ("-d", "--density"):
+      oArgs['fDensity'] = float(arg)
+    elif opt in ("-f", "--forms"):
+      oArgs['iForms'] = int(arg)
+    elif opt in ("-x", "--types"):
+      oArgs['sTypes'] = arg
+  if sDir == '':
+    print(sSyntax)
+    sys.exit(2)
+  flAdverb, lFiles = make_corpus(sDir, **oArgs)
+  print("Corpus: %d documents and %s in %s" % (len(lFiles), os.path.basename(flAdverb), sDir), file=sys.stderr)
+
+# ----------------------------------------------------------------------------------
+# Goal :  If user calls this as main, then follow up on it
+# ----------------------------------------------------------------------------------
+if __name__ == "__main__":
+  main(sys.argv[0], sys.argv[1:])
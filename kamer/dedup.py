@@ -0,0 +1,144 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    dedup
+# Goal :    Deduplication of repeated sentences (procedural formulas, motions that are read
+#           aloud, speeches that are reprinted): the counts and sentiment of a sentence are
+#           computed once, and the output rows of its copies are tagged or dropped
+#           A sentence is known by a 63-bit hash of its text with the spacing normalized;
+#           that hash is also the duplicate group id, the same in every process and run
+#           A reprinted speech repeats whole paragraphs: a paragraph that was seen before
+#           gets all its sentences from the table at once, without even splitting it
+#           The tables are bounded: when a table is full, the least recently used
+#           sentence (or paragraph) is forgotten, and a later copy of it counts as a new sentence
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import hashlib
+from collections import OrderedDict
+
+# ============================= LOCAL VARIABLES ====================================
+lModes = ["tag", "drop"]    # tag: keep all rows and tag them, drop: only keep the first copy
+lColumns = ["Dup_group", "Dup_first"]   # Output columns in dedup mode
+iTableSize = 1 << 18        # Default number of sentences a table remembers
+
+# ----------------------------------------------------------------------------------
+# Name :    check_mode
+# Goal :    Return an error message if [sMode] is not a dedup mode, otherwise ""
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def check_mode(sMode):
+    if not sMode in lModes:
+        return "Unknown dedup mode: " + sMode + " (choose from " + ", ".join(lModes) + ")"
+    return ""
+
+# ----------------------------------------------------------------------------------
+# Name :    text_key
+# Goal :    Get 63 bits of the BLAKE2 hash of [sText] (never 0)
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def text_key(sText):
+    bDigest = hashlib.blake2b(sText.encode("utf-8"), digest_size=8).digest()
+    return (int.from_bytes(bDigest, "big") >> 1) or 1
+
+# ----------------------------------------------------------------------------------
+# Name :    sentence_key
+# Goal :    Get the duplicate group id of sentence [sText]: the key of the text with its
+#           runs of spaces and tabs made single spaces
+#           The case is kept: the tokens (and so the counts) of two sentences that only
+#           differ in spacing are the same
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def sentence_key(sText):
+    if "  " in sText or "\t" in sText:
+        sText = " ".join(sText.split())
+    return text_key(sText)
+
+# ----------------------------------------------------------------------------------
+# Name :    SentenceTable
+# Goal :    Bounded table of the results of the sentences seen so far: key -> value
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class SentenceTable:
+    """Least-recently-used table of sentence results"""
+
+    def __init__(self, iSize = iTableSize):
+        self.size = max(iSize, 1)
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, iKey):
+        """Get the value of sentence [iKey], or None if it has not been seen (or was forgotten)"""
+
+        oValue = self.table.get(iKey)
+        if oValue is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.table.move_to_end(iKey)
+        return oValue
+
+    def put(self, iKey, oValue):
+        """Remember the value of sentence [iKey]"""
+
+        self.table[iKey] = oValue
+        if len(self.table) > self.size:
+            self.table.popitem(last=False)
+
+    def __len__(self):
+        return len(self.table)
+
+# ----------------------------------------------------------------------------------
+# Name :    Tagger
+# Goal :    Fill in the first occurrence of each row in the output, or drop the copies
+#           The reference of a row is "<file>:<row number in that file>"; the rows come
+#           here in input order, so the references do not depend on --jobs
+#           Only the rows that are written are numbered: a reference points to a row of the
+#           output, also in drop mode, and a merge of shard outputs can fill them in again
+# History:
+# 18/oct/2026    ERK Created
+# 18/oct/2026    ERK Number the written rows only
+# ----------------------------------------------------------------------------------
+class Tagger:
+    """First occurrences of the output rows"""
+
+    def __init__(self, oSchema, sMode = "tag", iSize = iTableSize):
+        self.drop = sMode == "drop"
+        self.group = oSchema.getIndex(lColumns[0])
+        self.first = oSchema.getIndex(lColumns[1])
+        self.table = SentenceTable(iSize)
+        self.rows = 0           # Rows seen
+        self.repeats = 0        # Rows whose sentence was seen before
+        self.dropped = 0        # Rows left out
+
+    def iter_file(self, flThis, lRows):
+        """Yield the rows of file [flThis] with their first occurrence filled in"""
+
+        iGroup = self.group
+        iFirst = self.first
+        oTable = self.table
+        iRow = 0
+        for row in lRows:
+            self.rows += 1
+            # Rows from the result cache are text
+            iKey = int(row[iGroup])
+            sFirst = oTable.get(iKey)
+            if sFirst is None:
+                # A first occurrence is always written: it becomes the next row of the file
+                sFirst = flThis + ":" + str(iRow + 1)
+                oTable.put(iKey, sFirst)
+            else:
+                self.repeats += 1
+                if self.drop:
+                    self.dropped += 1
+                    continue
+            iRow += 1
+            # Rows may be shared with the result cache: do not change them in place
+            row = list(row)
+            row.insert(iFirst, sFirst)
+            yield row
@@ -0,0 +1,216 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    discover
+# Goal :    Find the input files of kamer: (recursive) directory walk with include and
+#           exclude globs, an optional manifest of the walk, and reading of compressed XML
+#           Plain files are memory-mapped: the parser reads them straight from the page cache
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import os, io, re, json, fnmatch, mmap, codecs
+# gzip and bz2 are only imported for compressed input, see open_input()
+
+# ============================= LOCAL VARIABLES ====================================
+lSuffixes = [".xml", ".xml.gz", ".xml.bz2"]     # Input files that kamer can read
+iManifest = 1           # Version of the manifest format
+lBom = b"\xef\xbb\xbf"     # Bytes of the UTF-8 byte order mark, skipped at the start of a line
+# Encodings that both expat and libxml2 read themselves: no need to convert those
+lNative = ["utf-8", "ascii", "iso8859-1", "utf-16"]
+reDeclaration = re.compile(rb"<\?xml[^>]*?encoding\s*=\s*[\"']([A-Za-z][A-Za-z0-9._-]*)[\"']")
+
+# ----------------------------------------------------------------------------------
+# Name :    open_input, is_compressed
+# Goal :    Open input file [flInput] for binary reading; .gz and .bz2 files are
+#           decompressed while they are read
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def open_input(flInput):
+    if flInput.endswith(".gz"):
+        import gzip
+        return gzip.open(flInput, "rb")
+    elif flInput.endswith(".bz2"):
+        import bz2
+        return bz2.open(flInput, "rb")
+    return open(flInput, "rb")
+
+def is_compressed(flInput):
+    return flInput.endswith(".gz") or flInput.endswith(".bz2")
+
+# ----------------------------------------------------------------------------------
+# Name :    map_file
+# Goal :    Get the contents of plain file [flInput] as a read-only memory map
+#           An empty file cannot be mapped: its contents are b""
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def map_file(flInput):
+    with open(flInput, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return b""
+
+# ----------------------------------------------------------------------------------
+# Name :    xml_start
+# Goal :    Get the byte offset of the first line that starts with < in [oData]
+#           (bytes or a memory map); 0 if there is none
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def xml_start(oData):
+    if oData[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        # UTF-16 with a byte order mark: there are no lines to skip in that
+        return 0
+    iLen = len(oData)
+    iPos = 0
+    while iPos < iLen:
+        iEnd = oData.find(b"\n", iPos)
+        iEnd = iLen if iEnd < 0 else iEnd + 1
+        iSkip = iPos
+        while iSkip < iEnd and oData[iSkip] in lBom:
+            iSkip += 1
+        if b"<" in oData[iSkip:min(iSkip + 2, iEnd)]:
+            return iPos
+        iPos = iEnd
+    return 0
+
+# ----------------------------------------------------------------------------------
+# Name :    stream_xml_start
+# Goal :    Get the byte offset of the first line that starts with < in binary file [f]
+#           For the compressed files, which cannot be searched like a memory map
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def stream_xml_start(f):
+    iOffset = f.tell()
+    for bLine in iter(f.readline, b""):
+        if b"<" in bLine.lstrip(lBom)[0:2]:
+            return iOffset
+        iOffset += len(bLine)
+    # No XML start found: hand over the whole file
+    return 0
+
+# ----------------------------------------------------------------------------------
+# Name :    xml_encoding
+# Goal :    Get the (Python codec) name of the encoding that the XML declaration at
+#           [iStart] in [oData] gives; without a declaration XML is UTF-8
+#           An encoding that Python does not know raises LookupError
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def xml_encoding(oData, iStart = 0):
+    bHead = oData[iStart:iStart + 256]
+    if bHead[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return "utf-16"
+    oMatch = reDeclaration.match(bHead.lstrip(lBom))
+    if oMatch == None:
+        return "utf-8"
+    return codecs.lookup(oMatch.group(1).decode("ascii")).name
+
+# ----------------------------------------------------------------------------------
+# Name :    open_xml
+# Goal :    Open input file [flInput] for the XML parser, positioned at the XML start
+#           [bData] are the contents that were read already (bytes or a memory map)
+#           Fast path: UTF-8 (and the other encodings the parsers know) is handed over
+#           as it is, without decoding. Other encodings are converted to UTF-8 first.
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def open_xml(flInput, bData = None):
+    if bData is None and is_compressed(flInput):
+        # A compressed file is decompressed while it is parsed
+        f = open_input(flInput)
+        f.seek(stream_xml_start(f))
+        return f
+    oData = map_file(flInput) if bData is None else bData
+    iStart = xml_start(oData)
+    sEncoding = xml_encoding(oData, iStart)
+    if sEncoding in lNative:
+        f = oData if isinstance(oData, mmap.mmap) else io.BytesIO(oData)
+        f.seek(iStart)
+        return f
+    # Slow path: decode, and tell the parser that the text is UTF-8 now
+    bText = oData[iStart:].decode(sEncoding).encode("utf-8")
+    if isinstance(oData, mmap.mmap):
+        oData.close()
+    bText = reDeclaration.sub(lambda oMatch: oMatch.group(0).replace(oMatch.group(1), b"UTF-8"), bText, count=1)
+    return io.BytesIO(bText)
+
+# ----------------------------------------------------------------------------------
+# Name :    matches
+# Goal :    Check whether relative path [sPath] matches one of the globs in [lGlobs]
+#           A glob without a / is also tried on the name of the file or directory only
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def matches(sPath, lGlobs):
+    sName = sPath.rsplit("/", 1)[-1]
+    for sGlob in lGlobs:
+        if fnmatch.fnmatchcase(sPath, sGlob):
+            return True
+        if not "/" in sGlob and fnmatch.fnmatchcase(sName, sGlob):
+            return True
+    return False
+
+# ----------------------------------------------------------------------------------
+# Name :    walk
+# Goal :    Yield (path, size) of the input files under [sDir], in directory order
+#           An excluded directory is not entered at all
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def walk(sDir, bRecursive = False, lInclude = [], lExclude = [], sRel = ""):
+    with os.scandir(sDir) as oEntries:
+        for oEntry in oEntries:
+            sPath = sRel + oEntry.name
+            if oEntry.is_dir():
+                if bRecursive and not matches(sPath, lExclude):
+                    for oItem in walk(oEntry.path, bRecursive, lInclude, lExclude, sPath + "/"):
+                        yield oItem
+                continue
+            if not any(oEntry.name.endswith(sSuffix) for sSuffix in lSuffixes):
+                continue
+            if len(lInclude) > 0 and not matches(sPath, lInclude):
+                continue
+            if matches(sPath, lExclude):
+                continue
+            yield os.path.normpath(sDir + "/" + oEntry.name), oEntry.stat().st_size
+
+# ----------------------------------------------------------------------------------
+# Name :    find_files
+# Goal :    Get the list of (path, size) of the input files under [sDir]
+#           With a manifest file [flManifest], the list of an earlier walk with the same
+#           settings is used; otherwise the walk is done and written to the manifest
+#           Returns (list, True if it came from the manifest)
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def find_files(sDir, bRecursive = False, lInclude = [], lExclude = [], flManifest = ""):
+    oSettings = {'version': iManifest, 'input': os.path.abspath(sDir), 'recursive': bRecursive,
+                 'include': list(lInclude), 'exclude': list(lExclude)}
+    if flManifest != "" and os.path.isfile(flManifest):
+        with open(flManifest, encoding="utf8") as f:
+            oManifest = json.load(f)
+        if all(oManifest.get(sName) == oValue for sName, oValue in oSettings.items()):
+            return [(flThis, iSize) for flThis, iSize in oManifest['files']], True
+    lFiles = list(walk(sDir, bRecursive, lInclude, lExclude))
+    if flManifest != "":
+        oSettings['files'] = lFiles
+        # Write a new manifest in one go: an interrupted run must not leave half of one
+        flTemp = flManifest + ".tmp"
+        with open(flTemp, "w", encoding="utf8") as f:
+            json.dump(oSettings, f)
+        os.replace(flTemp, flManifest)
+    return lFiles, False
+
+# ----------------------------------------------------------------------------------
+# Name :    largest_first
+# Goal :    Order [lFiles] (path, size) from the largest to the smallest file
+#           A pool then starts on the big sessions while all workers are still busy
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def largest_first(lFiles):
+    return sorted(lFiles, key=lambda tFile: (-tFile[1], tFile[0]))
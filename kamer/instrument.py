@@ -0,0 +1,297 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    instrument
+# Goal :    Timers and counters for the stages of kamer, and a progress line
+#           Nothing in ntk or kamer is timed unless a Profiler is attached: attach() replaces
+#           the methods of the objects by timed versions, so a run without --profile or
+#           --progress executes exactly the same code as before
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import sys, os, json, time, heapq
+
+# ============================= LOCAL VARIABLES ====================================
+iSlowest = 10           # Number of slowest files that are kept
+lOrder = ["parse", "extract", "segment", "match", "sentiment", "rows", "write"]
+
+# ----------------------------------------------------------------------------------
+# Name :    Profiler
+# Goal :    Exclusive time per stage: time spent in a nested timed stage counts for
+#           that stage only, not for the stage that called it
+#           The stages of --jobs workers are kept apart: they run side by side, so their
+#           time is set against the time of all workers, not against the wall time
+# History:
+# 18/oct/2026    ERK Created
+# 18/oct/2026    ERK Worker stages apart from those of the main process
+# ----------------------------------------------------------------------------------
+class Profiler:
+    """Timers and counters of the kamer stages"""
+
+    def __init__(self):
+        self.timers = {}        # Stage -> [exclusive seconds, calls]
+        self.workertimers = {}  # Stage -> [exclusive seconds, calls], summed over the workers
+        self.counters = {}      # Name -> count
+        self.files = []         # Heap of the slowest files: (seconds, file, rows)
+        self.stack = []         # Running timed stages: [name, start, time of children]
+
+    def enter(self, sName):
+        self.stack.append([sName, time.perf_counter(), 0.0])
+
+    def leave(self):
+        sName, fStart, fChild = self.stack.pop()
+        fTime = time.perf_counter() - fStart
+        lTimer = self.timers.get(sName)
+        if lTimer == None:
+            lTimer = self.timers[sName] = [0.0, 0]
+        lTimer[0] += fTime - fChild
+        lTimer[1] += 1
+        if len(self.stack) > 0:
+            self.stack[-1][2] += fTime
+
+    def count(self, sName, iCount = 1):
+        self.counters[sName] = self.counters.get(sName, 0) + iCount
+
+    def wrap_function(self, fn, sName, fnCount = None):
+        """Get a timed version of function [fn]; fnCount(result, args) updates the counters"""
+
+        def timed(*args):
+            self.enter(sName)
+            try:
+                oResult = fn(*args)
+            finally:
+                self.leave()
+            if fnCount != None:
+                fnCount(oResult, args)
+            return oResult
+        return timed
+
+    def wrap_generator(self, fn, sName, fnCount = None):
+        """Get a timed version of generator function [fn]; fnCount(item) updates the counters"""
+
+        def timed(*args):
+            return self.timed_iter(fn(*args), sName, fnCount)
+        return timed
+
+    def timed_iter(self, oIter, sName, fnCount = None):
+        """Yield the items of [oIter]; only the time spent getting them is counted"""
+
+        oIter = iter(oIter)
+        while True:
+            self.enter(sName)
+            try:
+                oItem = next(oIter)
+            except StopIteration:
+                return
+            finally:
+                self.leave()
+            if fnCount != None:
+                fnCount(oItem)
+            yield oItem
+
+    def attach(self, oNtk, oAdv):
+        """Replace the stage methods of [oNtk] and [oAdv] by timed versions"""
+
+        oNtk.iterTurns = self.wrap_generator(oNtk.iterTurns, "parse", lambda oTurn: self.count("turns"))
+        fnText = oNtk.process_text
+        def process_text(*args):
+            self.count("paragraphs")
+            return self.timed_iter(fnText(*args), "extract")
+        oNtk.process_text = process_text
+        oNtk.seg.segment = self.wrap_generator(oNtk.seg.segment, "segment", self.count_sentence)
+        oAdv.scan = self.wrap_function(oAdv.scan, "match", lambda lHits, args: self.count("hits", len(lHits)))
+        oNtk.snt.get_analysis_batch = self.wrap_function(oNtk.snt.get_analysis_batch, "sentiment",
+                                                         self.count_sentiment)
+
+    def count_sentence(self, oItem):
+        self.count("sentences")
+        self.count("tokens", len(oItem[1]))
+
+    def count_sentiment(self, lScore, args):
+        # One call per paragraph: a batch of sentences
+        self.count("sentiment calls")
+        self.count("sentiment sentences", len(args[0]))
+
+    def wrap_writer(self, writer):
+        """Time the writes to the output [writer]"""
+
+        writer.writerows = self.wrap_function(writer.writerows, "write")
+        return writer
+
+    def iter_file(self, flThis, lRows):
+        """Yield the rows of file [flThis], timing the file as a whole and the row building"""
+
+        fStart = time.perf_counter()
+        iRows = 0
+        try:
+            for row in self.timed_iter(lRows, "rows"):
+                iRows += 1
+                yield row
+        finally:
+            self.file_done(flThis, time.perf_counter() - fStart, iRows)
+
+    def file_done(self, flThis, fSeconds, iRows):
+        self.count("files")
+        self.count("rows", iRows)
+        oItem = (fSeconds, flThis, iRows)
+        if len(self.files) < iSlowest:
+            heapq.heappush(self.files, oItem)
+        else:
+            heapq.heappushpop(self.files, oItem)
+
+    def snapshot(self):
+        """Get the timers, counters and slowest files as a plain object"""
+        return {'timers': {sName: list(lTimer) for sName, lTimer in self.timers.items()},
+                'counters': dict(self.counters),
+                'files': list(self.files)}
+
+    def merge(self, oSnapshot):
+        """Add the snapshot of the profiler of a worker process"""
+
+        for sName, lTimer in oSnapshot['timers'].items():
+            lMine = self.workertimers.setdefault(sName, [0.0, 0])
+            lMine[0] += lTimer[0]
+            lMine[1] += lTimer[1]
+        for sName, iCount in oSnapshot['counters'].items():
+            self.count(sName, iCount)
+        for oItem in oSnapshot['files']:
+            oItem = tuple(oItem)
+            if len(self.files) < iSlowest:
+                heapq.heappush(self.files, oItem)
+            else:
+                heapq.heappushpop(self.files, oItem)
+
+    def get_stages(self, oTimers):
+        """Get the stages of [oTimers] in the order of the pipeline"""
+
+        lStages = [sName for sName in lOrder if sName in oTimers] + \
+                  sorted(sName for sName in oTimers if not sName in lOrder)
+        return [{'name': sName, 'seconds': oTimers[sName][0], 'calls': oTimers[sName][1]} for sName in lStages]
+
+    def get_report(self, fSeconds, oStages = None, iJobs = 1):
+        """Get the summary of the run as an object; [iJobs] is the number of pool workers"""
+
+        lStages = self.get_stages(self.timers)
+        fTimed = sum(oStage['seconds'] for oStage in lStages)
+        oReport = {'seconds': fSeconds,
+                   'stages': lStages,
+                   'untimed seconds': max(fSeconds - fTimed, 0.0),
+                   'counters': self.counters,
+                   'slowest files': [{'file': flThis, 'seconds': fTime, 'rows': iRows}
+                                     for fTime, flThis, iRows in sorted(self.files, reverse=True)]}
+        if len(self.workertimers) > 0:
+            # The workers had [iJobs] times the wall time together; what they did not spend
+            # in a timed stage they were idle (or starting up)
+            lStages = self.get_stages(self.workertimers)
+            fWorkers = fSeconds * max(iJobs, 1)
+            oReport['workers'] = {'jobs': iJobs, 'seconds': fWorkers, 'stages': lStages,
+                                  'idle seconds': max(fWorkers - sum(oStage['seconds'] for oStage in lStages), 0.0)}
+        if oStages != None:
+            oReport['pipeline'] = {sName: {'items': oStage.items, 'busy': oStage.busy,
+                                           'idle': oStage.idle, 'blocked': oStage.blocked}
+                                   for sName, oStage in oStages.items()}
+        return oReport
+
+    def get_text(self, oReport):
+        """Get the summary of the run as lines of text"""
+
+        fSeconds = max(oReport['seconds'], 1e-9)
+        lText = ["Profile of a run of %.2fs" % oReport['seconds']]
+        for oStage in oReport['stages']:
+            lText.append("  %-10s %9.3fs %6.1f%% %10d calls" %
+                         (oStage['name'], oStage['seconds'], 100.0 * oStage['seconds'] / fSeconds, oStage['calls']))
+        lText.append("  %-10s %9.3fs" % ("untimed", oReport['untimed seconds']))
+        if 'workers' in oReport:
+            oWorkers = oReport['workers']
+            fWorkers = max(oWorkers['seconds'], 1e-9)
+            lText.append("  Workers: %d x %.2fs = %.2fs" % (oWorkers['jobs'], oReport['seconds'], oWorkers['seconds']))
+            for oStage in oWorkers['stages']:
+                lText.append("    %-10s %9.3fs %6.1f%% %10d calls" %
+                             (oStage['name'], oStage['seconds'], 100.0 * oStage['seconds'] / fWorkers, oStage['calls']))
+            lText.append("    %-10s %9.3fs %6.1f%%" %
+                         ("idle", oWorkers['idle seconds'], 100.0 * oWorkers['idle seconds'] / fWorkers))
+        for sName in sorted(oReport['counters']):
+            iCount = oReport['counters'][sName]
+            lText.append("  %-20s %12d  (%.0f/s)" % (sName, iCount, iCount / fSeconds))
+        if len(oReport['slowest files']) > 0:
+            lText.append("  Slowest files:")
+            for oFile in oReport['slowest files']:
+                lText.append("    %8.3fs %8d rows  %s" % (oFile['seconds'], oFile['rows'], oFile['file']))
+        return lText
+
+    def write(self, flOut, fSeconds, oStages = None, iJobs = 1):
+        """Write the summary: JSON if [flOut] ends with .json, text otherwise"""
+
+        oReport = self.get_report(fSeconds, oStages, iJobs)
+        with open(flOut, "w", encoding="utf8") as f:
+            if flOut.endswith(".json"):
+                json.dump(oReport, f, indent=2)
+            else:
+                f.write("\n".join(self.get_text(oReport)) + "\n")
+        return oReport
+
+# ----------------------------------------------------------------------------------
+# Name :    Progress
+# Goal :    One line on stderr with throughput and the estimated time left,
+#           instead of one status line per file
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Progress:
+    """Progress line of a run"""
+
+    interval = 0.5      # Minimum number of seconds between two updates of the line
+
+    def __init__(self, lFiles):
+        self.total = len(lFiles)
+        # The time left is estimated from the bytes that are done: files differ a lot in size
+        self.sizes = {}
+        for flThis in lFiles:
+            try:
+                self.sizes[flThis] = os.path.getsize(flThis)
+            except OSError:
+                self.sizes[flThis] = 0
+        self.bytes = max(sum(self.sizes.values()), 1)
+        self.done = 0
+        self.donebytes = 0
+        self.rows = 0
+        self.start = time.perf_counter()
+        self.shown = 0.0
+
+    def update(self, flThis, iRows = 0):
+        """File [flThis] is done"""
+
+        self.done += 1
+        self.donebytes += self.sizes.get(flThis, 0)
+        self.rows += iRows
+        fNow = time.perf_counter()
+        if fNow - self.shown >= self.interval or self.done == self.total:
+            self.shown = fNow
+            self.show(fNow - self.start)
+
+    def iter_file(self, flThis, lRows):
+        """Yield the rows of file [flThis] and update the line when the file is done"""
+
+        iRows = 0
+        try:
+            for row in lRows:
+                iRows += 1
+                yield row
+        finally:
+            self.update(flThis, iRows)
+
+    def show(self, fSeconds):
+        fSeconds = max(fSeconds, 1e-9)
+        fPart = self.donebytes / self.bytes
+        if fPart > 0:
+            iLeft = int(fSeconds * (1.0 - fPart) / fPart)
+            sEta = "%d:%02d:%02d" % (iLeft // 3600, (iLeft // 60) % 60, iLeft % 60)
+        else:
+            sEta = "?"
+        sys.stderr.write("\r%d/%d files %5.1f%%  %7.1f files/s  %9.0f rows/s  ETA %s " %
+                         (self.done, self.total, 100.0 * fPart, self.done / fSeconds, self.rows / fSeconds, sEta))
+        sys.stderr.flush()
+
+    def finish(self):
+        sys.stderr.write("\n")
+        sys.stderr.flush()
@@ -4,12 +4,15 @@
 # History:
 # 16/feb/2017    ERK Created
 # ==========================================================================================================
-import sys, getopt, os.path, importlib
-import util, advhandle, ntk, csv, io
+import sys, getopt, os.path, importlib, time
+import util, advhandle, ntk, rescache, sinks, instrument
+# The modules of the other stages and commands (store, pipeline, aggregate, shards, ...) are
+#   only imported where they are used: they add to the startup time of every run
 
 # ============================= LOCAL VARIABLES ====================================
 errHandle = util.ErrHandle()
 outputColumns = ['Jaar_start', 'Jaar_eind', 'Partij', 'Aanspreek', 'Sentence', 'Subjectivity', 'Polarity']
+oWorker = {}        # Per-process objects of a worker in the --jobs pool
 
 # ----------------------------------------------------------------------------------
 # Name :    main
@@ -18,23 +21,53 @@ outputColumns = ['Jaar_start', 'Jaar_eind', 'Partij', 'Aanspreek', 'Sentence', '
 # 4/apr/2016    ERK Created
 # ----------------------------------------------------------------------------------
 def main(prgName, argv) :
+  import dedup, shards
   flInput = ''        # input directory name
   flOutput = ''       # output directory name
   flAdverb = ''       # intensifier adverb JSON file
   sMethod = 'compact' # Output method: "compact", "full"
   sScope = 'line'     # Scope of the input: "line", "sentence"
   sLines = 'all'      # Output all the lines, or only the 'hit' ones?
+  iJobs = 1           # Number of worker processes
+  sSentiment = 'pattern'  # Sentiment backend: "off", "pattern" or a plugin module name
+  flCache = ''        # Result cache directory
+  sCacheKey = 'stat'  # Cache key of an input file: "stat" (path, mtime, size) or "hash" (content)
+  sFormat = 'tsv'     # Output format: "tsv", "tsv.gz", "tsv.zst", "arrow", "parquet"
+  iBatch = 10000      # Number of rows per batch for the "arrow" and "parquet" formats
+  flDatabase = ''     # SQLite store to ingest the sentences into (instead of writing output)
+  iReadAhead = 4      # Number of files the reader threads read ahead (0: no reader stage)
+  iReaders = 2        # Number of reader threads
+  iWriteQueue = 8     # Number of row batches queued for the writer thread (0: no writer stage)
+  flProfile = ''      # Write a summary of stage timers and counters to this file (.json or text)
+  flCProfile = ''     # Write a cProfile dump of the run to this file
+  bProgress = False   # Show one progress line instead of a line per file
+  sAggregate = ''     # Write totals per group (e.g. "party,year") instead of a row per sentence
+  bIds = False        # Write party and speaker ids in the rows, and their names in a lookup table
+  bRecursive = False  # Also look for input files in the subdirectories of the input directory
+  lInclude = []       # Only take input files that match one of these globs
+  lExclude = []       # Skip input files and directories that match one of these globs
+  bLargest = False    # Process the largest input files first
+  flManifest = ''     # Keep the list of input files in this manifest, instead of walking the directory each run
+  sXml = 'auto'       # XML parser backend: "auto" (etree), "etree" or "lxml"
+  bPrefilter = True   # In "hit" mode, skip the paragraphs without a candidate token
+  sDedup = ''         # Dedup mode for repeated sentences: "tag" or "drop" ('': no dedup)
+  iDedupSize = dedup.iTableSize   # Number of sentences the dedup tables remember
+  sShard = ''         # Only process shard "i/N" of the input files (see 'merge')
 
   try:
     # Adapt the program name to exclude the directory
     index = prgName.rfind("\\")
     if (index > 0) :
       prgName = prgName[index+1:]
-    sSyntax = prgName + ' [-m <method>] [-l <lines>] [-s <scope>] -a <adverb file> -i <input directory> -o <output directory>'
+    sSyntax = prgName + ' [-m <method>] [-l <lines>] [-s <scope>] [-j <jobs>] [-e <sentiment: off|pattern|plugin>] [-c <cache directory>] [-k <cache key: stat|hash>] [-f <format: ' + '|'.join(sinks.oFormats) + '>] [-b <batch size>] [-r <read-ahead files>] [-t <reader threads>] [-w <write queue batches>] [-p <profile file>] [-P <cProfile file>] [-g] [-G <party,year,speaker>] [-I] [-R] [--include <glob>] [--exclude <glob>] [-L] [-M <manifest>] [-x <xml: auto|etree|lxml>] [-n] [-D <dedup: tag|drop>] [--dedupsize <sentences>] [-S <shard i/N>] -a <adverb file> -i <input directory> (-o <output file> | -d <database>)\n' + \
+              '       ' + prgName + ' query -d <database> [-p <party>] [-y <year>[-<year>]] [-w <form>] [-t <text>] [-n <limit>]\n' + \
+              '       ' + prgName + ' aggregate -o <output file> <aggregate table> ...\n' + \
+              '       ' + prgName + ' merge -o <output file> [-f <format: ' + '|'.join(shards.lMergeFormats) + '>] <shard output> ...\n' + \
+              '       ' + prgName + ' serve -a <adverb file> [-j <workers>] [-p <port> | -u <unix socket>] ...'
     # get all the arguments
     try:
       # Get arguments and options
-      opts, args = getopt.getopt(argv, "hs:m:l:a:i:o:", ["-scope=","-method=","-lines=","-adverbs=","-inputdir=","-outputdir="])
+      opts, args = getopt.getopt(argv, "hs:m:l:j:e:c:k:f:b:d:r:t:w:p:P:gG:IRLM:x:nD:S:a:i:o:", ["scope=","method=","lines=","jobs=","sentiment=","cache=","cachekey=","format=","batch=","database=","readahead=","readers=","writequeue=","profile=","cprofile=","progress","aggregate=","ids","recursive","include=","exclude=","largest","manifest=","xml=","noprefilter","dedup=","dedupsize=","shard=","adverbs=","inputdir=","outputdir="])
     except getopt.GetoptError:
       print(sSyntax)
       sys.exit(2)
@@ -51,31 +84,141 @@ def main(prgName, argv) :
         sLines = arg
       elif opt in ("-s", "--scope"):
         sScope = arg
-      elif opt in ("-i", "--ifile"):
+      elif opt in ("-j", "--jobs"):
+        iJobs = int(arg)
+      elif opt in ("-e", "--sentiment"):
+        sSentiment = arg
+      elif opt in ("-c", "--cache"):
+        flCache = arg
+      elif opt in ("-k", "--cachekey"):
+        sCacheKey = arg
+      elif opt in ("-f", "--format"):
+        sFormat = arg
+      elif opt in ("-b", "--batch"):
+        iBatch = int(arg)
+      elif opt in ("-d", "--database"):
+        flDatabase = arg
+      elif opt in ("-r", "--readahead"):
+        iReadAhead = int(arg)
+      elif opt in ("-t", "--readers"):
+        iReaders = int(arg)
+      elif opt in ("-w", "--writequeue"):
+        iWriteQueue = int(arg)
+      elif opt in ("-p", "--profile"):
+        flProfile = arg
+      elif opt in ("-P", "--cprofile"):
+        flCProfile = arg
+      elif opt in ("-g", "--progress"):
+        bProgress = True
+      elif opt in ("-G", "--aggregate"):
+        sAggregate = arg
+      elif opt in ("-I", "--ids"):
+        bIds = True
+      elif opt in ("-R", "--recursive"):
+        bRecursive = True
+      elif opt == "--include":
+        lInclude.append(arg)
+      elif opt == "--exclude":
+        lExclude.append(arg)
+      elif opt in ("-L", "--largest"):
+        bLargest = True
+      elif opt in ("-M", "--manifest"):
+        flManifest = arg
+      elif opt in ("-x", "--xml"):
+        sXml = arg
+      elif opt in ("-n", "--noprefilter"):
+        bPrefilter = False
+      elif opt in ("-D", "--dedup"):
+        sDedup = arg
+      elif opt == "--dedupsize":
+        iDedupSize = int(arg)
+      elif opt in ("-S", "--shard"):
+        sShard = arg
+      elif opt in ("-i", "--ifile", "--inputdir"):
         flInput = arg
-      elif opt in ("-o", "--ofile"):
+      elif opt in ("-o", "--ofile", "--outputdir"):
         flOutput = arg
     # Check if all arguments are there
-    if (flInput == '' or flOutput == ''):
+    if (flInput == '' or (flOutput == '' and flDatabase == '')):
       errHandle.DoError(sSyntax)
     # Continue with the program
-    errHandle.Status('Input is "' + flInput + '"')
+    errHandle.Status('Input is "' + flInput + '"' + (' (recursive)' if bRecursive else ''))
+    if len(lInclude) > 0 or len(lExclude) > 0:
+      errHandle.Status('Include ' + (', '.join(lInclude) if len(lInclude) > 0 else 'all') +
+                       ', exclude ' + (', '.join(lExclude) if len(lExclude) > 0 else 'none'))
+    if flManifest != '':
+      errHandle.Status('Manifest is "' + flManifest + '"')
+    if sShard != '':
+      errHandle.Status('Shard is ' + sShard)
     errHandle.Status('Output is "' + flOutput + '"')
     errHandle.Status('Adverb definition file is "' + flAdverb + '"')
     errHandle.Status('Reading scope is "' + sScope + '"')
     errHandle.Status('Output method is "' + sMethod + '"')
-    errHandle.Status('Output lines is "' + sLines + '"')
+    errHandle.Status('Output lines is "' + sLines + '"' + ('' if sLines == 'all' or bPrefilter else ' (no prefilter)'))
+    errHandle.Status('Number of jobs is ' + str(iJobs))
+    errHandle.Status('Read-ahead is %d files (%d threads), write queue is %d batches' % (iReadAhead, iReaders, iWriteQueue))
+    errHandle.Status('Sentiment is "' + sSentiment + '"')
+    errHandle.Status('XML backend is "' + ntk.xml_backend(sXml) + '"')
+    if flCache != '':
+      errHandle.Status('Result cache is "' + flCache + '" (key: ' + sCacheKey + ')')
+    if flDatabase != '':
+      errHandle.Status('Database is "' + flDatabase + '"')
+    elif sAggregate != '':
+      errHandle.Status('Aggregate per ' + sAggregate)
+    else:
+      errHandle.Status('Output format is "' + sFormat + '"')
+      if bIds:
+        errHandle.Status('Party and speaker are written as ids')
+      if sDedup != '':
+        errHandle.Status('Dedup of repeated sentences: ' + sDedup + ' (%d sentences remembered)' % iDedupSize)
     # Call the function that does the job
     oArgs = {'input': flInput,
              'output': flOutput,
              'adverb': flAdverb,
              'scope': sScope,
              'lines': sLines,
+             'jobs': iJobs,
+             'sentiment': sSentiment,
+             'cache': flCache,
+             'cachekey': sCacheKey,
+             'format': sFormat,
+             'batch': iBatch,
+             'database': flDatabase,
+             'readahead': iReadAhead,
+             'readers': iReaders,
+             'writequeue': iWriteQueue,
+             'profile': flProfile,
+             'progress': bProgress,
+             'aggregate': sAggregate,
+             'ids': bIds,
+             'recursive': bRecursive,
+             'include': lInclude,
+             'exclude': lExclude,
+             'largest': bLargest,
+             'manifest': flManifest,
+             'xml': sXml,
+             'prefilter': bPrefilter,
+             'dedup': sDedup,
+             'dedupsize': iDedupSize,
+             'shard': sShard,
              'method': sMethod}
-    if (intensifiers(oArgs)) :
+    if flCProfile != '':
+      # Only imported when asked for: the profiler slows down the whole run
+      import cProfile
+      oCProfile = cProfile.Profile()
+      bOk = oCProfile.runcall(intensifiers, oArgs)
+      oCProfile.dump_stats(flCProfile)
+      errHandle.Status('cProfile dump written to "' + flCProfile + '"')
+    else:
+      bOk = intensifiers(oArgs)
+    if (bOk) :
       errHandle.Status("Ready")
     else :
       errHandle.DoError("Could not complete")
+    return bOk
+  except SystemExit:
+    # Leaving on purpose (e.g. after -h) is not an error
+    raise
   except:
     # act
     errHandle.DoError("main")
@@ -88,6 +231,7 @@ def main(prgName, argv) :
 # 16/feb/2017    ERK Created
 # ----------------------------------------------------------------------------------
 def intensifiers(oArgs):
+    import discover, dedup, pipeline, aggregate, shards
     oAdv = None     # 
     bDoAsk = False  # Local variable
     flInput = ""    # 
@@ -96,9 +240,38 @@ def intensifiers(oArgs):
     sMethod = ""    # 
     sLines = ""     # Lines: 'all', 'hit'
     sScope = ""
+    iJobs = 1       # Number of worker processes
+    sSentiment = "pattern"  # Sentiment backend
+    flCache = ""    # Result cache directory
+    sCacheKey = "stat"      # Cache key method: 'stat', 'hash'
+    oCache = None   # Result cache
+    sFormat = "tsv" # Output format
+    iBatch = 10000  # Rows per batch for columnar formats
+    flDatabase = "" # SQLite store to ingest into
+    iReadAhead = 4  # Files read ahead by the reader stage
+    iReaders = 2    # Reader threads
+    iWriteQueue = 8 # Row batches queued for the writer stage
+    flProfile = ""  # Summary of the stage timers and counters
+    bProgress = False   # Progress line instead of a line per file
+    sAggregate = "" # Groups to aggregate on, e.g. "party,year"
+    bIds = False    # Party and speaker ids in the rows, names in a lookup table
+    bRecursive = False  # Walk the subdirectories of the input directory too
+    lInclude = []   # Globs of the input files to take
+    lExclude = []   # Globs of the input files and directories to skip
+    bLargest = False    # Largest input files first
+    flManifest = "" # Manifest with the list of input files
+    sXml = "auto"   # XML parser backend
+    bPrefilter = True   # Skip the paragraphs without a candidate token ("hit" mode)
+    sDedup = ""     # Dedup mode: 'tag', 'drop' or '' (off)
+    iDedupSize = dedup.iTableSize   # Sentences remembered by the dedup tables
+    oTagger = None  # First occurrences of the output rows in dedup mode
+    sShard = ""     # Shard "i/N" of the input files, or '' (all files)
+    oShard = None   # The files of this shard, and their row counts
+    iCached = 0     # Number of files taken from the cache
     arInput = []    # Array of input files
     arOutput = []   # Array of output files
     lOutput = []    # List of output objects (one per hit)
+    oSentiStats = {}    # Sentiment counters per process
 
     try:
         # Recover the arguments
@@ -108,12 +281,36 @@ def intensifiers(oArgs):
         if "method" in oArgs: sMethod = oArgs["method"]
         if "lines" in oArgs: sLines = oArgs["lines"]
         if "scope" in oArgs: sScope = oArgs["scope"]
+        if "jobs" in oArgs: iJobs = oArgs["jobs"]
+        if "sentiment" in oArgs: sSentiment = oArgs["sentiment"]
+        if "cache" in oArgs: flCache = oArgs["cache"]
+        if "cachekey" in oArgs: sCacheKey = oArgs["cachekey"]
+        if "format" in oArgs: sFormat = oArgs["format"]
+        if "batch" in oArgs: iBatch = oArgs["batch"]
+        if "database" in oArgs: flDatabase = oArgs["database"]
+        if "readahead" in oArgs: iReadAhead = oArgs["readahead"]
+        if "readers" in oArgs: iReaders = oArgs["readers"]
+        if "writequeue" in oArgs: iWriteQueue = oArgs["writequeue"]
+        if "profile" in oArgs: flProfile = oArgs["profile"]
+        if "progress" in oArgs: bProgress = oArgs["progress"]
+        if "aggregate" in oArgs: sAggregate = oArgs["aggregate"]
+        if "ids" in oArgs: bIds = oArgs["ids"]
+        if "recursive" in oArgs: bRecursive = oArgs["recursive"]
+        if "include" in oArgs: lInclude = oArgs["include"]
+        if "exclude" in oArgs: lExclude = oArgs["exclude"]
+        if "largest" in oArgs: bLargest = oArgs["largest"]
+        if "manifest" in oArgs: flManifest = oArgs["manifest"]
+        if "xml" in oArgs: sXml = oArgs["xml"]
+        if "prefilter" in oArgs: bPrefilter = oArgs["prefilter"]
+        if "dedup" in oArgs: sDedup = oArgs["dedup"]
+        if "dedupsize" in oArgs: iDedupSize = oArgs["dedupsize"]
+        if "shard" in oArgs: sShard = oArgs["shard"]
         # Check input and output directories
         if not os.path.isdir(flInput):
             errHandle.Status("Please specify an input DIRECTORY")
             return False
         # Double check the output
-        if os.path.exists(flOutput):
+        if flDatabase == "" and os.path.exists(flOutput):
             # Check if it accidentily is a directory
             if os.path.isdir(flOutput):
                 errHandle.Status("Please specify an output FILE")
@@ -121,58 +318,186 @@ def intensifiers(oArgs):
             else:
                 # give warning that we will overwrite
                 errHandle.Status("We will overwrite existing output file")
-        # Read input files
-        for flThis in os.listdir(flInput):
-            # Only take the XML files in the directory
-            if flThis.endswith(".xml"):
-                # Add file to list
-                arInput.append(os.path.normpath(flInput + "/" + flThis))
+        # Check the sentiment backend before we start, without loading it yet
+        if not ntk.SentiAna(errHandle, sSentiment).check_backend():
+            errHandle.Status("Cannot find sentiment backend: " + sSentiment)
+            return False
+        # Check that we can write the output format
+        if sAggregate != "":
+            sMsg = aggregate.check_groups(sAggregate)
+            if sMsg == "" and flDatabase != "":
+                sMsg = "Aggregate mode cannot be combined with a database"
+            elif sMsg == "" and sLines == "hit":
+                # The sentences without a hit are part of the totals (and the hit rate)
+                sMsg = "Aggregate mode counts all sentences: it cannot be combined with -l hit"
+        else:
+            sMsg = sinks.check_format(sFormat)
+        if sMsg == "":
+            sMsg = ntk.check_xml(sXml)
+        if sMsg == "" and bIds and (flDatabase != "" or sAggregate != ""):
+            sMsg = "Ids only apply to the rows of an output file"
+        if sMsg == "" and sDedup != "":
+            sMsg = dedup.check_mode(sDedup)
+            if sMsg == "" and (flDatabase != "" or sAggregate != ""):
+                sMsg = "Dedup only applies to the rows of an output file"
+        if sMsg == "" and sShard != "":
+            sMsg = shards.check_shard(sShard)
+            if sMsg == "" and flDatabase != "":
+                sMsg = "Each shard writes an output file, not a database"
+            elif sMsg == "" and sAggregate == "" and not sFormat in shards.lMergeFormats:
+                sMsg = "Shard outputs can only be merged in the formats " + ", ".join(shards.lMergeFormats)
+        if sMsg != "":
+            errHandle.Status(sMsg)
+            return False
+        # Find the input files: .xml, .xml.gz and .xml.bz2
+        lFound, bManifest = discover.find_files(flInput, bRecursive, lInclude, lExclude, flManifest)
+        if bManifest:
+            errHandle.Status("Input files: %d from the manifest" % len(lFound))
+        if bLargest:
+            # The big sessions go first, so that no worker is left with one at the end
+            lFound = discover.largest_first(lFound)
+        arInput = [flThis for flThis, iSize in lFound]
+        if sShard != "":
+            # Keep the files of this shard, in the order of the full list
+            iShard, iShards = shards.parse_shard(sShard)
+            oShard = shards.Shard(flInput, lFound, iShard, iShards)
+            arInput = oShard.paths()
+            errHandle.Status("Shard %d/%d: %d of %d input files (%d of %d bytes)" %
+                             (iShard, iShards, len(arInput), oShard.total, oShard.size, oShard.bytes))
 
         # Read the adverbs
         oAdv = advhandle.AdvHandle(errHandle)
         oAdv.Load(flAdverb)
 
-        # Make a file handler
-        oNtk = ntk.ntk(errHandle, sMethod, sLines)
+        # Dedup mode: the rows get the duplicate group and the first occurrence after the sentiment
+        oSchema = sinks.Schema(outputColumns + (dedup.lColumns if sDedup != "" else []), oAdv, sMethod, bIds)
+        lOptions = [sMethod, sLines, sScope, sSentiment]
+        if sDedup != "":
+            # The cached rows have the group id then (but not the first occurrence: that depends on the run)
+            lOptions.append("dedup")
+        oSettings = {'adverb': flAdverb, 'method': sMethod, 'lines': sLines,
+                     'sentiment': sSentiment, 'jobs': iJobs, 'xml': sXml, 'prefilter': bPrefilter,
+                     'dedup': iDedupSize if sDedup != "" else 0}
+        # Pipeline stages: the reader stage is only used by the serial run,
+        # pool workers read their own files
+        oStages = {'parse': pipeline.StageStats("parse")}
+        if iReadAhead > 0 and iJobs <= 1:
+            oStages['read'] = pipeline.StageStats("read", iReaders)
+        if iWriteQueue > 0 and flDatabase == "" and sAggregate == "":
+            oStages['write'] = pipeline.StageStats("write")
+        oSettings['readahead'] = iReadAhead
+        oSettings['readers'] = iReaders
+        oSettings['aggregate'] = sAggregate
+        # Instrumentation: without these, no stage is timed at all
+        oSettings['profiler'] = instrument.Profiler() if flProfile != "" else None
+        oSettings['progress'] = instrument.Progress(arInput) if bProgress else None
+        oSettings['workerprofiles'] = {}
+        oProf = oSettings['profiler']
+        fStart = time.perf_counter()
+
+        if flDatabase != "":
+            # Ingest mode: the rows go to the SQLite store instead of to an output file
+            bResult = ingest(arInput, oAdv, oSchema, flDatabase,
+                             rescache.FileKey(flAdverb, lOptions, sCacheKey == "hash"),
+                             oSettings, oSentiStats, oStages)
+            fSeconds = time.perf_counter() - fStart
+            show_summary(fSeconds, iJobs, list(oSentiStats.values()))
+            show_stages(fSeconds, oStages, iJobs)
+            show_profile(fSeconds, flProfile, oSettings, oStages)
+            return bResult
+
+        if sAggregate != "":
+            # Aggregate mode: one row per group, the sentences are not kept
+            oAgg = aggregate_files(arInput, oAdv, aggregate.Aggregator(sAggregate.split(","), oSchema.counts),
+                                   oSettings, oSentiStats, oStages)
+            iGroups = oAgg.write(flOutput)
+            errHandle.Status("Aggregate: %d groups" % iGroups)
+            if oShard != None:
+                show_shard(oShard, flOutput, oArgs)
+            fSeconds = time.perf_counter() - fStart
+            show_summary(fSeconds, iJobs, list(oSentiStats.values()))
+            show_stages(fSeconds, oStages, iJobs)
+            show_profile(fSeconds, flProfile, oSettings, oStages)
+            return True
+
+        # Find out which files have their rows in the result cache already
+        lKeys = [None] * len(arInput)
+        if flCache != "":
+            oCache = rescache.ResultCache(errHandle, flCache, flAdverb, lOptions, sCacheKey == "hash")
+            lKeys = [oCache.getKey(flThis) for flThis in arInput]
+        lCached = [sKey != None and oCache.has(sKey) for sKey in lKeys]
+        lTodo = [flThis for flThis, bCached in zip(arInput, lCached) if not bCached]
 
-        # start a CSV writer
-        fl_out = io.open(flOutput, "w", encoding='utf-8', newline ='')
-        writer = csv.writer(fl_out, csv.excel_tab, lineterminator='\n')
+        # start the output writer: it writes the first row with the headings (if the format has one)
+        writer = sinks.open_sink(sFormat, flOutput, oSchema, iBatch)
+        if bIds:
+            # The names behind the ids go to a lookup table next to the output
+            writer = sinks.IdWriter(writer, oSchema, flOutput + ".lookup.tsv")
+        if 'write' in oStages:
+            # Rows go to the writer thread in batches, through a bounded queue
+            writer = pipeline.ThreadedWriter(writer, iWriteQueue, pipeline.iRowBatch,
+                                             oStages['write'], oStages['parse'])
+        if oProf != None:
+            writer = oProf.wrap_writer(writer)
+        oProgress = oSettings['progress']
+        if sDedup != "":
+            oTagger = dedup.Tagger(oSchema, sDedup, iDedupSize)
         # BOM to indicate that this is UTF8
         # fl_out.write(u'\ufeff'.encode('utf8'))
-        # Create the first row with the headings
-        fields = oAdv.addTypes(outputColumns, sMethod)
-        writer.writerow(fields)
-        # Handle all the files in the input
-        for index in range(len(arInput)):
-            # Show which file we are treating
-            errHandle.Status("Processing file: " + arInput[index])
-            # Transform this XML file into an object
-            tree = oNtk.load(arInput[index])
-            # Evaluate the intensifiers in this file
-            lUtt = oNtk.getUtteranceList(tree, arInput[index], oAdv)
-            # Add the intensifiers to the CSV we are creating
-            for utt in lUtt:
-                content = []
-                # Append the standard lines
-                content.append(utt['jaar_van'])
-                content.append(utt['jaar_tot'])
-                content.append(utt['partij'])
-                content.append(utt['aanspr'])
-                content.append(utt['s'])
-                # Sentiment: subjectivity and polarity
-                content.append(utt['subj'])
-                content.append(utt['polar'])
-                # Append the count lines
-                oCount = utt['count']
-                for idx, item in enumerate(oCount):
-                    sWrd = oAdv.getWord(idx)
-                    content.append(oCount[sWrd])
-                # Add line to CSV
-                writer.writerow(content)
-
-        # Wrap up the CSV
-        fl_out.close()
+        # The files that are not cached come back in the order of [lTodo]
+        oResults = process_files(lTodo, oAdv, oSettings, oSentiStats, oStages)
+        try:
+            # Handle all the files in the input
+            for flThis, sKey, bCached in zip(arInput, lKeys, lCached):
+                if bCached:
+                    show_file(oSettings, "Cached file: " + flThis)
+                    lRows = oCache.read(sKey)
+                    if oProf != None:
+                        lRows = oProf.timed_iter(lRows, "cache")
+                    writer.writerows(tag_rows(flThis, lRows, oTagger, oShard))
+                    if oProgress != None: oProgress.update(flThis)
+                    iCached += 1
+                    continue
+                flThis, lRows, fnOk = next(oResults)
+                # Show which file we are treating
+                show_file(oSettings, "Processing file: " + flThis)
+                if oProgress != None:
+                    lRows = oProgress.iter_file(flThis, lRows)
+                # Add the intensifiers to the output we are creating (and to the cache)
+                oCacheOut = None if sKey == None else oCache.open(sKey)
+                fnTag = None
+                if oTagger != None or oShard != None:
+                    # The cache gets the rows as they come: tagged (or dropped) and counted after that
+                    fnTag = lambda lRows, flThis=flThis: tag_rows(flThis, lRows, oTagger, oShard)
+                if write_file(writer, lRows, fnOk, oCacheOut, fnTag):
+                    if oCacheOut != None: oCacheOut.commit()
+                else:
+                    errHandle.Status("Could not process file: " + flThis)
+                    if oCacheOut != None: oCacheOut.discard()
+                    if oShard != None: oShard.failed(flThis)
+        finally:
+            oResults.close()
+
+        # Wrap up the output
+        writer.close()
+        if bIds:
+            errHandle.Status('Lookup table is "' + flOutput + '.lookup.tsv"')
+        if oShard != None:
+            show_shard(oShard, flOutput, oArgs)
+        if oProgress != None:
+            oProgress.finish()
+
+        # Run summary
+        if oCache != None:
+            errHandle.Status("Result cache: %d files cached, %d processed" % (iCached, len(arInput) - iCached))
+        if oTagger != None:
+            errHandle.Status("Dedup: %d rows, %d repeated sentences (dedup ratio %.1f%%), %d rows dropped" %
+                             (oTagger.rows, oTagger.repeats, 100.0 * oTagger.repeats / max(oTagger.rows, 1),
+                              oTagger.dropped))
+        fSeconds = time.perf_counter() - fStart
+        show_summary(fSeconds, iJobs, list(oSentiStats.values()))
+        show_stages(fSeconds, oStages, iJobs)
+        show_profile(fSeconds, flProfile, oSettings, oStages)
 
         # We are happy: return okay
         return True
@@ -183,9 +508,705 @@ def intensifiers(oArgs):
 
 
 
+# ----------------------------------------------------------------------------------
+# Name :    file_rows
+# Goal :    Stream the CSV rows of one XML file
+#           After the generator is exhausted, [oNtk.ok] tells whether all went well
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def file_rows(oNtk, oAdv, flThis, bData = None):
+    iColumns = len(oAdv.getColumns(oNtk.method))
+    bGroup = oNtk.dedup != None
+    # Evaluate the intensifiers in this file, one speaker turn at a time
+    for utt in oNtk.iterUtterances(flThis, oAdv, bData):
+        # The metadata of the speaker turn, the sentence, subjectivity and polarity,
+        #   (the duplicate group) and the counts in the column order of the header
+        yield utt.getRow(iColumns, bGroup)
+
+# ----------------------------------------------------------------------------------
+# Name :    process_files
+# Goal :    Process the XML files [lFiles], serially or with a pool of worker processes
+#           Yields (file, rows, fnOk) in the order of [lFiles]; the rows must be used
+#           before the next file is asked for, after that fnOk() tells whether all went well
+#           The serial run gets the bytes of the files from the reader stage, if there is one
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def process_files(lFiles, oAdv, oSettings, oSentiStats, oStages):
+    if oSettings['jobs'] > 1:
+        oPool = start_pool(oSettings)
+        try:
+            # Results come back in the order of [lFiles], so the output equals the serial run
+            # Waiting for the workers is idle time of the main loop
+            fWait = time.perf_counter()
+            for flThis, oResult in zip(lFiles, oPool.imap(worker_rows, lFiles)):
+                lRows, bOk, iPid, oStats, oProfile = oResult
+                oStages['parse'].add(fIdle = time.perf_counter() - fWait, iItems = 1)
+                oSentiStats[iPid] = oStats
+                if oProfile != None:
+                    # Cumulative per worker: keep the latest
+                    oSettings['workerprofiles'][iPid] = oProfile
+                yield flThis, lRows, (lambda bOk=bOk: bOk)
+                fWait = time.perf_counter()
+        finally:
+            oPool.close()
+            oPool.join()
+    else:
+        # Make a file handler
+        oNtk = ntk.ntk(errHandle, oSettings['method'], oSettings['lines'], oSettings['sentiment'], oSettings['xml'],
+                       oSettings.get('prefilter', True), oSettings.get('dedup', 0))
+        oProf = oSettings['profiler']
+        if oProf != None:
+            oProf.attach(oNtk, oAdv)
+        oFiles = iter_input(lFiles, oStages, oSettings)
+        try:
+            for flThis, bData in oFiles:
+                oStages['parse'].add(iItems = 1)
+                if bData == None and 'read' in oStages:
+                    # The reader stage could not read this file
+                    yield flThis, [], (lambda: False)
+                    continue
+                # Rows are made while the file is still being parsed
+                lRows = file_rows(oNtk, oAdv, flThis, bData)
+                if oProf != None:
+                    lRows = oProf.iter_file(flThis, lRows)
+                yield flThis, lRows, (lambda: oNtk.ok)
+        finally:
+            oFiles.close()
+            oSentiStats[os.getpid()] = oNtk.get_stats()
+
+# ----------------------------------------------------------------------------------
+# Name :    iter_input
+# Goal :    Yield (file, bytes) for the files of a serial run
+#           The bytes come from the reader stage; without one they are None and
+#           the parser reads the file itself
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def iter_input(lFiles, oStages, oSettings):
+    if 'read' in oStages:
+        import pipeline
+        return iter(pipeline.Prefetcher(errHandle, lFiles, oSettings['readahead'], oSettings['readers'],
+                                        oStages['read'], oStages['parse']))
+    return ((flThis, None) for flThis in lFiles)
+
+# ----------------------------------------------------------------------------------
+# Name :    start_pool
+# Goal :    Start the pool of --jobs worker processes
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def start_pool(oSettings):
+    # Only imported here: it adds to the startup time of every other run
+    import multiprocessing
+    lGroups = None
+    if oSettings.get('aggregate', "") != "":
+        lGroups = oSettings['aggregate'].split(",")
+    # Each worker loads the adverbs and makes its own file handler once
+    return multiprocessing.Pool(oSettings['jobs'], worker_init,
+                                (oSettings['adverb'], oSettings['method'], oSettings['lines'], oSettings['sentiment'],
+                                 oSettings.get('xml', "auto"), oSettings['profiler'] != None, lGroups,
+                                 oSettings.get('prefilter', True), oSettings.get('dedup', 0)))
+
+# ----------------------------------------------------------------------------------
+# Name :    aggregate_files
+# Goal :    Add the utterances of the files [lFiles] to aggregator [oAgg]
+#           Pool workers each return the partial aggregate of one file
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def aggregate_files(lFiles, oAdv, oAgg, oSettings, oSentiStats, oStages):
+    oProgress = oSettings['progress']
+    if oSettings['jobs'] > 1:
+        oPool = start_pool(oSettings)
+        try:
+            fWait = time.perf_counter()
+            for flThis, oResult in zip(lFiles, oPool.imap(worker_aggregate, lFiles)):
+                oPart, bOk, iPid, oStats, oProfile = oResult
+                oStages['parse'].add(fIdle = time.perf_counter() - fWait, iItems = 1)
+                oSentiStats[iPid] = oStats
+                if oProfile != None:
+                    oSettings['workerprofiles'][iPid] = oProfile
+                show_file(oSettings, "Processing file: " + flThis)
+                oAgg.merge(oPart)
+                if not bOk:
+                    errHandle.Status("Could not process file: " + flThis)
+                if oProgress != None: oProgress.update(flThis, int(oPart.sentences.sum()))
+                fWait = time.perf_counter()
+        finally:
+            oPool.close()
+            oPool.join()
+    else:
+        oNtk = ntk.ntk(errHandle, oSettings['method'], oSettings['lines'], oSettings['sentiment'], oSettings['xml'],
+                       oSettings.get('prefilter', True), oSettings.get('dedup', 0))
+        oProf = oSettings['profiler']
+        if oProf != None:
+            oProf.attach(oNtk, oAdv)
+        oFiles = iter_input(lFiles, oStages, oSettings)
+        try:
+            for flThis, bData in oFiles:
+                oStages['parse'].add(iItems = 1)
+                show_file(oSettings, "Processing file: " + flThis)
+                if bData == None and 'read' in oStages:
+                    errHandle.Status("Could not process file: " + flThis)
+                    continue
+                oUtts = oNtk.iterUtterances(flThis, oAdv, bData)
+                if oProf != None:
+                    oUtts = oProf.iter_file(flThis, oUtts)
+                if oProgress != None:
+                    oUtts = oProgress.iter_file(flThis, oUtts)
+                # Like in the row output, a file that fails halfway keeps what it had
+                bOk = False
+                try:
+                    oAgg.add_utterances(oUtts)
+                    bOk = oNtk.ok
+                except:
+                    # act
+                    errHandle.DoError("aggregate_files: " + flThis)
+                if not bOk:
+                    errHandle.Status("Could not process file: " + flThis)
+        finally:
+            oFiles.close()
+            oSentiStats[os.getpid()] = oNtk.get_stats()
+    if oProgress != None:
+        oProgress.finish()
+    return oAgg
+
+# ----------------------------------------------------------------------------------
+# Name :    write_file
+# Goal :    Write the rows of one XML file straight to the output writer
+#           and, if [oCacheOut] is given, to the result cache
+#           [fnTag] (dedup) changes the rows after the cache got them
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def write_file(writer, lRows, fnOk, oCacheOut = None, fnTag = None):
+    try:
+        if oCacheOut != None:
+            lRows = store_rows(lRows, oCacheOut)
+        if fnTag != None:
+            lRows = fnTag(lRows)
+        writer.writerows(lRows)
+        return fnOk()
+    except:
+        # act
+        errHandle.DoError("write_file")
+        return False
+
+# ----------------------------------------------------------------------------------
+# Name :    ingest
+# Goal :    Put the rows of the input files into the SQLite store [flDatabase]
+#           Files whose rows are in the store already (same key) are skipped
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def ingest(arInput, oAdv, oSchema, flDatabase, oKey, oSettings, oSentiStats, oStages):
+    import store
+    oDb = store.Store(errHandle, flDatabase)
+    try:
+        oDb.prepare(oSchema, oKey.basekey)
+        lTodo = []
+        lTodoKeys = []
+        for flThis in arInput:
+            sKey = oKey.getKey(flThis)
+            if oDb.isCurrent(flThis, sKey):
+                show_file(oSettings, "Stored file: " + flThis)
+                if oSettings['progress'] != None: oSettings['progress'].update(flThis)
+            else:
+                lTodo.append(flThis)
+                lTodoKeys.append(sKey)
+        iDone = 0
+        oResults = process_files(lTodo, oAdv, oSettings, oSentiStats, oStages)
+        try:
+            for (flThis, lRows, fnOk), sKey in zip(oResults, lTodoKeys):
+                show_file(oSettings, "Ingesting file: " + flThis)
+                if oSettings['progress'] != None:
+                    lRows = oSettings['progress'].iter_file(flThis, lRows)
+                if oDb.putFile(flThis, sKey, lRows, fnOk):
+                    iDone += 1
+                else:
+                    errHandle.Status("Could not process file: " + flThis)
+        finally:
+            oResults.close()
+        if oSettings['progress'] != None:
+            oSettings['progress'].finish()
+        errHandle.Status("Store: %d files up to date, %d ingested, %d failed" %
+                         (len(arInput) - len(lTodo), iDone, len(lTodo) - iDone))
+        return True
+    finally:
+        oDb.close()
+
+# ----------------------------------------------------------------------------------
+# Name :    show_file
+# Goal :    Give the status line of one file, unless the progress line is shown
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def show_file(oSettings, sMsg):
+    if oSettings['progress'] == None:
+        errHandle.Status(sMsg)
+
+# ----------------------------------------------------------------------------------
+# Name :    tag_rows
+# Goal :    Pass on the output rows of file [flThis], tagged by [oTagger] (dedup mode)
+#           and counted by [oShard] (shard mode); either may be None
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def tag_rows(flThis, lRows, oTagger, oShard):
+    if oTagger != None:
+        lRows = oTagger.iter_file(flThis, lRows)
+    if oShard != None:
+        lRows = oShard.iter_file(flThis, lRows)
+    return lRows
+
+# ----------------------------------------------------------------------------------
+# Name :    show_shard
+# Goal :    Write the manifest of shard [oShard] next to its output [flOutput]
+#           The settings that change the rows must be the same in all shards of a run
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def show_shard(oShard, flOutput, oArgs):
+    oOptions = {sKey: oArgs.get(sKey) for sKey in ("method", "lines", "scope", "sentiment", "aggregate",
+                                                   "ids", "dedup", "dedupsize")}
+    oOptions['format'] = oArgs.get("format") if oArgs.get("aggregate", "") == "" else "tsv"
+    flManifest = oShard.write(flOutput, oOptions)
+    errHandle.Status('Shard manifest is "' + flManifest + '"')
+
+# ----------------------------------------------------------------------------------
+# Name :    store_rows
+# Goal :    Pass on the rows, keeping a copy in the result cache
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def store_rows(lRows, oCacheOut):
+    for content in lRows:
+        oCacheOut.writerow(content)
+        yield content
+
+# ----------------------------------------------------------------------------------
+# Name :    worker_init
+# Goal :    Prepare one worker process of the --jobs pool
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def worker_init(flAdverb, sMethod, sLines, sSentiment, sXml = "auto", bProfile = False, lGroups = None, bPrefilter = True,
+                iDedup = 0):
+    # The lexicon is loaded once per worker, not once per file
+    oAdv = advhandle.AdvHandle(errHandle)
+    oAdv.Load(flAdverb)
+    oWorker['adv'] = oAdv
+    oWorker['ntk'] = ntk.ntk(errHandle, sMethod, sLines, sSentiment, sXml, bPrefilter, iDedup)
+    oWorker['groups'] = lGroups
+    oWorker['columns'] = oAdv.addTypes([], sMethod)
+    oWorker['profiler'] = None
+    if bProfile:
+        oWorker['profiler'] = instrument.Profiler()
+        oWorker['profiler'].attach(oWorker['ntk'], oAdv)
+
+# ----------------------------------------------------------------------------------
+# Name :    worker_rows
+# Goal :    Process one file inside a worker process
+#           Returns the rows, a flag telling whether all went well, the process id,
+#           the sentiment counters and the profile (if any) of this worker
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def worker_rows(flThis):
+    lRows = []
+    bOk = False
+    oNtk = oWorker['ntk']
+    oProf = oWorker['profiler']
+    try:
+        oRows = file_rows(oNtk, oWorker['adv'], flThis)
+        if oProf != None:
+            oRows = oProf.iter_file(flThis, oRows)
+        for content in oRows:
+            lRows.append(content)
+        bOk = oNtk.ok
+    except:
+        # act
+        errHandle.DoError("worker_rows: " + flThis)
+    # The counters are cumulative: the parent keeps the latest ones per worker
+    return lRows, bOk, os.getpid(), oNtk.get_stats(), None if oProf == None else oProf.snapshot()
+
+# ----------------------------------------------------------------------------------
+# Name :    worker_aggregate
+# Goal :    Aggregate one file inside a worker process
+#           Returns the partial aggregate, the same way worker_rows returns rows
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def worker_aggregate(flThis):
+    import aggregate
+    oNtk = oWorker['ntk']
+    oProf = oWorker['profiler']
+    oPart = aggregate.Aggregator(oWorker['groups'], oWorker['columns'])
+    bOk = False
+    try:
+        oUtts = oNtk.iterUtterances(flThis, oWorker['adv'])
+        if oProf != None:
+            oUtts = oProf.iter_file(flThis, oUtts)
+        oPart.add_utterances(oUtts)
+        bOk = oNtk.ok
+    except:
+        # act
+        errHandle.DoError("worker_aggregate: " + flThis)
+    return oPart, bOk, os.getpid(), oNtk.get_stats(), None if oProf == None else oProf.snapshot()
+
+# ----------------------------------------------------------------------------------
+# Name :    show_summary
+# Goal :    Report the sentiment cache counters and the share of time spent on sentiment
+#           and, in "hit" mode, the share of paragraphs that the prefilter skipped
+# History:
+# 18/oct/2026    ERK Created
+# 18/oct/2026    ERK Prefilter skip rate
+# 18/oct/2026    ERK Sentences reused by the dedup tables
+# ----------------------------------------------------------------------------------
+def show_summary(fSeconds, iJobs, lSentiStats):
+    iHits = sum(oStats['hits'] for oStats in lSentiStats)
+    iMisses = sum(oStats['misses'] for oStats in lSentiStats)
+    fSenti = sum(oStats['seconds'] for oStats in lSentiStats)
+    # Workers run side by side: compare with the total process time available
+    fAvailable = fSeconds * max(iJobs, 1)
+    errHandle.Status("Run time: %.2fs" % fSeconds)
+    errHandle.Status("Sentiment: %d sentences, cache hits %d, misses %d (hit rate %.1f%%)" %
+                     (iHits + iMisses, iHits, iMisses, 100.0 * iHits / max(iHits + iMisses, 1)))
+    errHandle.Status("Sentiment time: %.2fs (%.1f%% of the run)" %
+                     (fSenti, 100.0 * fSenti / max(fAvailable, 1e-9)))
+    iReused = sum(oStats.get('reused', 0) for oStats in lSentiStats)
+    if iReused > 0:
+        iComputed = sum(oStats.get('computed', 0) for oStats in lSentiStats)
+        errHandle.Status("Dedup: counts and sentiment of %d sentences reused, %d computed" % (iReused, iComputed))
+    iChecked = sum(oStats.get('checked', 0) for oStats in lSentiStats)
+    if iChecked > 0:
+        iSkipped = sum(oStats.get('skipped', 0) for oStats in lSentiStats)
+        errHandle.Status("Prefilter: %d paragraphs, %d skipped (skip rate %.1f%%)" %
+                         (iChecked, iSkipped, 100.0 * iSkipped / iChecked))
+
+# ----------------------------------------------------------------------------------
+# Name :    show_profile
+# Goal :    Write the profile of the run to [flProfile] and show it
+#           The profiles of the pool workers are reported next to that of the main process
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def show_profile(fSeconds, flProfile, oSettings, oStages):
+    oProf = oSettings['profiler']
+    if oProf == None:
+        return
+    for oProfile in oSettings['workerprofiles'].values():
+        oProf.merge(oProfile)
+    oReport = oProf.write(flProfile, fSeconds, oStages, oSettings['jobs'])
+    for sLine in oProf.get_text(oReport):
+        errHandle.Status(sLine)
+    errHandle.Status('Profile written to "' + flProfile + '"')
+
+# ----------------------------------------------------------------------------------
+# Name :    show_stages
+# Goal :    Report the busy/idle counters of the pipeline stages and the bottleneck
+#           The parse stage is the main loop: it is busy whenever it does not wait
+#           With --jobs the parsing is done by the pool workers, which are not one of
+#           these stages: the main loop only waits for them, so no bottleneck is named
+# History:
+# 18/oct/2026    ERK Created
+# 18/oct/2026    ERK No bottleneck with --jobs
+# ----------------------------------------------------------------------------------
+def show_stages(fSeconds, oStages, iJobs = 1):
+    oParse = oStages['parse']
+    oParse.busy = max(fSeconds - oParse.idle - oParse.blocked, 0.0)
+    if 'read' in oStages:
+        oRead = oStages['read']
+        oRead.idle = max(fSeconds * oRead.threads - oRead.busy, 0.0)
+    for sName in ['read', 'parse', 'write']:
+        if sName in oStages:
+            oStage = oStages[sName]
+            errHandle.Status("Stage %s: %d items, busy %.2fs (%.0f%%), idle %.2fs, blocked %.2fs" %
+                             (sName, oStage.items, oStage.busy, 100.0 * oStage.getLoad(fSeconds),
+                              oStage.idle, oStage.blocked))
+    if iJobs <= 1:
+        sBottleneck = max(oStages, key=lambda sName: oStages[sName].getLoad(fSeconds))
+        errHandle.Status("Bottleneck stage: " + sBottleneck)
+
+# ----------------------------------------------------------------------------------
+# Name :    query
+# Goal :    Look up sentences in the SQLite store and print them as tab-separated text
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def query(prgName, argv) :
+  flDatabase = ''     # SQLite store
+  oQuery = {}         # Arguments of Store.query
+
+  try:
+    sSyntax = prgName + ' query -d <database> [-p <party>] [-y <year>[-<year>]] [-w <form>] [-t <text>] [-n <limit>]'
+    try:
+      opts, args = getopt.getopt(argv, "hd:p:y:w:t:n:", ["database=","party=","years=","form=","text=","limit="])
+    except getopt.GetoptError:
+      print(sSyntax)
+      sys.exit(2)
+    for opt, arg in opts:
+      if opt == '-h':
+        print(sSyntax)
+        sys.exit(0)
+      elif opt in ("-d", "--database"):
+        flDatabase = arg
+      elif opt in ("-p", "--party"):
+        oQuery['sParty'] = arg
+      elif opt in ("-y", "--years"):
+        lYears = arg.split("-")
+        oQuery['iFrom'] = int(lYears[0])
+        oQuery['iTo'] = int(lYears[-1])
+      elif opt in ("-w", "--form"):
+        oQuery['sForm'] = arg
+      elif opt in ("-t", "--text"):
+        oQuery['sText'] = arg
+      elif opt in ("-n", "--limit"):
+        oQuery['iLimit'] = int(arg)
+    if not os.path.isfile(flDatabase):
+      errHandle.Status(sSyntax)
+      return False
+    import store
+    oDb = store.Store(errHandle, flDatabase)
+    fStart = time.perf_counter()
+    iRows = 0
+    print("\t".join(['Jaar_start', 'Jaar_eind', 'Partij', 'Aanspreek', 'Sentence', 'Subjectivity', 'Polarity', 'File']))
+    for oRow in oDb.query(**oQuery):
+      print("\t".join("" if oValue == None else str(oValue) for oValue in oRow))
+      iRows += 1
+    oDb.close()
+    errHandle.Status("%d sentences in %.1f ms" % (iRows, 1000 * (time.perf_counter() - fStart)))
+    return True
+  except SystemExit:
+    raise
+  except:
+    # act
+    errHandle.DoError("query")
+    return False
+
+# ----------------------------------------------------------------------------------
+# Name :    merge_aggregates
+# Goal :    Merge aggregate tables of separate runs (-G) into one table
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def merge_aggregates(prgName, argv) :
+  import aggregate
+  flOutput = ''       # Merged table
+
+  try:
+    sSyntax = prgName + ' aggregate -o <output file> <aggregate table> ...'
+    try:
+      opts, args = getopt.getopt(argv, "ho:", ["outputdir="])
+    except getopt.GetoptError:
+      print(sSyntax)
+      sys.exit(2)
+    for opt, arg in opts:
+      if opt == '-h':
+        print(sSyntax)
+        sys.exit(0)
+      elif opt in ("-o", "--ofile", "--outputdir"):
+        flOutput = arg
+    if flOutput == '' or len(args) == 0:
+      errHandle.Status(sSyntax)
+      return False
+    sMsg = aggregate.check_groups("party")
+    if sMsg != "":
+      errHandle.Status(sMsg)
+      return False
+    oAgg = None
+    for flThis in args:
+      errHandle.Status("Merging table: " + flThis)
+      oPart = aggregate.read_table(flThis)
+      if oAgg == None:
+        oAgg = oPart
+      else:
+        oAgg.merge(oPart)
+    iGroups = oAgg.write(flOutput)
+    errHandle.Status("Aggregate: %d tables merged into %d groups" % (len(args), iGroups))
+    return True
+  except SystemExit:
+    raise
+  except:
+    # act
+    errHandle.DoError("merge_aggregates")
+    return False
+
+# ----------------------------------------------------------------------------------
+# Name :    merge
+# Goal :    Merge the outputs of the shards of one run (--shard i/N) into the output
+#           that the run without shards gives: the rows in input order, or the
+#           merged aggregate table. All input files must be covered exactly once.
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def merge(prgName, argv) :
+  import aggregate, shards
+  flOutput = ''       # Merged output
+  sFormat = 'tsv'     # Format of the merged rows
+
+  try:
+    sSyntax = prgName + ' merge -o <output file> [-f <format: ' + '|'.join(shards.lMergeFormats) + '>] <shard output> ...'
+    try:
+      opts, args = getopt.getopt(argv, "ho:f:", ["outputdir=","format="])
+    except getopt.GetoptError:
+      print(sSyntax)
+      sys.exit(2)
+    for opt, arg in opts:
+      if opt == '-h':
+        print(sSyntax)
+        sys.exit(0)
+      elif opt in ("-o", "--ofile", "--outputdir"):
+        flOutput = arg
+      elif opt in ("-f", "--format"):
+        sFormat = arg
+    if flOutput == '' or len(args) == 0:
+      errHandle.Status(sSyntax)
+      return False
+    if not sFormat in shards.lMergeFormats:
+      errHandle.Status("Merged rows are written as " + ", ".join(shards.lMergeFormats))
+      return False
+    sMsg = sinks.check_format(sFormat)
+    if sMsg != "":
+      errHandle.Status(sMsg)
+      return False
+    fStart = time.perf_counter()
+    lManifests = shards.read_manifests(args)
+    lMsg = shards.check_coverage(lManifests)
+    if len(lMsg) > 0:
+      for sMsg in lMsg:
+        errHandle.Status(sMsg)
+      errHandle.Status("Merge: the shard outputs cannot be merged")
+      return False
+    oOptions = lManifests[0]['options']
+    errHandle.Status("Merge: %d shards, %d input files" % (len(lManifests), lManifests[0]['total']))
+    if oOptions['aggregate'] != "":
+      # Aggregate tables are small: merge them as the 'aggregate' command does
+      sMsg = aggregate.check_groups(oOptions['aggregate'])
+      if sMsg != "":
+        errHandle.Status(sMsg)
+        return False
+      oAgg = None
+      for oManifest in lManifests:
+        oPart = aggregate.read_table(oManifest['path'])
+        if oAgg == None:
+          oAgg = oPart
+        else:
+          oAgg.merge(oPart)
+      iGroups = oAgg.write(flOutput)
+      errHandle.Status("Aggregate: %d groups" % iGroups)
+    else:
+      for oManifest in lManifests:
+        sMsg = sinks.check_format(oManifest['options']['format'])
+        if sMsg != "":
+          errHandle.Status(sMsg)
+          return False
+      iFiles, iRows, lFailed = shards.merge_rows(lManifests, flOutput, sFormat)
+      for flThis in lFailed:
+        errHandle.Status("Could not process file: " + flThis)
+      if oOptions['ids']:
+        iNames = shards.merge_lookups(lManifests, flOutput + ".lookup.tsv")
+        errHandle.Status('Lookup table is "' + flOutput + '.lookup.tsv" (%d names)' % iNames)
+      errHandle.Status("Merge: %d files, %d rows" % (iFiles, iRows))
+    errHandle.Status("Merged into %s in %.2f seconds" % (flOutput, time.perf_counter() - fStart))
+    return True
+  except SystemExit:
+    raise
+  except:
+    # act
+    errHandle.DoError("merge")
+    return False
+
+# ----------------------------------------------------------------------------------
+# Name :    serve
+# Goal :    Keep the lexicon and the sentiment backend loaded in a pool of workers,
+#           and answer requests for the rows of files or paragraphs (see serve.py)
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def serve(prgName, argv) :
+  oSettings = {'adverb': '', 'method': 'compact', 'lines': 'all', 'sentiment': 'pattern',
+               'xml': 'auto', 'prefilter': True}
+  iJobs = 2           # Number of worker processes
+  sHost = '127.0.0.1' # Only local clients, unless asked otherwise
+  iPort = 8765        # TCP port
+  flSocket = ''       # Unix socket to listen on instead of the TCP port
+
+  try:
+    sSyntax = prgName + ' serve -a <adverb file> [-m <method>] [-l <lines>] [-e <sentiment: off|pattern|plugin>] [-x <xml: auto|etree|lxml>] [-n] [-j <workers>] [-H <host>] [-p <port>] [-u <unix socket>]'
+    try:
+      opts, args = getopt.getopt(argv, "ha:m:l:e:x:nj:H:p:u:", ["adverbs=","method=","lines=","sentiment=","xml=","noprefilter","jobs=","host=","port=","socket="])
+    except getopt.GetoptError:
+      print(sSyntax)
+      sys.exit(2)
+    for opt, arg in opts:
+      if opt == '-h':
+        print(sSyntax)
+        sys.exit(0)
+      elif opt in ("-a", "--adverbs"):
+        oSettings['adverb'] = arg
+      elif opt in ("-m", "--method"):
+        oSettings['method'] = arg
+      elif opt in ("-l", "--lines"):
+        oSettings['lines'] = arg
+      elif opt in ("-e", "--sentiment"):
+        oSettings['sentiment'] = arg
+      elif opt in ("-x", "--xml"):
+        oSettings['xml'] = arg
+      elif opt in ("-n", "--noprefilter"):
+        oSettings['prefilter'] = False
+      elif opt in ("-j", "--jobs"):
+        iJobs = int(arg)
+      elif opt in ("-H", "--host"):
+        sHost = arg
+      elif opt in ("-p", "--port"):
+        iPort = int(arg)
+      elif opt in ("-u", "--socket"):
+        flSocket = arg
+    if not os.path.isfile(oSettings['adverb']):
+      errHandle.Status(sSyntax)
+      return False
+    if not ntk.SentiAna(errHandle, oSettings['sentiment']).check_backend():
+      errHandle.Status("Cannot find sentiment backend: " + oSettings['sentiment'])
+      return False
+    sMsg = ntk.check_xml(oSettings['xml'])
+    if sMsg != "":
+      errHandle.Status(sMsg)
+      return False
+    # Only imported here: the batch runs do not need asyncio
+    import asyncio, serve as service
+    oService = service.Service(errHandle, oSettings, outputColumns, iJobs)
+    fStart = time.perf_counter()
+    iWorkers = oService.start_pool()
+    errHandle.Status("%d workers warm in %.2fs" % (iWorkers, time.perf_counter() - fStart))
+    asyncio.run(oService.run(sHost, iPort, flSocket))
+    return True
+  except SystemExit:
+    raise
+  except:
+    # act
+    errHandle.DoError("serve")
+    return False
+
 # ----------------------------------------------------------------------------------
 # Goal :  If user calls this as main, then follow up on it
 # ----------------------------------------------------------------------------------
 if __name__ == "__main__":
-  # Call the main function with two arguments: program name + remainder
-  main(sys.argv[0], sys.argv[1:])
\ No newline at end of file
+  # The exit status tells a calling script whether the command succeeded
+  if len(sys.argv) > 1 and sys.argv[1] == "query":
+    # Sub command: kamer.py query ...
+    sys.exit(0 if query(sys.argv[0], sys.argv[2:]) else 1)
+  elif len(sys.argv) > 1 and sys.argv[1] == "aggregate":
+    # Sub command: kamer.py aggregate ...
+    sys.exit(0 if merge_aggregates(sys.argv[0], sys.argv[2:]) else 1)
+  elif len(sys.argv) > 1 and sys.argv[1] == "merge":
+    # Sub command: kamer.py merge ...
+    sys.exit(0 if merge(sys.argv[0], sys.argv[2:]) else 1)
+  elif len(sys.argv) > 1 and sys.argv[1] == "serve":
+    # Sub command: kamer.py serve ...
+    sys.exit(0 if serve(sys.argv[0], sys.argv[2:]) else 1)
+  else:
+    # Call the main function with two arguments: program name + remainder
+    sys.exit(0 if main(sys.argv[0], sys.argv[1:]) else 1)
\ No newline at end of file
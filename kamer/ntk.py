@@ -1,10 +1,102 @@
 #! /usr/bin/env python3
 # -*- coding: utf8 -*-
 
-import os.path
+import os.path, importlib.util
 import xml.etree.ElementTree as ET
 import re
 from sentiana import SentiAna
+from segment import Segmenter
+from speakers import Turns
+from discover import open_xml
+from dedup import SentenceTable, sentence_key, text_key
+# lxml is only imported when its backend is used, see xml_backend()
+
+# XML parser backends: "etree" (standard library) or "lxml"; "auto" takes the one that is the
+#   fastest for both document types: etree, see bench.py -b xml
+lXmlBackends = ["auto", "etree", "lxml"]
+iChunk = 1 << 16        # Number of bytes ntk.load feeds to the parser at once
+
+# ----------------------------------------------------------------------------------
+# Name :    check_xml
+# Goal :    Return an error message if XML backend [sXml] cannot be used, otherwise ""
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def check_xml(sXml):
+    if not sXml in lXmlBackends:
+        return "Unknown XML backend: " + sXml + " (choose from " + ", ".join(lXmlBackends) + ")"
+    if sXml == "lxml" and importlib.util.find_spec("lxml") == None:
+        return "XML backend lxml needs the python package lxml"
+    return ""
+
+# ----------------------------------------------------------------------------------
+# Name :    xml_backend
+# Goal :    Get the XML backend that "auto" stands for
+#           lxml does not parse type A documents faster than etree, and the sentences
+#           come out slower from its elements: "auto" is etree
+# History:
+# 18/oct/2026    ERK Created
+# 18/oct/2026    ERK "auto" is etree
+# ----------------------------------------------------------------------------------
+def xml_backend(sXml):
+    if sXml == "auto":
+        return "etree"
+    return sXml
+
+# ----------------------------------------------------------------------------------
+# Name :    Utterance
+# Goal :    Compact record of one sentence with its sentiment and intensifier counts
+# History:
+# 18/oct/2026    ERK Created
+# 18/oct/2026    ERK The turn metadata is shared instead of copied
+# ----------------------------------------------------------------------------------
+class Utterance:
+    """One utterance (sentence) of a speaker"""
+
+    __slots__ = ('turn', 's', 'polar', 'subj', 'count', 'group')
+
+    def __init__(self, turn, s, polar, subj, count, group = 0):
+        # The speaker turn (speakers.Turn) is shared by all sentences of the turn
+        self.turn = turn
+        self.s = s
+        self.polar = polar
+        self.subj = subj
+        # Sparse counts: tuple of (column, count) pairs, only for non-zero columns
+        self.count = count
+        # Duplicate group id of the sentence (see dedup.sentence_key); 0 without dedup
+        self.group = group
+
+    @property
+    def jaar_van(self):
+        return self.turn.jaar_van
+
+    @property
+    def jaar_tot(self):
+        return self.turn.jaar_tot
+
+    @property
+    def aanspr(self):
+        return self.turn.aanspr
+
+    @property
+    def partij(self):
+        return self.turn.partij
+
+    def getCounts(self, iColumns):
+        """Expand the sparse counts into a list of [iColumns] values"""
+        lCounts = [0] * iColumns
+        for iCol, iCount in self.count:
+            lCounts[iCol] = iCount
+        return lCounts
+
+    def getRow(self, iColumns, bGroup = False):
+        """Get the output row: turn metadata, sentence, sentiment, the duplicate group
+        id if [bGroup], and [iColumns] counts"""
+        oTurn = self.turn
+        row = [oTurn.jaar_van, oTurn.jaar_tot, oTurn.partij, oTurn.aanspr, self.s, self.subj, self.polar]
+        if bGroup:
+            row.append(self.group)
+        return row + self.getCounts(iColumns)
 
 # ----------------------------------------------------------------------------------
 # Name :    ntk
@@ -19,10 +111,15 @@ class ntk:
     method = ""
     lines = ""
     snt = None
-    lUtt = []
+    xml = "etree"       # XML parser backend: "etree" or "lxml"
+    ok = True           # False when the last file could not be processed completely
+    prefilter = True    # Skip the paragraphs without a candidate token in "hit" mode
+    dedup = None        # Table of the sentences seen so far (dedup.SentenceTable), if any
+    paragraphs = None   # Table of the paragraphs seen so far, if any
 
     # ======================= CLASS INITIALIZER ========================================
-    def __init__(self, oErr, sMethod, sLines):
+    def __init__(self, oErr, sMethod, sLines, sSentiment = "pattern", sXml = "auto", bPrefilter = True,
+                 iDedup = 0):
         # Set the error handler
         self.errHandle = oErr
         self.rePunct = re.compile(r"[\.\,\?\!\'\"\`\;\:\-]")
@@ -30,8 +127,22 @@ class ntk:
         self.reNalpha = re.compile(r"[^\w]")
         self.method = sMethod
         self.lines = sLines
-        # Create a sentiment object
-        self.snt = SentiAna(oErr)
+        # Single-pass sentence splitter and tokenizer
+        self.seg = Segmenter()
+        # Create a sentiment object: its backend is loaded on first use
+        self.snt = SentiAna(oErr, sSentiment)
+        # Shared speaker turn records: years, speaker and party
+        self.turns = Turns()
+        self.xml = xml_backend(sXml)
+        # Only "hit" mode can leave a paragraph out: "all" keeps every sentence
+        self.prefilter = bPrefilter and sLines != "all"
+        self.checked = 0    # Paragraphs the prefilter looked at
+        self.skipped = 0    # Paragraphs the prefilter skipped
+        # Dedup: the counts and sentiment of up to [iDedup] sentences are remembered
+        self.dedup = SentenceTable(iDedup) if iDedup > 0 else None
+        self.paragraphs = SentenceTable(iDedup) if iDedup > 0 else None
+        self.reused = 0     # Sentences taken from the dedup tables
+        self.computed = 0   # Sentences that were scanned (and scored)
 
 
     # ----------------------------------------------------------------------------------
@@ -39,10 +150,11 @@ class ntk:
     # Goal :    Read an NTK xml file
     # History:
     # 16/feb/2017    ERK Created
+    # 18/oct/2026    ERK Parse with lxml when that is the backend
+    # 18/oct/2026    ERK Feed the (memory-mapped) bytes to the parser, instead of lines of text
     # ----------------------------------------------------------------------------------
     def load(self, flInput):
         """Load (read) an XML file"""
-        lLine = []
 
         try:
             # Validate: does flInput exist?
@@ -50,30 +162,23 @@ class ntk:
                 self.errHandle.DoError("Input file not found: " + flInput)
                 return None
 
-            # Load the input document into an array
-            with open(flInput, encoding="utf8") as f:
-                lLine = f.readlines()
-
             # ======== DEBUGGING
             #if "h-tk-20102011-5-31.xml" in flInput:
             #    i = 0
             # ==================
 
-            # Remove first lines until first < starts
-            iFirst = -1
-            iLen = len(lLine)
-            for i in range(len(lLine)):
-                sLine = lLine[i]
-                if "<" in sLine[0:2]:
-                    iFirst = i
-                    break
-            if iFirst >= 0:
-                # Slice the input array
-                lLine = lLine[iFirst:iLen]
-            sText = "\n".join(lLine)
-            # Parse the text
+            # Parse the bytes from the first line that starts with <, in the encoding the
+            #   document declares
             try:
-                root = ET.fromstring(sText)
+                if self.xml == "lxml":
+                    from lxml import etree
+                    oParser = etree.XMLParser(remove_comments=True, remove_pis=True, huge_tree=True)
+                else:
+                    oParser = ET.XMLParser()
+                with open_xml(flInput) as f:
+                    for bChunk in iter(lambda: f.read(iChunk), b""):
+                        oParser.feed(bChunk)
+                root = oParser.close()
             except:
                 # act
                 self.errHandle.DoError("ntk/load parser exception")
@@ -91,16 +196,17 @@ class ntk:
     # Goal :    Get a list of utterance objects containing one or more adverbs
     # History:
     # 16/feb/2017    ERK Created
+    # 18/oct/2026    ERK Built on the utterance generators
     # ----------------------------------------------------------------------------------
     def getUtteranceList(self, doc, fName, oAdv):
         """Retrieve a list of utterance objects from the doc tree"""
         
-        self.lUtt = []       # List of utterances
         sXmlType = ""   # Kind of XML document we are processing
 
         try:
             # Make sure the adverb object is tied
             self.adv = oAdv
+            self.ok = True
 
             # Get the root name, which determines how we will process
             sRootType = doc.tag.lower()
@@ -120,6 +226,9 @@ class ntk:
                 vergjaar = frontm.find("vergjaar").text
                 # get a list of years from...to
                 lstYears = re.findall(r"\d\d\d\d", vergjaar)
+                # Iterate over all <spreker> items in part > item
+                lTurns = [spreker for itempart in doc.find("part").iter("item")
+                                  for spreker in itempart.iter("spreker")]
             elif sXmlType == "b":
                 # Extract the year as the first 4 numbers from the file name in metadata > meta > @content
                 meta = doc.find("metadata").find("meta")
@@ -127,68 +236,357 @@ class ntk:
                 # get a list of years from...to
                 lstYears = re.findall( r"\d\d\d\d", content)
                 # vergjaar = "-".join(lstYears)
-
-            # Type A: Get to the part > item
-            if sXmlType == "a":
-                # Iterate over all <item> items
-                for itempart in doc.find("part").iter("item"):
-                    # Iterate over all the 
-                    for spreker in itempart.iter("spreker"):
-                        # note the spreker details
-                        wie = spreker.find("wie")
-                        aanspr = "(onbekend)"
-                        partij = "(onbekend)"
-                        elAanspr = wie.find("aanspr")
-                        elPartij = wie.find("partij")
-                        elErwin = wie.find("erwin")
-                        if elAanspr != None:
-                            aanspr = elAanspr.text
-                        if elPartij != None:
-                            partij = elPartij.text
-                        # Iterate over all the utterances of this person
-                        for al in spreker.iter("al"):
-                            self.process_text(al, lstYears, aanspr, partij)
-            elif sXmlType == "b":
-                # Iterate over all <agendapunt> items
-                for agendapunt in doc.find("handelingen").iter("agendapunt"):
-                    # Iterate over all <spreekbeurt> objects
-                    for spreekbeurt in agendapunt.iter("spreekbeurt"):
-                        # Default values
-                        aanspr = "(onbekend)"
-                        partij = "(onbekend)"
-                        # Get the spreker (there may only be ONE according to the DTD)
-                        spreker = spreekbeurt.find("spreker")
-                        # Retrieve voorvoegsels and achternaam
-                        voorvoegsels = spreker.find("voorvoegsels").text
-                        achternaam = spreker.find("naam").find("achternaam").text
-                        # Note: we do NOT process the words of the Voorzitter
-                        if achternaam != "voorzitter":
-                            aanspr = voorvoegsels
-                            # Try to retrieve the political party
-                            politiek = spreker.find("politiek")
-                            if politiek != None:
-                                partij = politiek.text
-
-                            # Iterate over the <al> elements i9n here
-                            tekst = spreekbeurt.find("tekst")
-                            for al in tekst.iter("al"):
-                                self.process_text(al, lstYears, aanspr, partij)
+                # Iterate over all <spreekbeurt> objects in handelingen > agendapunt
+                lTurns = [spreekbeurt for agendapunt in doc.find("handelingen").iter("agendapunt")
+                                      for spreekbeurt in agendapunt.iter("spreekbeurt")]
 
             # Return the list of utterances
-            return self.lUtt
+            lUtt = []
+            for turn in lTurns:
+                lUtt.extend(self.iterTurnUtterances(turn, sXmlType, lstYears))
+            if not self.ok:
+                return None
+            return lUtt
         except:
             # act
             self.errHandle.DoError("ntk/getUtteranceList exception")
             return None
 
     # ----------------------------------------------------------------------------------
-    # Name :    process_text
-    # Goal :    Process one piece of <al> 
+    # Name :    iterUtterances
+    # Goal :    Stream the utterance objects of one NTK xml file
+    #           Pipeline: speaker turn -> paragraph -> sentence -> scored utterance
+    #           After the generator is exhausted, [self.ok] tells whether all went well
     # History:
-    # 20/feb/2017    ERK Created
+    # 18/oct/2026    ERK Created
+    # ----------------------------------------------------------------------------------
+    def iterUtterances(self, flInput, oAdv, bData = None):
+        """Yield the utterance objects of an XML file, one speaker turn at a time
+
+        When [bData] is given, it holds the bytes of [flInput] that were read already.
+        """
+
+        # Make sure the adverb object is tied
+        self.adv = oAdv
+        self.ok = True
+        for turn, sXmlType, lstYears in self.iterTurns(flInput, bData):
+            for oUtt in self.iterTurnUtterances(turn, sXmlType, lstYears):
+                yield oUtt
+
+    # ----------------------------------------------------------------------------------
+    # Name :    iterParagraphs
+    # Goal :    Stream the paragraphs of one NTK xml file with all their sentences annotated,
+    #           for an export of the text itself (see ntkfolia): every sentence is kept,
+    #           with its tokens, its intensifier hits and its sentiment
+    # History:
+    # 18/oct/2026    ERK Created
     # ----------------------------------------------------------------------------------
-    def process_text(self, elAl, lstYears, aanspr, partij):
-        """Process this piece of text"""
+    def iterParagraphs(self, flInput, oAdv, bData = None):
+        """Yield (turn number, speaker turn record, sentences) for each paragraph of an XML file
+
+        The sentences are (text, lowercase tokens, hits, polarity, subjectivity, breakers)
+        tuples; the hits are the (start, end, form, type, column) tuples of AdvHandle.scan
+        and the breakers are the sentence breakers after the text, see Segmenter.segment_ends.
+        """
+
+        self.adv = oAdv
+        self.ok = True
+        iTurn = 0
+        for turn, sXmlType, lstYears in self.iterTurns(flInput, bData):
+            iTurn += 1
+            if sXmlType == "a":
+                lParagraphs = self.process_spreker(turn)
+            else:
+                lParagraphs = self.process_spreekbeurt(turn)
+            oTurn = None
+            for elAl, aanspr, partij in lParagraphs:
+                if oTurn is None:
+                    oTurn = self.getTurn(lstYears, aanspr, partij)
+                    if oTurn is None:
+                        self.ok = False
+                        return
+                lSentences = self.annotate_text(elAl.text)
+                if len(lSentences) > 0:
+                    yield iTurn, oTurn, lSentences
+
+    # ----------------------------------------------------------------------------------
+    # Name :    annotate_text
+    # Goal :    Get all sentences of paragraph [sLine] with their tokens, hits and sentiment
+    # History:
+    # 18/oct/2026    ERK Created
+    # ----------------------------------------------------------------------------------
+    def annotate_text(self, sLine):
+        """Get the (text, tokens, hits, polarity, subjectivity, breakers) of the sentences of a paragraph"""
+
+        if sLine == None:
+            return []
+        try:
+            lSentences = [(sText, wList, self.adv.scan(wList), sEnd)
+                          for sText, wList, sEnd in self.seg.segment_ends(sLine)]
+            if len(lSentences) == 0:
+                return []
+            # The sentiment of the whole paragraph in one go, as in process_text
+            lPolSubj = self.snt.get_analysis_batch([sText for sText, wList, lHits, sEnd in lSentences])
+            return [(sText, wList, lHits, tPolSubj[0], tPolSubj[1], sEnd)
+                    for (sText, wList, lHits, sEnd), tPolSubj in zip(lSentences, lPolSubj)]
+        except Exception:
+            # act
+            self.errHandle.DoError("ntk/annotate_text exception")
+            self.ok = False
+            return []
+
+    # ----------------------------------------------------------------------------------
+    # Name :    iterTextUtterances
+    # Goal :    Yield the utterance objects of loose paragraphs [lText], that are not
+    #           part of a file: plain text, or an <al> element as XML text
+    #           All paragraphs belong to one speaker turn: [lstYears], [aanspr], [partij]
+    # History:
+    # 18/oct/2026    ERK Created
+    # ----------------------------------------------------------------------------------
+    def iterTextUtterances(self, lText, oAdv, lstYears, aanspr = None, partij = None):
+        """Yield the utterance objects of paragraphs of text"""
+
+        self.adv = oAdv
+        self.ok = True
+        oTurn = self.getTurn(lstYears, aanspr, partij)
+        if oTurn == None:
+            self.ok = False
+            return
+        for sText in lText:
+            if sText.lstrip().startswith("<al"):
+                try:
+                    elAl = ET.fromstring(sText)
+                except ET.ParseError:
+                    self.errHandle.DoError("ntk/iterTextUtterances: not an <al> element")
+                    self.ok = False
+                    continue
+            else:
+                elAl = ET.Element("al")
+                elAl.text = sText
+            for oUtt in self.process_text(elAl, oTurn):
+                yield oUtt
+
+    # ----------------------------------------------------------------------------------
+    # Name :    iterTurns
+    # Goal :    Stream the speaker turns of an NTK xml file with the XML backend
+    # History:
+    # 18/oct/2026    ERK Created
+    # ----------------------------------------------------------------------------------
+    def iterTurns(self, flInput, bData = None):
+        """Yield (turn element, xml type, years) for each speaker turn in [flInput] (or in [bData])"""
+
+        if self.xml == "lxml":
+            return self.iterTurnsLxml(flInput, bData)
+        return self.iterTurnsEtree(flInput, bData)
+
+    # ----------------------------------------------------------------------------------
+    # Name :    iterTurnsEtree
+    # Goal :    Stream the speaker turns of an NTK xml file with xml.etree
+    #           Only one <spreker> (type A) or <spreekbeurt> (type B) is kept in memory
+    # History:
+    # 18/oct/2026    ERK Created
+    # 18/oct/2026    ERK Read .xml.gz and .xml.bz2 files too
+    # 18/oct/2026    ERK Memory-mapped input, see discover.open_xml
+    # ----------------------------------------------------------------------------------
+    def iterTurnsEtree(self, flInput, bData = None):
+        """Yield (turn element, xml type, years) for each speaker turn, see iterTurns"""
+
+        sXmlType = ""       # Kind of XML document we are processing
+        lstYears = []       # Years from...to
+        lStack = []         # Open elements: root first
+        iTurn = 0           # Depth of the speaker turn we are collecting
+
+        try:
+            # Validate: does flInput exist?
+            if bData == None and (not os.path.isfile(flInput)) : 
+                self.errHandle.DoError("Input file not found: " + flInput)
+                self.ok = False
+                return
+
+            # Positioned after the lines before the XML starts
+            with open_xml(flInput, bData) as f:
+                for sEvent, el in ET.iterparse(f, events=("start", "end")):
+                    if sEvent == "start":
+                        if len(lStack) == 0:
+                            # The root name determines how we will process
+                            sRootType = el.tag.lower()
+                            if sRootType == "handeling":
+                                sXmlType = "a"
+                                sTurn = "spreker"
+                                lPath = ["part", "item"]
+                            elif sRootType == "officiele-publicatie":
+                                sXmlType = "b"
+                                sTurn = "spreekbeurt"
+                                lPath = ["handelingen", "agendapunt"]
+                            else:
+                                # We don't know the XML type
+                                self.errHandle.Status("The XML type of this document is not known")
+                                self.ok = False
+                                return
+                        elif el.tag == sTurn and iTurn == 0 and len(lStack) > 2 and lStack[1].tag == lPath[0] and \
+                             any(x.tag == lPath[1] for x in lStack[2:]):
+                            # Start collecting this speaker turn
+                            iTurn = len(lStack)
+                        lStack.append(el)
+                        continue
+
+                    # This is an 'end' event
+                    lStack.pop()
+                    if len(lStack) == 0:
+                        # The root element is ready
+                        break
+                    iDepth = len(lStack)
+                    if iTurn > 0:
+                        if iDepth == iTurn:
+                            # A complete speaker turn: hand it over
+                            iTurn = 0
+                            yield el, sXmlType, lstYears
+                        else:
+                            # Still inside the speaker turn: keep the element
+                            continue
+                    elif iDepth == 2 and len(lstYears) == 0:
+                        # Basic facts: frontm > vergjaar (A) or metadata > meta @content (B)
+                        if sXmlType == "a" and el.tag == "vergjaar" and lStack[1].tag == "frontm":
+                            lstYears = re.findall(r"\d\d\d\d", el.text)
+                        elif sXmlType == "b" and el.tag == "meta" and lStack[1].tag == "metadata":
+                            lstYears = re.findall(r"\d\d\d\d", el.attrib['content'])
+                    # Whatever we do not need any more is removed from the tree
+                    el.clear()
+                    lStack[-1].remove(el)
+        except Exception:
+            # act
+            self.errHandle.DoError("ntk/iterTurns exception")
+            self.ok = False
+
+    # ----------------------------------------------------------------------------------
+    # Name :    iterTurnsLxml
+    # Goal :    Stream the speaker turns of an NTK xml file with lxml
+    #           The parser only reports the root, the year elements and the speaker turns;
+    #           libxml2 still builds all other elements, but they do not reach Python.
+    #           Each turn that has been handed over is removed again, together with
+    #           whatever came before it.
+    #           The turns and years are exactly the ones iterTurnsEtree finds
+    # History:
+    # 18/oct/2026    ERK Created
+    # ----------------------------------------------------------------------------------
+    def iterTurnsLxml(self, flInput, bData = None):
+        """Yield (turn element, xml type, years) for each speaker turn, see iterTurns"""
+
+        sXmlType = ""       # Kind of XML document we are processing
+        lstYears = []       # Years from...to
+
+        try:
+            from lxml import etree
+            # Validate: does flInput exist?
+            if bData == None and (not os.path.isfile(flInput)) : 
+                self.errHandle.DoError("Input file not found: " + flInput)
+                self.ok = False
+                return
+
+            # Positioned after the lines before the XML starts
+            with open_xml(flInput, bData) as f:
+                oEvents = etree.iterparse(f, events=("end",), remove_comments=True, remove_pis=True,
+                                          huge_tree=True, tag=["handeling", "officiele-publicatie", "vergjaar",
+                                                               "meta", "spreker", "spreekbeurt"])
+                for sEvent, el in oEvents:
+                    if sXmlType == "":
+                        # The root name determines how we will process
+                        root = el
+                        while root.getparent() is not None:
+                            root = root.getparent()
+                        sRootType = root.tag.lower()
+                        if sRootType == "handeling":
+                            sXmlType = "a"
+                            sTurn = "spreker"
+                            lPath = ["part", "item"]
+                            sYears = "vergjaar"
+                            sYearParent = "frontm"
+                        elif sRootType == "officiele-publicatie":
+                            sXmlType = "b"
+                            sTurn = "spreekbeurt"
+                            lPath = ["handelingen", "agendapunt"]
+                            sYears = "meta"
+                            sYearParent = "metadata"
+                        else:
+                            break
+                    sTag = el.tag
+                    if sTag == sTurn:
+                        # The open elements around [el]: root first
+                        lStack = list(el.iterancestors())
+                        lStack.reverse()
+                        if not self.isTurn(lStack, lPath):
+                            continue
+                        # A turn inside a turn is handed over with the outer one
+                        if any(x.tag == sTurn and self.isTurn(lStack[:i], lPath) for i, x in enumerate(lStack)):
+                            continue
+                        yield el, sXmlType, lstYears
+                        # Remove the turn and everything before it
+                        el.clear()
+                        for x in [el] + lStack[1:]:
+                            while x.getprevious() is not None:
+                                del x.getparent()[0]
+                    elif sTag == sYears and len(lstYears) == 0:
+                        # Basic facts: frontm > vergjaar (A) or metadata > meta @content (B)
+                        elParent = el.getparent()
+                        if elParent.tag == sYearParent and elParent.getparent() is not None and \
+                           elParent.getparent().getparent() is None:
+                            if sXmlType == "a":
+                                lstYears = re.findall(r"\d\d\d\d", el.text)
+                            else:
+                                lstYears = re.findall(r"\d\d\d\d", el.attrib['content'])
+                    elif el.getparent() is None:
+                        # The root element is ready
+                        break
+            if sXmlType == "":
+                # We don't know the XML type
+                self.errHandle.Status("The XML type of this document is not known")
+                self.ok = False
+        except Exception:
+            # act
+            self.errHandle.DoError("ntk/iterTurnsLxml exception")
+            self.ok = False
+
+    # ----------------------------------------------------------------------------------
+    # Name :    isTurn
+    # Goal :    Check whether a turn element inside the open elements [lStack] (root first)
+    #           is in the place where turns are taken from: root > lPath[0] > ... lPath[1] ...
+    # History:
+    # 18/oct/2026    ERK Created
+    # ----------------------------------------------------------------------------------
+    def isTurn(self, lStack, lPath):
+        return len(lStack) > 2 and lStack[1].tag == lPath[0] and any(x.tag == lPath[1] for x in lStack[2:])
+
+    # ----------------------------------------------------------------------------------
+    # Name :    iterTurnUtterances
+    # Goal :    Stream the utterance objects of one speaker turn
+    # History:
+    # 18/oct/2026    ERK Created
+    # ----------------------------------------------------------------------------------
+    def iterTurnUtterances(self, turn, sXmlType, lstYears):
+        """Yield the utterance objects of one <spreker> or <spreekbeurt>"""
+
+        if sXmlType == "a":
+            lParagraphs = self.process_spreker(turn)
+        else:
+            lParagraphs = self.process_spreekbeurt(turn)
+        oTurn = None
+        for elAl, aanspr, partij in lParagraphs:
+            if oTurn is None:
+                # The metadata record is made once and shared by all sentences of the turn
+                oTurn = self.getTurn(lstYears, aanspr, partij)
+                if oTurn is None:
+                    return
+            for oUtt in self.process_text(elAl, oTurn):
+                yield oUtt
+
+    # ----------------------------------------------------------------------------------
+    # Name :    getTurn
+    # Goal :    Get the shared record of a speaker turn in the years [lstYears]
+    # History:
+    # 18/oct/2026    ERK Created
+    # ----------------------------------------------------------------------------------
+    def getTurn(self, lstYears, aanspr, partij):
+        """Get the speakers.Turn of this speaker and party, or None if there are no years"""
 
         try:
             # Find out the from and to year
@@ -198,79 +596,205 @@ class ntk:
             else:
                 jaar_vanaf = lstYears[0]
                 jaar_tot = lstYears[1]
+            return self.turns.get(jaar_vanaf, jaar_tot, aanspr, partij)
+        except Exception:
+            # act
+            self.errHandle.DoError("ntk/getTurn exception")
+            return None
+
+    # ----------------------------------------------------------------------------------
+    # Name :    process_spreker
+    # Goal :    Get the paragraphs of one <spreker> of a type A (handeling) document
+    # History:
+    # 16/feb/2017    ERK Created
+    # 18/oct/2026    ERK Moved out of getUtteranceList
+    # ----------------------------------------------------------------------------------
+    def process_spreker(self, spreker):
+        """Yield (al, aanspr, partij) for the <al> texts of one <spreker>"""
+
+        # note the spreker details
+        wie = spreker.find("wie")
+        aanspr = "(onbekend)"
+        partij = "(onbekend)"
+        elAanspr = wie.find("aanspr")
+        elPartij = wie.find("partij")
+        if elAanspr != None:
+            aanspr = elAanspr.text
+        if elPartij != None:
+            partij = elPartij.text
+        # Iterate over all the utterances of this person
+        for al in spreker.iter("al"):
+            yield al, aanspr, partij
+
+    # ----------------------------------------------------------------------------------
+    # Name :    process_spreekbeurt
+    # Goal :    Get the paragraphs of one <spreekbeurt> of a type B (officiele-publicatie) document
+    # History:
+    # 16/feb/2017    ERK Created
+    # 18/oct/2026    ERK Moved out of getUtteranceList
+    # ----------------------------------------------------------------------------------
+    def process_spreekbeurt(self, spreekbeurt):
+        """Yield (al, aanspr, partij) for the <al> texts of one <spreekbeurt>"""
+
+        # Default values
+        aanspr = "(onbekend)"
+        partij = "(onbekend)"
+        # Get the spreker (there may only be ONE according to the DTD)
+        spreker = spreekbeurt.find("spreker")
+        # Retrieve voorvoegsels and achternaam
+        voorvoegsels = spreker.find("voorvoegsels").text
+        achternaam = spreker.find("naam").find("achternaam").text
+        # Note: we do NOT process the words of the Voorzitter
+        if achternaam != "voorzitter":
+            aanspr = voorvoegsels
+            # Try to retrieve the political party
+            politiek = spreker.find("politiek")
+            if politiek != None:
+                partij = politiek.text
+
+            # Iterate over the <al> elements i9n here
+            tekst = spreekbeurt.find("tekst")
+            for al in tekst.iter("al"):
+                yield al, aanspr, partij
+
+    # ----------------------------------------------------------------------------------
+    # Name :    process_text
+    # Goal :    Process one piece of <al> 
+    # History:
+    # 20/feb/2017    ERK Created
+    # 18/oct/2026    ERK Yield the utterances instead of collecting them
+    # 18/oct/2026    ERK The speaker turn record [oTurn] replaces years, speaker and party
+    # 18/oct/2026    ERK Prefilter: skip a paragraph without any token that starts a form
+    # 18/oct/2026    ERK Dedup: repeated sentences go to process_dedup
+    # ----------------------------------------------------------------------------------
+    def process_text(self, elAl, oTurn):
+        """Process this piece of text and yield its utterance objects"""
+
+        try:
             # Break up the utterance in lines
             sLine = elAl.text
-            if sLine != None:
-                # Change the newlines to spaces
-                sLine = sLine.replace("\n", " ")
-                sLine = sLine.replace("\r", "")
-                # Divide the line into parts divided by sentence breakers [.], [?], [!]
-                lLine = re.sub(self.reLineEnd, "\n", sLine).split(sep="\n")
-                # lLine = sLine.split("\n")
-                # Walk all lines
-                for sText in lLine:
-                    # Trim it
-                    sText = sText.strip().strip("\n").strip("\r")
-
-                    # double check if it is empty
-                    if sText != "":
-                    
-                        # ------------------- DEBUG -----------------------------
-                        #if "heel" in sText:
-                        #    iStop = 1
-                        # -------------------------------------------------------
-
-                        # Tokenize the text into words on the basis of spaces, stripping off metadata
-                        wList = re.sub(self.reNalpha, " ", sText).split()
-                        # Get a new count object -- this is method-dependant
-                        oCount = self.adv.getTypeCountObject(self.method)
-                        # Walk the list of words
-                        for wrd in wList:
-                            # Make sure the word is lower-case
-                            wrd = wrd.lower()
-                            # Get a match for this word 
-                            sType = self.adv.getType(wrd)
-                            # Do we have a match?
-                            if sType != "":
-                                # Counting is method-dependant
-                                if self.method == "compact":
-                                    oCount[sType] += 1
-                                elif self.method == "full":
-                                    oCount[wrd] += 1
-
-                        # Perform POS-tagging
-
-                        # Either: (a) at least one match or (b) 'lines' option is 'all'
-                        if self.lines == "all" or self.anyCountNonZero(oCount):
-                            # Prepare one utterance object
-                            oUtt = {}
-                            oUtt['jaar_van'] = jaar_vanaf
-                            oUtt['jaar_tot'] = jaar_tot
-                            oUtt['aanspr'] = aanspr
-                            oUtt['partij'] = partij
-                            oUtt['s'] = sText
-                            # Add 'Sentimentanalyse' scores
-                            tPolSubj = self.snt.get_analysis(sText)
-                            oUtt['polar'] = tPolSubj[0]     # first element of the tuple
-                            oUtt['subj'] = tPolSubj[1]      # second element of the tuple
-
-                            # TODO: implement 'intens'
-                            # oUtt['intens'] = 0            # TODO: 
-
-                            # Copy the counts
-                            oUtt['count'] = oCount
-                            # Add this object to the list
-                            self.lUtt.append(oUtt)
-
-            # Indicate all went well
-            return True
-        except:
+            if sLine != None and self.prefilter:
+                # One pass over the whole paragraph: without a candidate, no sentence has a hit
+                self.checked += 1
+                if not self.adv.hasCandidate(self.seg.words(sLine)):
+                    self.skipped += 1
+                    return
+            if sLine != None and self.dedup != None:
+                for oUtt in self.process_dedup(sLine, oTurn):
+                    yield oUtt
+            elif sLine != None:
+                # Walk all sentences: collect the ones of this paragraph we keep
+                lKeep = []
+                for sText, wList in self.seg.segment(sLine):
+                    # The sentence is trimmed and not empty, its words are tokenized and lower-case
+                    # Only the columns with a match get a count -- the column is method-dependant
+                    oCount = {}
+                    # Find single- and multi-word matches in one pass over the words
+                    for iStart, iEnd, sForm, sType, iCol in self.adv.scan(wList):
+                        if self.method == "compact":
+                            iCol = self.adv.getTypeCol(sType)
+                        oCount[iCol] = oCount.get(iCol, 0) + 1
+
+                    # Perform POS-tagging
+
+                    # Either: (a) at least one match or (b) 'lines' option is 'all'
+                    if self.lines == "all" or len(oCount) > 0:
+                        lKeep.append((sText, tuple(sorted(oCount.items()))))
+
+                if len(lKeep) > 0:
+                    # Add 'Sentimentanalyse' scores for the whole paragraph in one go
+                    lPolSubj = self.snt.get_analysis_batch([sText for sText, tCount in lKeep])
+
+                    # TODO: implement 'intens'
+
+                    for (sText, tCount), tPolSubj in zip(lKeep, lPolSubj):
+                        # Prepare one utterance object: polarity is the first element of the tuple,
+                        #   subjectivity the second one
+                        oUtt = Utterance(oTurn, sText, tPolSubj[0], tPolSubj[1], tCount)
+                        # Hand this object over to the next stage
+                        yield oUtt
+
+        except Exception:
             # act
             self.errHandle.DoError("ntk/process_text exception")
-            return False
 
 
 
+    # ----------------------------------------------------------------------------------
+    # Name :    process_dedup
+    # Goal :    Yield the utterances of paragraph [sLine] like process_text does, but take
+    #           the counts and sentiment of a sentence that was seen before from the table
+    #           A paragraph that was seen before (the very same text) is taken as a whole
+    # History:
+    # 18/oct/2026    ERK Created
+    # ----------------------------------------------------------------------------------
+    def process_dedup(self, sLine, oTurn):
+        """Yield the utterance objects of a paragraph, computing each sentence once"""
+
+        iPar = text_key(sLine)
+        tFound = self.paragraphs.get(iPar)
+        if tFound is not None:
+            self.reused += len(tFound)
+            for sText, tCount, iKey, tPolSubj in tFound:
+                yield Utterance(oTurn, sText, tPolSubj[0], tPolSubj[1], tCount, iKey)
+            return
+        oTable = self.dedup
+        bAll = self.lines == "all"
+        # The sentences we keep: [text, counts, group id, (polarity, subjectivity)]
+        lKeep = []
+        lNew = []
+        for sText, wList in self.seg.segment(sLine):
+            iKey = sentence_key(sText)
+            oFound = oTable.get(iKey)
+            if oFound is None:
+                self.computed += 1
+                oCount = {}
+                for iStart, iEnd, sForm, sType, iCol in self.adv.scan(wList):
+                    if self.method == "compact":
+                        iCol = self.adv.getTypeCol(sType)
+                    oCount[iCol] = oCount.get(iCol, 0) + 1
+                tCount = tuple(sorted(oCount.items()))
+                if bAll or len(tCount) > 0:
+                    lNew.append(len(lKeep))
+                    lKeep.append([sText, tCount, iKey, None])
+                else:
+                    # Not kept: a later copy does not even need the scan
+                    oTable.put(iKey, (tCount, None))
+            else:
+                self.reused += 1
+                tCount, tPolSubj = oFound
+                if bAll or len(tCount) > 0:
+                    lKeep.append([sText, tCount, iKey, tPolSubj])
+        if len(lNew) > 0:
+            # Sentiment only for the sentences that are new, in one go
+            lPolSubj = self.snt.get_analysis_batch([lKeep[iKeep][0] for iKeep in lNew])
+            for iKeep, tPolSubj in zip(lNew, lPolSubj):
+                lKeep[iKeep][3] = tPolSubj
+                oTable.put(lKeep[iKeep][2], (lKeep[iKeep][1], tPolSubj))
+        tKeep = tuple(tuple(lItem) for lItem in lKeep)
+        self.paragraphs.put(iPar, tKeep)
+        for sText, tCount, iKey, tPolSubj in tKeep:
+            yield Utterance(oTurn, sText, tPolSubj[0], tPolSubj[1], tCount, iKey)
+
+    # ----------------------------------------------------------------------------------
+    # Name :    get_stats
+    # Goal :    Get the sentiment counters and the prefilter counters of this handler
+    #           (and the dedup counters: sentences reused from the table and computed)
+    # History:
+    # 18/oct/2026    ERK Created
+    # 18/oct/2026    ERK Dedup counters
+    # ----------------------------------------------------------------------------------
+    def get_stats(self):
+        """Return the sentiment and prefilter counters"""
+
+        oStats = self.snt.get_stats()
+        oStats['checked'] = self.checked
+        oStats['skipped'] = self.skipped
+        if self.dedup != None:
+            oStats['reused'] = self.reused
+            oStats['computed'] = self.computed
+        return oStats
+
     # ----------------------------------------------------------------------------------
     # Name :    anyCountNonZero
     # Goal :    Check if any of the objects in [oCount] are non-zero
@@ -0,0 +1,187 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    pipeline
+# Goal :    Reader and writer stages around the parse/extract work of kamer
+#           The stages are threads connected by bounded queues, so that disk reads and
+#           output writes overlap with parsing while the memory use stays bounded
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import sys, time, threading, queue, collections
+import discover
+
+# ============================= LOCAL VARIABLES ====================================
+iRowBatch = 1000        # Number of rows handed to the writer thread at once
+
+# ----------------------------------------------------------------------------------
+# Name :    StageStats
+# Goal :    Busy/idle counters of one pipeline stage
+#           busy:    time spent doing the work of the stage
+#           idle:    time spent waiting for input
+#           blocked: time spent waiting for room in the queue of the next stage
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class StageStats:
+    """Counters of one pipeline stage"""
+
+    def __init__(self, sName, iThreads = 1):
+        self.name = sName
+        self.threads = iThreads
+        self.items = 0
+        self.busy = 0.0
+        self.idle = 0.0
+        self.blocked = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, fBusy = 0.0, fIdle = 0.0, fBlocked = 0.0, iItems = 0):
+        # Reader threads update the same counters
+        with self.lock:
+            self.busy += fBusy
+            self.idle += fIdle
+            self.blocked += fBlocked
+            self.items += iItems
+
+    def getLoad(self, fSeconds):
+        """Get the share of the available thread time that the stage was busy"""
+        return self.busy / max(fSeconds * self.threads, 1e-9)
+
+# ----------------------------------------------------------------------------------
+# Name :    Prefetcher
+# Goal :    Reader stage: a pool of threads that reads the raw bytes of the input files
+#           ahead of the parser. At most [iDepth] files are read ahead.
+# History:
+# 18/oct/2026    ERK Created
+# 18/oct/2026    ERK Plain files are memory-mapped instead of read
+# 18/oct/2026    ERK Read again: a memory map only moves the reading into the parser
+# ----------------------------------------------------------------------------------
+class Prefetcher:
+    """Read files ahead in background threads"""
+
+    def __init__(self, oErr, lFiles, iDepth = 4, iThreads = 2, oRead = None, oParse = None):
+        self.errHandle = oErr
+        self.files = lFiles
+        self.depth = max(iDepth, 1)
+        self.threads = max(iThreads, 1)
+        # Counters of this stage and of the stage that consumes the files
+        self.read = oRead if oRead != None else StageStats("read", self.threads)
+        self.parse = oParse if oParse != None else StageStats("parse")
+
+    def read_file(self, flThis):
+        """Get the (decompressed) bytes of [flThis], or None if it cannot be read
+
+        The bytes are really read here, and not memory-mapped: the page faults of a map
+        would happen in the parser, and the I/O would not be hidden behind it any more.
+        """
+
+        fStart = time.perf_counter()
+        try:
+            with discover.open_input(flThis) as f:
+                return f.read()
+        except:
+            # act
+            self.errHandle.DoError("Prefetcher/read_file: " + flThis)
+            return None
+        finally:
+            self.read.add(fBusy = time.perf_counter() - fStart, iItems = 1)
+
+    def __iter__(self):
+        """Yield (file name, contents) in the order of the file list"""
+
+        # Only imported here: serial runs without a reader stage do not need it
+        from concurrent.futures import ThreadPoolExecutor
+        oPool = ThreadPoolExecutor(self.threads)
+        # The bounded queue: files that are being read or wait to be parsed
+        qAhead = collections.deque()
+        iNext = 0
+        try:
+            while iNext < len(self.files) and len(qAhead) < self.depth:
+                qAhead.append((self.files[iNext], oPool.submit(self.read_file, self.files[iNext])))
+                iNext += 1
+            while len(qAhead) > 0:
+                flThis, oFuture = qAhead.popleft()
+                fStart = time.perf_counter()
+                bData = oFuture.result()
+                self.parse.add(fIdle = time.perf_counter() - fStart)
+                # Refill the queue before the parser starts on this file
+                if iNext < len(self.files):
+                    qAhead.append((self.files[iNext], oPool.submit(self.read_file, self.files[iNext])))
+                    iNext += 1
+                yield flThis, bData
+        finally:
+            for flThis, oFuture in qAhead:
+                oFuture.cancel()
+            oPool.shutdown(wait=True)
+
+# ----------------------------------------------------------------------------------
+# Name :    ThreadedWriter
+# Goal :    Writer stage: rows are collected in batches of [iBatch] and written by a
+#           separate thread. The queue holds at most [iDepth] batches: when it is full,
+#           the parser waits (backpressure).
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class ThreadedWriter:
+    """Wrap an output writer (see sinks) in a background thread"""
+
+    def __init__(self, writer, iDepth = 8, iBatch = iRowBatch, oWrite = None, oParse = None):
+        self.writer = writer
+        self.batchsize = max(iBatch, 1)
+        self.batch = []
+        self.error = None
+        self.write = oWrite if oWrite != None else StageStats("write")
+        self.parse = oParse if oParse != None else StageStats("parse")
+        self.queue = queue.Queue(max(iDepth, 1))
+        self.thread = threading.Thread(target=self.run, name="writer", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Body of the writer thread"""
+
+        while True:
+            fStart = time.perf_counter()
+            lBatch = self.queue.get()
+            fGot = time.perf_counter()
+            if lBatch is None:
+                self.write.add(fIdle = fGot - fStart)
+                break
+            if self.error is None:
+                try:
+                    self.writer.writerows(lBatch)
+                except Exception:
+                    # Keep emptying the queue, so the parser does not wait forever
+                    self.error = sys.exc_info()[1]
+            self.write.add(fBusy = time.perf_counter() - fGot, fIdle = fGot - fStart, iItems = len(lBatch))
+
+    def put(self, lBatch):
+        if self.error is not None:
+            raise self.error
+        fStart = time.perf_counter()
+        self.queue.put(lBatch)
+        self.parse.add(fBlocked = time.perf_counter() - fStart)
+
+    def writerow(self, row):
+        self.batch.append(row)
+        if len(self.batch) >= self.batchsize:
+            self.put(self.batch)
+            self.batch = []
+
+    def writerows(self, lRows):
+        for row in lRows:
+            self.batch.append(row)
+            if len(self.batch) >= self.batchsize:
+                self.put(self.batch)
+                self.batch = []
+
+    def close(self):
+        """Write what is left, wait for the writer thread and close the output"""
+
+        if len(self.batch) > 0:
+            self.put(self.batch)
+            self.batch = []
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        self.writer.close()
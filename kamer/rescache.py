@@ -0,0 +1,123 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+
+import os, csv, hashlib
+# gzip is only imported when the cache is used
+
+# The version is part of every key: raise it when the rows of a file change meaning
+cacheVersion = "1"
+
+# ----------------------------------------------------------------------------------
+# Name :    FileKey
+# Goal :    Compute the key that tells whether the results of an input file are still valid
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class FileKey:
+    """Key of an input file, given the adverb JSON and the run options"""
+
+    byhash = False      # Key on the content hash (True) or on path, mtime and size (False)
+    basekey = ""        # Part of the key that is the same for all files in a run
+
+    # ======================= CLASS INITIALIZER ========================================
+    def __init__(self, flAdverb, lOptions, bHash = False):
+        self.byhash = bHash
+        # The adverb JSON and the run options are shared by all files
+        oHash = hashlib.sha1(cacheVersion.encode("utf8"))
+        with open(flAdverb, "rb") as f:
+            oHash.update(f.read())
+        for sOption in lOptions:
+            oHash.update(b"\t" + str(sOption).encode("utf8"))
+        self.basekey = oHash.hexdigest()
+
+    def getKey(self, flThis):
+        """Get the key of input file [flThis]"""
+
+        oHash = hashlib.sha1(self.basekey.encode("utf8"))
+        if self.byhash:
+            with open(flThis, "rb") as f:
+                for bChunk in iter(lambda: f.read(1024 * 1024), b""):
+                    oHash.update(bChunk)
+        else:
+            oStat = os.stat(flThis)
+            oHash.update(os.path.abspath(flThis).encode("utf8"))
+            oHash.update(("\t%d\t%d" % (oStat.st_mtime_ns, oStat.st_size)).encode("utf8"))
+        return oHash.hexdigest()
+
+# ----------------------------------------------------------------------------------
+# Name :    ResultCache
+# Goal :    Keep the output rows of each input file, so that re-runs only process new files
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class ResultCache:
+    """Per-file cache of the extracted output rows"""
+
+    directory = ""      # Where the cache files live
+
+    # ======================= CLASS INITIALIZER ========================================
+    def __init__(self, oErr, sDir, flAdverb, lOptions, bHash = False):
+        self.errHandle = oErr
+        self.directory = sDir
+        if not os.path.isdir(sDir):
+            os.makedirs(sDir)
+        self.filekey = FileKey(flAdverb, lOptions, bHash)
+
+    def getKey(self, flThis):
+        """Get the cache key of input file [flThis]"""
+        return self.filekey.getKey(flThis)
+
+    def getPath(self, sKey):
+        """Get the name of the cache file for key [sKey]"""
+        return os.path.join(self.directory, sKey[0:2], sKey + ".tsv.gz")
+
+    def has(self, sKey):
+        """Check whether the rows for [sKey] are available"""
+        return os.path.isfile(self.getPath(sKey))
+
+    def read(self, sKey):
+        """Yield the cached rows for [sKey]"""
+
+        import gzip
+        with gzip.open(self.getPath(sKey), "rt", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f, csv.excel_tab):
+                yield row
+
+    def open(self, sKey):
+        """Start storing the rows for [sKey]"""
+        return CacheWriter(self.getPath(sKey))
+
+# ----------------------------------------------------------------------------------
+# Name :    CacheWriter
+# Goal :    Write the rows of one file; they only become visible after commit()
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class CacheWriter:
+    """Writer of one cache file"""
+
+    def __init__(self, flCache):
+        self.path = flCache
+        self.temp = flCache + ".tmp" + str(os.getpid())
+        sDir = os.path.dirname(flCache)
+        if not os.path.isdir(sDir):
+            os.makedirs(sDir, exist_ok=True)
+        import gzip
+        self.file = gzip.open(self.temp, "wt", encoding="utf-8", newline="", compresslevel=1)
+        self.writer = csv.writer(self.file, csv.excel_tab, lineterminator='\n')
+
+    def writerow(self, row):
+        self.writer.writerow(row)
+
+    def writerows(self, lRows):
+        self.writer.writerows(lRows)
+
+    def commit(self):
+        """The rows are complete: make them available"""
+        self.file.close()
+        os.replace(self.temp, self.path)
+
+    def discard(self):
+        """Something went wrong: forget these rows"""
+        self.file.close()
+        os.remove(self.temp)
@@ -0,0 +1,146 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    segment
+# Goal :    Split the text of an <al> paragraph into sentences and lowercase tokens
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import sys, os, re, json
+
+# ============================= LOCAL VARIABLES ====================================
+flCorpus = os.path.join(os.path.dirname(os.path.abspath(__file__)), "segment_corpus.json")
+
+# ----------------------------------------------------------------------------------
+# Name :    Segmenter
+# Goal :    Single-pass sentence splitter and tokenizer
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Segmenter:
+    """Sentence splitter and tokenizer for NTK paragraphs"""
+
+    translate = False   # Use the str.translate path instead of the compiled regex split
+
+    # ======================= CLASS INITIALIZER ========================================
+    def __init__(self, bTranslate = False):
+        self.translate = bTranslate
+        # Sentence breakers are [.], [?] and [!]
+        self.reLineEnd = re.compile(r"[\.\?\!]")
+        # The same, keeping the breakers in the result of split()
+        self.reBreaker = re.compile(r"([\.\?\!])")
+        # A token is a run of word characters
+        self.reWord = re.compile(r"\w+")
+        # Translate path: newline -> space, sentence breaker -> newline (one character each)
+        self.trans = str.maketrans("\n.?!", " \n\n\n")
+
+    def segment(self, sLine):
+        """Yield (sentence text, lowercase tokens) for the paragraph [sLine]"""
+
+        if self.translate:
+            # One translate call does the newline and breaker handling
+            lLine = sLine.replace("\r", "").translate(self.trans).split("\n")
+        else:
+            lLine = self.reLineEnd.split(sLine.replace("\n", " ").replace("\r", ""))
+        findall = self.reWord.findall
+        for sText in lLine:
+            # Trim it
+            sText = sText.strip()
+            # double check if it is empty
+            if sText != "":
+                yield sText, [wrd.lower() for wrd in findall(sText)]
+
+    def segment_ends(self, sLine):
+        """Yield (sentence text, lowercase tokens, breakers) for the paragraph [sLine]
+
+        The sentences and tokens are those of segment(). The breakers are the text after
+        the sentence up to the last sentence breaker before the next sentence (e.g. "?!"
+        or " ..."), or "" when the paragraph ends without one.
+        """
+
+        lParts = self.reBreaker.split(sLine.replace("\n", " ").replace("\r", ""))
+        findall = self.reWord.findall
+        sText = None
+        lEnd = []
+        for iPart, sPart in enumerate(lParts):
+            if iPart % 2 == 1 or sPart.strip() == "":
+                # A breaker, or nothing but spaces between two breakers
+                lEnd.append(sPart)
+                continue
+            if sText != None:
+                yield sText, [wrd.lower() for wrd in findall(sText)], "".join(lEnd).rstrip()
+            sText = sPart.strip()
+            lEnd = [sPart[len(sPart.rstrip()):]]
+        if sText != None:
+            yield sText, [wrd.lower() for wrd in findall(sText)], "".join(lEnd).rstrip()
+
+    def words(self, sLine):
+        """Get the lowercase tokens of the whole paragraph [sLine] in one pass
+
+        These are the tokens of all sentences that segment() yields, in the same order:
+        the sentence breakers and the spaces that are stripped are no word characters.
+        """
+
+        sLine = sLine.replace("\r", "")
+        if sLine.isascii():
+            # Lowercasing ASCII text does not move the token boundaries
+            return self.reWord.findall(sLine.lower())
+        return [wrd.lower() for wrd in self.reWord.findall(sLine)]
+
+# ----------------------------------------------------------------------------------
+# Name :    reference
+# Goal :    The segmentation as ntk.process_text did it before the Segmenter
+#           Only used to check that the Segmenter gives the same result
+# History:
+# 20/feb/2017    ERK Created
+# 18/oct/2026    ERK Moved out of ntk.process_text
+# ----------------------------------------------------------------------------------
+def reference(sLine):
+    reLineEnd = re.compile(r"[\.\?\!]")
+    reNalpha = re.compile(r"[^\w]")
+    lResult = []
+    # Change the newlines to spaces
+    sLine = sLine.replace("\n", " ")
+    sLine = sLine.replace("\r", "")
+    # Divide the line into parts divided by sentence breakers [.], [?], [!]
+    lLine = re.sub(reLineEnd, "\n", sLine).split(sep="\n")
+    for sText in lLine:
+        # Trim it
+        sText = sText.strip().strip("\n").strip("\r")
+        if sText != "":
+            wList = re.sub(reNalpha, " ", sText).split()
+            lResult.append((sText, [wrd.lower() for wrd in wList]))
+    return lResult
+
+# ----------------------------------------------------------------------------------
+# Name :    check
+# Goal :    Check the Segmenter against the regression corpus
+#           Returns the number of paragraphs that differ
+# History:
+# 18/oct/2026    ERK Created
+# 18/oct/2026    ERK Also check the paragraph tokens of the prefilter
+# 18/oct/2026    ERK Also check the sentences of segment_ends
+# ----------------------------------------------------------------------------------
+def check(flThis = flCorpus):
+    with open(flThis, encoding="utf8") as f:
+        lCorpus = json.load(f)
+    iFail = 0
+    for bTranslate in [False, True]:
+        oSeg = Segmenter(bTranslate)
+        for oItem in lCorpus:
+            lExpect = [(sText, lTokens) for sText, lTokens in oItem['sentences']]
+            sLine = oItem['paragraph']
+            lWords = [sWord for sText, lTokens in lExpect for sWord in lTokens]
+            lEnds = [(sText, lTokens) for sText, lTokens, sEnd in oSeg.segment_ends(sLine)]
+            if list(oSeg.segment(sLine)) != lExpect or reference(sLine) != lExpect or oSeg.words(sLine) != lWords or \
+               lEnds != lExpect:
+                print("Different segmentation (translate=%s): %r" % (bTranslate, sLine), file=sys.stderr)
+                iFail += 1
+    print("Segmenter: %d paragraphs checked twice, %d differences" % (len(lCorpus), iFail), file=sys.stderr)
+    return iFail
+
+# ----------------------------------------------------------------------------------
+# Goal :  If user calls this as main, then check the regression corpus
+# ----------------------------------------------------------------------------------
+if __name__ == "__main__":
+  sys.exit(1 if check(*sys.argv[1:2]) > 0 else 0)
@@ -1,27 +1,114 @@
 #! /usr/bin/env python3
 # -*- coding: utf8
 
-# from pattern.text.nl import sentiment # parse, split, sentiment
-from pattern.text.nl import sentiment
-# import text.nl
+import time, importlib, importlib.util
+from collections import OrderedDict
+# The backend (e.g. pattern.text.nl) is only imported on first use, see load_backend()
 
 class SentiAna:
     """Sentiment analyse"""
 
-    method = "pattern"      # The method to be taken
+    method = "pattern"      # The method to be taken: "off", "pattern" or the name of a plugin module
+    cachesize = 100000      # Maximum number of sentences in the cache
+    backend = None          # The sentiment function, once it has been loaded
+    keyfunc = None          # The cache key function of the backend, see load_backend()
 
     # ======================= CLASS INITIALIZER ========================================
-    def __init__(self, oErr):
+    def __init__(self, oErr, sMethod = None, iCacheSize = None):
         # Initialize a local array of word-elements
         self.errHandle = oErr
+        if sMethod != None:
+            self.method = sMethod
+        self.backend = None
+        self.keyfunc = None
+        if iCacheSize != None:
+            self.cachesize = iCacheSize
+        # Least-recently-used cache: normalized sentence -> score
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.seconds = 0.0
+
+    def check_backend(self):
+        """Check that the backend can be imported, without actually importing it"""
+
+        if self.method == "off":
+            return True
+        sModule = "pattern" if self.method == "pattern" else self.method
+        try:
+            return importlib.util.find_spec(sModule) != None
+        except:
+            return False
+
+    def load_backend(self):
+        """Import the sentiment backend: pattern, or a plugin module with a sentiment(text) function
+
+        The function must return a (polarity, subjectivity) tuple, just like pattern does.
+        A plugin may also have a normalize(text) function that gives the cache key of a
+        sentence; without one, only the spacing of the sentence is normalized.
+        """
+
+        if self.method == "pattern":
+            from pattern.text.nl import sentiment
+            self.backend = sentiment
+            # Pattern ignores case and spacing
+            self.keyfunc = lambda sSent: " ".join(sSent.lower().split())
+        else:
+            oModule = importlib.import_module(self.method)
+            self.backend = oModule.sentiment
+            self.keyfunc = getattr(oModule, "normalize", None)
+
+    def normalize(self, sSent):
+        """Get the cache key of a sentence: sentences with the same key get the same score"""
+
+        if self.keyfunc != None:
+            return self.keyfunc(sSent)
+        return " ".join(sSent.split())
 
     def get_analysis(self, sSent):
         """Return the sentiment-analysis of one sentence"""
 
         try:
-            score = sentiment(sSent)
-            return score
-        except: 
+            return self.get_analysis_batch([sSent])[0]
+        except:
             # act upon error
             self.errHandle.DoError("SentiAna/get_analysis")
             return None
+
+    def get_analysis_batch(self, lSent):
+        """Return the sentiment-analyses of a list of sentences"""
+
+        try:
+            if self.method == "off":
+                # No sentiment analysis: empty scores
+                return [(None, None)] * len(lSent)
+            fStart = time.perf_counter()
+            if self.backend is None:
+                self.load_backend()
+            sentiment = self.backend
+            lScore = []
+            oCache = self.cache
+            for sSent in lSent:
+                sKey = self.normalize(sSent)
+                score = oCache.get(sKey)
+                if score is None:
+                    self.misses += 1
+                    score = sentiment(sSent)
+                    oCache[sKey] = score
+                    if len(oCache) > self.cachesize:
+                        # Remove the least recently used sentence
+                        oCache.popitem(last=False)
+                else:
+                    self.hits += 1
+                    oCache.move_to_end(sKey)
+                lScore.append(score)
+            self.seconds += time.perf_counter() - fStart
+            return lScore
+        except:
+            # act upon error
+            self.errHandle.DoError("SentiAna/get_analysis_batch")
+            return None
+
+    def get_stats(self):
+        """Return the cache counters and the time spent on sentiment analysis"""
+        return {"hits": self.hits, "misses": self.misses, "seconds": self.seconds}
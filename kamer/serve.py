@@ -0,0 +1,396 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    serve
+# Goal :    Warm service mode of kamer: a local HTTP API (TCP or Unix socket) that keeps the
+#           lexicon, tokenizer and sentiment backend loaded in a pool of worker processes
+#           The asyncio front end parses the requests; the work goes to the pool
+#           Requests (JSON body) and responses (JSON lines, one utterance row per line):
+#             GET  /status                        service settings and counters
+#             POST /files  {"files": [path, ...]}                 rows of NTK xml files
+#             POST /text   {"text": [paragraph, ...], "years": "2010-2011",
+#                           "speaker": name, "party": name}       rows of loose paragraphs
+#           A paragraph is plain text or an <al> element
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import os, json, time, signal, socket, asyncio, http.client
+import concurrent.futures
+import util, advhandle, ntk, sinks
+
+# ============================= LOCAL VARIABLES ====================================
+iMaxBody = 16 * 1024 * 1024     # Largest request body that is accepted
+iMaxHeaders = 100               # Largest number of header lines of a request
+oReasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+sRows = "application/x-ndjson"  # Content type of the JSON lines
+oWorker = {}        # Per-process objects of a worker in the service pool
+
+# ----------------------------------------------------------------------------------
+# Name :    worker_init
+# Goal :    Prepare one worker process of the service pool: everything that a
+#           request needs is loaded here, once
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def worker_init(flAdverb, lBase, sMethod, sLines, sSentiment, sXml = "auto", bPrefilter = True):
+    # Ctrl-C is for the front end: it shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    oErr = util.ErrHandle()
+    oAdv = advhandle.AdvHandle(oErr)
+    oAdv.Load(flAdverb)
+    oNtk = ntk.ntk(oErr, sMethod, sLines, sSentiment, sXml, bPrefilter)
+    if sSentiment != "off":
+        # Import the sentiment backend now, not on the first request
+        oNtk.snt.load_backend()
+    oWorker['adv'] = oAdv
+    oWorker['ntk'] = oNtk
+    oWorker['fields'] = sinks.Schema(lBase, oAdv, sMethod).getFields()
+    oWorker['columns'] = len(oAdv.getColumns(sMethod))
+
+# ----------------------------------------------------------------------------------
+# Name :    worker_ping
+# Goal :    Nothing: makes the pool start a worker, so that it is warm before the first request
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def worker_ping():
+    return os.getpid()
+
+# ----------------------------------------------------------------------------------
+# Name :    worker_lines
+# Goal :    Get the utterances of [oUtts] as JSON lines (bytes), the number of lines
+#           and whether all went well; [oExtra] is added to every line
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def worker_lines(oUtts, oExtra = None):
+    lFields = oWorker['fields']
+    iColumns = oWorker['columns']
+    lLines = []
+    for oUtt in oUtts:
+        oRow = dict(zip(lFields, oUtt.getRow(iColumns)))
+        if oExtra != None:
+            oRow.update(oExtra)
+        lLines.append(json.dumps(oRow, ensure_ascii=False))
+    bLines = ("\n".join(lLines) + "\n").encode("utf-8") if len(lLines) > 0 else b""
+    return bLines, len(lLines), oWorker['ntk'].ok
+
+# ----------------------------------------------------------------------------------
+# Name :    worker_file
+# Goal :    Get the rows of NTK xml file [flThis] as JSON lines
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def worker_file(flThis):
+    if not os.path.isfile(flThis):
+        return error_line("No such file", flThis), 0, False
+    oNtk = oWorker['ntk']
+    try:
+        bLines, iRows, bOk = worker_lines(oNtk.iterUtterances(flThis, oWorker['adv']), {"File": flThis})
+    except Exception as ex:
+        oNtk.errHandle.DoError("serve/worker_file: " + flThis)
+        return error_line(str(ex), flThis), 0, False
+    if not bOk:
+        bLines += error_line("Could not process the file completely", flThis)
+    return bLines, iRows, bOk
+
+# ----------------------------------------------------------------------------------
+# Name :    worker_text
+# Goal :    Get the rows of the paragraphs [lText] of one speaker turn as JSON lines
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def worker_text(lText, lstYears, sSpeaker, sParty):
+    oNtk = oWorker['ntk']
+    try:
+        bLines, iRows, bOk = worker_lines(oNtk.iterTextUtterances(lText, oWorker['adv'], lstYears, sSpeaker, sParty))
+    except Exception as ex:
+        oNtk.errHandle.DoError("serve/worker_text")
+        return error_line(str(ex)), 0, False
+    if not bOk:
+        bLines += error_line("Could not process all paragraphs")
+    return bLines, iRows, bOk
+
+# ----------------------------------------------------------------------------------
+# Name :    error_line
+# Goal :    Get a JSON line that reports an error (of file [flThis])
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def error_line(sMsg, flThis = None):
+    oLine = {"error": sMsg}
+    if flThis != None:
+        oLine["File"] = flThis
+    return (json.dumps(oLine, ensure_ascii=False) + "\n").encode("utf-8")
+
+# ----------------------------------------------------------------------------------
+# Name :    RequestError
+# Goal :    A request that cannot be answered: the HTTP status and the message
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class RequestError(Exception):
+    """Error that is returned to the client"""
+
+    def __init__(self, iStatus, sMsg):
+        Exception.__init__(self, sMsg)
+        self.status = iStatus
+
+# ----------------------------------------------------------------------------------
+# Name :    Service
+# Goal :    The asyncio front end: HTTP/1.1 with keep-alive, one task per connection
+#           Requests run side by side; each file or text request is one pool task
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Service:
+    """Warm kamer service"""
+
+    def __init__(self, oErr, oSettings, lBase, iJobs = 2):
+        self.errHandle = oErr
+        self.settings = oSettings
+        self.jobs = max(iJobs, 1)
+        self.base = lBase
+        self.pool = None
+        self.server = None
+        self.started = time.time()
+        self.requests = 0       # Number of requests answered
+        self.rows = 0           # Number of utterance rows returned
+        self.failed = 0         # Number of files or texts that were not processed completely
+        self.busy = 0           # Number of requests being processed
+
+    def start_pool(self):
+        """Start the worker pool and wait until every worker is warm"""
+
+        oSet = self.settings
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            self.jobs, initializer=worker_init,
+            initargs=(oSet['adverb'], self.base, oSet['method'], oSet['lines'], oSet['sentiment'],
+                      oSet['xml'], oSet['prefilter']))
+        lPing = [self.pool.submit(worker_ping) for iJob in range(self.jobs)]
+        return len(set(oPing.result() for oPing in lPing))
+
+    async def run(self, sHost = "127.0.0.1", iPort = 8765, flSocket = ""):
+        """Serve until SIGINT or SIGTERM"""
+
+        oLoop = asyncio.get_running_loop()
+        oStop = asyncio.Event()
+        for iSignal in (signal.SIGINT, signal.SIGTERM):
+            oLoop.add_signal_handler(iSignal, oStop.set)
+        try:
+            if flSocket != "":
+                if os.path.exists(flSocket):
+                    os.remove(flSocket)
+                self.server = await asyncio.start_unix_server(self.handle, flSocket)
+                sWhere = "unix:" + flSocket
+            else:
+                self.server = await asyncio.start_server(self.handle, sHost, iPort)
+                sWhere = "http://%s:%d" % self.server.sockets[0].getsockname()[:2]
+            self.errHandle.Status("Serving on " + sWhere + " with %d workers" % self.jobs)
+            await oStop.wait()
+        finally:
+            if self.server != None:
+                self.server.close()
+                await self.server.wait_closed()
+            if flSocket != "" and os.path.exists(flSocket):
+                os.remove(flSocket)
+            self.pool.shutdown()
+            self.errHandle.Status("Service stopped: %d requests, %d rows" % (self.requests, self.rows))
+
+    async def handle(self, reader, writer):
+        """Answer the requests of one connection"""
+
+        try:
+            bKeep = True
+            while bKeep:
+                try:
+                    oRequest = await read_request(reader)
+                except RequestError as ex:
+                    await send_response(writer, ex.status, error_line(str(ex)), sRows, False)
+                    break
+                if oRequest == None:
+                    break
+                sMethod, sPath, oHeaders, bBody, bKeep = oRequest
+                try:
+                    iStatus, sType, bAnswer = await self.dispatch(sMethod, sPath, bBody)
+                except RequestError as ex:
+                    iStatus, sType, bAnswer = ex.status, sRows, error_line(str(ex))
+                except Exception as ex:
+                    self.errHandle.DoError("serve/handle: " + sPath)
+                    iStatus, sType, bAnswer = 500, sRows, error_line(str(ex))
+                self.requests += 1
+                await send_response(writer, iStatus, bAnswer, sType, bKeep)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # The client went away
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, sMethod, sPath, bBody):
+        """Get (status, content type, body) of one request"""
+
+        sPath = sPath.split("?", 1)[0]
+        if sPath == "/status":
+            if sMethod != "GET":
+                raise RequestError(405, "Use GET for " + sPath)
+            return 200, "application/json", (json.dumps(self.get_status()) + "\n").encode("utf-8")
+        if not sPath in ("/files", "/text"):
+            raise RequestError(404, "Unknown path: " + sPath)
+        if sMethod != "POST":
+            raise RequestError(405, "Use POST for " + sPath)
+        try:
+            oBody = json.loads(bBody.decode("utf-8"))
+        except ValueError:
+            raise RequestError(400, "The body is not JSON")
+        if not isinstance(oBody, dict):
+            raise RequestError(400, "The body is not a JSON object")
+        oLoop = asyncio.get_running_loop()
+        self.busy += 1
+        try:
+            if sPath == "/files":
+                lFiles = get_list(oBody, "files")
+                # One task per file: the files of a request are done side by side
+                lResults = await asyncio.gather(*[oLoop.run_in_executor(self.pool, worker_file, flThis)
+                                                  for flThis in lFiles])
+            else:
+                lText = get_list(oBody, "text")
+                lstYears = str(oBody.get("years", "")).split("-")
+                lResults = [await oLoop.run_in_executor(self.pool, worker_text, lText, lstYears,
+                                                        oBody.get("speaker"), oBody.get("party"))]
+        finally:
+            self.busy -= 1
+        for bLines, iRows, bOk in lResults:
+            self.rows += iRows
+            if not bOk:
+                self.failed += 1
+        return 200, sRows, b"".join(bLines for bLines, iRows, bOk in lResults)
+
+    def get_status(self):
+        """Get the settings and counters of the service"""
+
+        oSet = self.settings
+        return {'adverb': oSet['adverb'], 'method': oSet['method'], 'lines': oSet['lines'],
+                'sentiment': oSet['sentiment'], 'xml': ntk.xml_backend(oSet['xml']),
+                'workers': self.jobs,
+                'uptime': time.time() - self.started, 'requests': self.requests,
+                'busy': self.busy, 'rows': self.rows, 'failed': self.failed}
+
+# ----------------------------------------------------------------------------------
+# Name :    get_list
+# Goal :    Get member [sName] of request body [oBody] as a list of strings
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def get_list(oBody, sName):
+    oValue = oBody.get(sName)
+    if isinstance(oValue, str):
+        oValue = [oValue]
+    if not isinstance(oValue, list) or not all(isinstance(sItem, str) for sItem in oValue):
+        raise RequestError(400, 'Give "' + sName + '" as a string or a list of strings')
+    return oValue
+
+# ----------------------------------------------------------------------------------
+# Name :    read_request
+# Goal :    Read one HTTP request from [reader]
+#           Returns (method, path, headers, body, keep-alive), or None at the end of the connection
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+async def read_request(reader):
+    bLine = await reader.readline()
+    if bLine == b"":
+        return None
+    lParts = bLine.decode("latin-1").split()
+    if len(lParts) != 3 or not lParts[2].startswith("HTTP/"):
+        raise RequestError(400, "Not an HTTP request")
+    sMethod, sPath, sVersion = lParts
+    oHeaders = {}
+    for iLine in range(iMaxHeaders + 1):
+        bLine = await reader.readline()
+        if bLine in (b"\r\n", b"\n", b""):
+            break
+        if iLine == iMaxHeaders:
+            raise RequestError(400, "Too many headers")
+        sName, sSep, sValue = bLine.decode("latin-1").partition(":")
+        oHeaders[sName.strip().lower()] = sValue.strip()
+    try:
+        iLength = int(oHeaders.get("content-length", "0"))
+    except ValueError:
+        raise RequestError(400, "Wrong Content-Length")
+    if iLength > iMaxBody:
+        raise RequestError(413, "The body is larger than %d bytes" % iMaxBody)
+    bBody = await reader.readexactly(iLength) if iLength > 0 else b""
+    # HTTP/1.1 keeps the connection open unless asked not to; HTTP/1.0 the other way round
+    sConnection = oHeaders.get("connection", "").lower()
+    bKeep = sConnection != "close" if sVersion == "HTTP/1.1" else sConnection == "keep-alive"
+    return sMethod, sPath, oHeaders, bBody, bKeep
+
+# ----------------------------------------------------------------------------------
+# Name :    send_response
+# Goal :    Write an HTTP response with status [iStatus] and body [bBody]
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+async def send_response(writer, iStatus, bBody, sType, bKeep):
+    lHead = ["HTTP/1.1 %d %s" % (iStatus, oReasons.get(iStatus, "")),
+             "Content-Type: " + sType + "; charset=utf-8",
+             "Content-Length: %d" % len(bBody),
+             "Connection: " + ("keep-alive" if bKeep else "close")]
+    writer.write(("\r\n".join(lHead) + "\r\n\r\n").encode("latin-1") + bBody)
+    await writer.drain()
+
+# ----------------------------------------------------------------------------------
+# Name :    UnixConnection
+# Goal :    http.client connection over a Unix socket
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class UnixConnection(http.client.HTTPConnection):
+    """HTTP connection to a Unix socket"""
+
+    def __init__(self, flSocket, fTimeout = 60.0):
+        http.client.HTTPConnection.__init__(self, "localhost", timeout=fTimeout)
+        self.path = flSocket
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+# ----------------------------------------------------------------------------------
+# Name :    Client
+# Goal :    Client of the service, e.g. for a dashboard or the benchmark
+#           The connection is kept open between requests
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Client:
+    """Client of a kamer service"""
+
+    def __init__(self, sHost = "127.0.0.1", iPort = 8765, flSocket = "", fTimeout = 60.0):
+        if flSocket != "":
+            self.conn = UnixConnection(flSocket, fTimeout)
+        else:
+            self.conn = http.client.HTTPConnection(sHost, iPort, timeout=fTimeout)
+
+    def request(self, sMethod, sPath, oBody = None):
+        """Get (status, list of JSON lines) of one request"""
+
+        bBody = None if oBody == None else json.dumps(oBody).encode("utf-8")
+        self.conn.request(sMethod, sPath, bBody, {"Content-Type": "application/json"})
+        oResponse = self.conn.getresponse()
+        bData = oResponse.read()
+        return oResponse.status, [json.loads(sLine) for sLine in bData.decode("utf-8").splitlines() if sLine != ""]
+
+    def status(self):
+        return self.request("GET", "/status")[1][0]
+
+    def files(self, lFiles):
+        return self.request("POST", "/files", {"files": lFiles})[1]
+
+    def text(self, lText, sYears, sSpeaker = None, sParty = None):
+        return self.request("POST", "/text", {"text": lText, "years": sYears, "speaker": sSpeaker, "party": sParty})[1]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,321 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    shards
+# Goal :    Split one kamer run over N independent processes or machines (--shard i/N), and
+#           merge their outputs into the output that the run without shards would have written
+#           The partition only depends on the input files themselves (relative path and size),
+#           so every shard computes the same one without talking to the others
+#           Each shard writes a small manifest next to its output: which of the input files it
+#           covered, at which place of the full input list, and how many rows each file gave
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import os, io, csv, json, heapq, hashlib, itertools
+import sinks, speakers, dedup
+
+# ============================= LOCAL VARIABLES ====================================
+iShardManifest = 1      # Version of the shard manifest format
+sSuffix = ".shard.json" # The shard manifest is "<output file>.shard.json"
+lMergeFormats = ["tsv", "tsv.gz", "tsv.zst"]    # Row outputs that can be merged
+iShowFiles = 10         # Number of missing or doubled files that are named in a message
+
+# ----------------------------------------------------------------------------------
+# Name :    parse_shard
+# Goal :    Get (i, N) from shard selection "i/N", with 1 <= i <= N
+#           Raises ValueError if [sShard] is not a shard selection
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def parse_shard(sShard):
+    lParts = sShard.split("/")
+    if len(lParts) != 2 or not lParts[0].isdigit() or not lParts[1].isdigit():
+        raise ValueError("A shard is given as <i>/<N>, e.g. 2/4: " + sShard)
+    iShard, iShards = int(lParts[0]), int(lParts[1])
+    if iShards < 1 or iShard < 1 or iShard > iShards:
+        raise ValueError("Shard " + sShard + " does not exist: i runs from 1 to N")
+    return iShard, iShards
+
+# ----------------------------------------------------------------------------------
+# Name :    check_shard
+# Goal :    Return an error message if [sShard] is not a shard selection, otherwise ""
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def check_shard(sShard):
+    try:
+        parse_shard(sShard)
+    except ValueError as e:
+        return str(e)
+    return ""
+
+# ----------------------------------------------------------------------------------
+# Name :    partition
+# Goal :    Get the shard (0 .. iShards-1) of each file of [lFiles] (relative path, size)
+#           Largest file first, each file goes to the shard with the fewest bytes so far
+#           (the lowest shard on a tie); a file weighs one byte more than its size, so that
+#           empty files are spread too. The order of [lFiles] does not matter.
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def partition(lFiles, iShards):
+    lShard = [0] * len(lFiles)
+    lLoad = [(0, iShard) for iShard in range(iShards)]
+    for iFile in sorted(range(len(lFiles)), key=lambda iFile: (-lFiles[iFile][1], lFiles[iFile][0])):
+        iLoad, iShard = lLoad[0]
+        lShard[iFile] = iShard
+        heapq.heapreplace(lLoad, (iLoad + lFiles[iFile][1] + 1, iShard))
+    return lShard
+
+# ----------------------------------------------------------------------------------
+# Name :    list_digest
+# Goal :    Get a digest of the full input list [lFiles] (relative path, size), in order:
+#           shards of one run must all have seen the same list
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def list_digest(lFiles):
+    oHash = hashlib.blake2b(digest_size=16)
+    for sRel, iSize in lFiles:
+        oHash.update((sRel + "\t" + str(iSize) + "\n").encode("utf-8"))
+    return oHash.hexdigest()
+
+# ----------------------------------------------------------------------------------
+# Name :    Shard
+# Goal :    The files of one shard, in the order of the full input list, and what
+#           became of them; written as the shard manifest when the shard is done
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Shard:
+    """One shard of the input files"""
+
+    def __init__(self, flInput, lFound, iShard, iShards):
+        # Relative paths: the shards may see the input directory under different names
+        lRel = [(os.path.relpath(flThis, flInput).replace(os.sep, "/"), iSize) for flThis, iSize in lFound]
+        lShard = partition(lRel, iShards)
+        self.shard = iShard
+        self.shards = iShards
+        self.total = len(lFound)
+        self.bytes = sum(iSize for flThis, iSize in lFound)
+        self.digest = list_digest(lRel)
+        # Per file: [place in the full list, relative path, path, rows, ok]
+        self.files = [[iPos, lRel[iPos][0], lFound[iPos][0], 0, True]
+                      for iPos in range(len(lFound)) if lShard[iPos] == iShard - 1]
+        self.size = sum(lFound[oFile[0]][1] for oFile in self.files)
+        self.index = {oFile[2]: oFile for oFile in self.files}
+
+    def paths(self):
+        """Get the input files of this shard"""
+        return [oFile[2] for oFile in self.files]
+
+    def iter_file(self, flThis, lRows):
+        """Pass on the output rows of file [flThis], counting them"""
+
+        oFile = self.index[flThis]
+        oFile[3] = 0
+        for row in lRows:
+            oFile[3] += 1
+            yield row
+
+    def failed(self, flThis):
+        """File [flThis] could not be processed (completely)"""
+        self.index[flThis][4] = False
+
+    def write(self, flOutput, oOptions):
+        """Write the shard manifest of output file [flOutput]; [oOptions] are the settings of the run"""
+
+        oManifest = {'version': iShardManifest, 'shard': self.shard, 'shards': self.shards,
+                     'total': self.total, 'list': self.digest, 'output': os.path.basename(flOutput),
+                     'options': oOptions, 'files': self.files}
+        flManifest = flOutput + sSuffix
+        # Like the input manifest: an interrupted run must not leave half of one
+        flTemp = flManifest + ".tmp"
+        with open(flTemp, "w", encoding="utf8") as f:
+            json.dump(oManifest, f)
+        os.replace(flTemp, flManifest)
+        return flManifest
+
+# ----------------------------------------------------------------------------------
+# Name :    read_manifests
+# Goal :    Read the shard manifests of the shard outputs [lOutputs]
+#           Each manifest gets the path of its output file under 'path'
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def read_manifests(lOutputs):
+    lManifests = []
+    for flThis in lOutputs:
+        if not os.path.isfile(flThis + sSuffix):
+            raise ValueError("Not a shard output (no " + sSuffix + " next to it): " + flThis)
+        with open(flThis + sSuffix, encoding="utf8") as f:
+            oManifest = json.load(f)
+        if oManifest.get('version') != iShardManifest:
+            raise ValueError("Unknown shard manifest version: " + flThis + sSuffix)
+        oManifest['path'] = flThis
+        lManifests.append(oManifest)
+    return lManifests
+
+# ----------------------------------------------------------------------------------
+# Name :    check_coverage
+# Goal :    Get the list of problems of the shards [lManifests]: they must be shards of the
+#           same run, and together cover every input file exactly once
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def check_coverage(lManifests):
+    lMsg = []
+    oFirst = lManifests[0]
+    for oManifest in lManifests[1:]:
+        for sKey in ("shards", "total", "list", "options"):
+            if oManifest[sKey] != oFirst[sKey]:
+                lMsg.append("Shard output " + oManifest['path'] + " is not from the same run as " +
+                            oFirst['path'] + " (" + sKey + " differs)")
+                break
+    if len(lMsg) > 0:
+        return lMsg
+    # Every place in the full input list must be taken exactly once
+    lCovered = [[] for iPos in range(oFirst['total'])]
+    for oManifest in lManifests:
+        for oFile in oManifest['files']:
+            lCovered[oFile[0]].append(oFile[1])
+    lMissing = [iPos for iPos, lNames in enumerate(lCovered) if len(lNames) == 0]
+    lDouble = [iPos for iPos, lNames in enumerate(lCovered) if len(lNames) > 1]
+    lShards = sorted(set(range(1, oFirst['shards'] + 1)) - set(oManifest['shard'] for oManifest in lManifests))
+    if len(lShards) > 0:
+        lMsg.append("Missing shards: " + ", ".join("%d/%d" % (iShard, oFirst['shards']) for iShard in lShards))
+    if len(lMissing) > 0:
+        # The shards that are there cannot name a missing file: give its place in the full list
+        lMsg.append("%d of %d input files are not covered, e.g. %s" %
+                    (len(lMissing), oFirst['total'], ", ".join("#%d" % (iPos + 1) for iPos in lMissing[:iShowFiles])))
+    if len(lDouble) > 0:
+        lMsg.append("%d input files are covered more than once, e.g. %s" %
+                    (len(lDouble), ", ".join(lCovered[iPos][0] for iPos in lDouble[:iShowFiles])))
+    return lMsg
+
+# ----------------------------------------------------------------------------------
+# Name :    iter_files
+# Goal :    Yield (place, shard number, file) for the files of all shards [lManifests],
+#           in the order of the full input list: a k-way merge of the shard file lists
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def iter_files(lManifests):
+    return heapq.merge(*[shard_files(iShard, oManifest) for iShard, oManifest in enumerate(lManifests)])
+
+def shard_files(iShard, oManifest):
+    for oFile in oManifest['files']:
+        yield oFile[0], iShard, oFile
+
+# ----------------------------------------------------------------------------------
+# Name :    open_reader
+# Goal :    Open shard output [flThis] as a TSV reader: returns (file, reader, header)
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def open_reader(flThis, sFormat):
+    f = sinks.open_text(flThis, sFormat, "r")
+    reader = csv.reader(f, csv.excel_tab)
+    return f, reader, next(reader, None)
+
+# ----------------------------------------------------------------------------------
+# Name :    Header
+# Goal :    The columns of a merged output, as far as dedup.Tagger needs them
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Header:
+    """Column names of a shard output"""
+
+    def __init__(self, lFields):
+        self.fields = list(lFields)
+
+    def getIndex(self, sColumn):
+        return self.fields.index(sColumn)
+
+# ----------------------------------------------------------------------------------
+# Name :    merge_rows
+# Goal :    Merge the row outputs of the shards [lManifests] into [flOutput] (format [sFormat])
+#           The rows of a file are all in one shard: the files are merged on their place
+#           in the full input list, and their rows are copied as a block
+#           Dedup: the first occurrences are filled in again over the merged rows (a row that
+#           a shard dropped is also a repeat in the merged output)
+#           Returns (files, rows, failed files)
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def merge_rows(lManifests, flOutput, sFormat = "tsv"):
+    oOptions = lManifests[0]['options']
+    lReaders = []
+    fOut = None
+    try:
+        for oManifest in lManifests:
+            lReaders.append(open_reader(oManifest['path'], oManifest['options']['format']))
+        lHeader = lReaders[0][2]
+        for oManifest, oReader in zip(lManifests, lReaders):
+            if oReader[2] != lHeader:
+                raise ValueError("Shard output " + oManifest['path'] + " has other columns than " +
+                                 lManifests[0]['path'])
+        oTagger = None
+        if oOptions['dedup'] != "":
+            oHeader = Header(lHeader)
+            # The shards filled in their own first occurrences: those are left out, and put back by the tagger
+            iFirst = oHeader.getIndex(dedup.lColumns[1])
+            oTagger = dedup.Tagger(oHeader, oOptions['dedup'], oOptions['dedupsize'])
+        fOut = sinks.open_text(flOutput, sFormat, "w")
+        writer = csv.writer(fOut, csv.excel_tab, lineterminator="\n")
+        writer.writerow(lHeader)
+        iFiles = 0
+        iRows = 0
+        lFailed = []
+        for iPos, iShard, oFile in iter_files(lManifests):
+            iFiles += 1
+            iRows += oFile[3]
+            if not oFile[4]:
+                lFailed.append(oFile[2])
+            lRows = list(itertools.islice(lReaders[iShard][1], oFile[3]))
+            if len(lRows) < oFile[3]:
+                raise ValueError("Shard output " + lManifests[iShard]['path'] + " has fewer rows than its manifest")
+            if oTagger != None:
+                for row in lRows:
+                    del row[iFirst]
+                lRows = oTagger.iter_file(oFile[2], lRows)
+            writer.writerows(lRows)
+        for oManifest, oReader in zip(lManifests, lReaders):
+            if next(oReader[1], None) != None:
+                raise ValueError("Shard output " + oManifest['path'] + " has more rows than its manifest")
+        if oTagger != None:
+            iRows -= oTagger.dropped
+        return iFiles, iRows, lFailed
+    finally:
+        for oReader in lReaders:
+            oReader[0].close()
+        if fOut != None:
+            fOut.close()
+
+# ----------------------------------------------------------------------------------
+# Name :    merge_lookups
+# Goal :    Merge the lookup tables of the shard outputs [lManifests] (--ids) into [flLookup]
+#           The id of a name only depends on the name, so the tables can only disagree when
+#           they do not belong to the same run
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def merge_lookups(lManifests, flLookup):
+    oLookup = speakers.Lookup()
+    for oManifest in lManifests:
+        flThis = oManifest['path'] + ".lookup.tsv"
+        with io.open(flThis, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f, csv.excel_tab)
+            if next(reader, None) != speakers.lLookup:
+                raise ValueError("Not a lookup table: " + flThis)
+            for sKind, sId, sName in reader:
+                iId = int(sId)
+                oIds = oLookup.ids[sKind]
+                oNames = oLookup.names[sKind]
+                if oIds.get(sName, iId) != iId or oNames.get(iId, sName) != sName:
+                    raise ValueError("The lookup tables give different " + sKind + " ids to " + sName +
+                                     ": " + flThis + " does not belong to this run")
+                oIds[sName] = iId
+                oNames[iId] = sName
+    return oLookup.write(flLookup)
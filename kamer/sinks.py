@@ -0,0 +1,265 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    sinks
+# Goal :    Output writers for the rows of kamer: (compressed) TSV, Arrow IPC and Parquet
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import io, csv, json, importlib.util
+import speakers
+
+# ============================= LOCAL VARIABLES ====================================
+# Output format -> (python module that is needed, description)
+oFormats = {"tsv":     ("",           "tab-separated text"),
+            "tsv.gz":  ("",           "gzip-compressed tab-separated text"),
+            "tsv.zst": ("zstandard",  "zstd-compressed tab-separated text"),
+            "arrow":   ("pyarrow",    "Arrow IPC stream"),
+            "parquet": ("pyarrow",    "Parquet")}
+# Base column -> kind of name, for the columns that hold ids in --ids mode
+oIdColumns = {"Partij": "party", "Aanspreek": "speaker"}
+
+# ----------------------------------------------------------------------------------
+# Name :    Schema
+# Goal :    The columns of the output, shared by all output formats
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Schema:
+    """Column definition of the output rows"""
+
+    base = []           # The fixed columns: years, party, speaker, sentence, sentiment
+    counts = []         # One count column per adverb type ("compact") or form ("full")
+    ids = False         # Party and speaker are given as ids (see speakers.Lookup)
+
+    # ======================= CLASS INITIALIZER ========================================
+    def __init__(self, lBase, oAdv, sMethod, bIds = False):
+        self.ids = bIds
+        if bIds:
+            # The columns say that they hold ids: e.g. Partij_id
+            self.base = [sName + "_id" if sName in oIdColumns else sName for sName in lBase]
+        else:
+            self.base = list(lBase)
+        # AdvHandle defines the names of the count columns
+        self.counts = oAdv.addTypes([], sMethod)
+
+    def getFields(self):
+        """Get the header: all column names in output order"""
+        return self.base + self.counts
+
+    def getIndex(self, sColumn):
+        """Get the position of base column [sColumn] in a row"""
+        if self.ids and sColumn in oIdColumns:
+            sColumn += "_id"
+        return self.base.index(sColumn)
+
+# ----------------------------------------------------------------------------------
+# Name :    check_format
+# Goal :    Return an error message if [sFormat] cannot be written, otherwise ""
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def check_format(sFormat):
+    if not sFormat in oFormats:
+        return "Unknown output format: " + sFormat + " (choose from " + ", ".join(oFormats) + ")"
+    sModule = oFormats[sFormat][0]
+    if sModule != "" and importlib.util.find_spec(sModule) == None:
+        return "Output format " + sFormat + " needs the python package " + sModule
+    return ""
+
+# ----------------------------------------------------------------------------------
+# Name :    open_sink
+# Goal :    Open the writer for output format [sFormat]
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def open_sink(sFormat, flOutput, oSchema, iBatch = 10000):
+    if sFormat in ("arrow", "parquet"):
+        return ArrowSink(flOutput, oSchema, sFormat, iBatch)
+    return TsvSink(flOutput, oSchema, sFormat)
+
+# ----------------------------------------------------------------------------------
+# Name :    open_text
+# Goal :    Open the text of TSV file [flName] of format [sFormat] for reading ("r")
+#           or writing ("w"); the .gz and .zst formats are (de)compressed on the fly
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def open_text(flName, sFormat = "tsv", sMode = "w"):
+    if sFormat == "tsv.gz":
+        import gzip
+        return gzip.open(flName, sMode + "t", encoding='utf-8', newline='')
+    elif sFormat == "tsv.zst":
+        import zstandard
+        fRaw = open(flName, sMode + "b")
+        if sMode == "r":
+            oStream = zstandard.ZstdDecompressor().stream_reader(fRaw, closefd=True)
+        else:
+            oStream = zstandard.ZstdCompressor().stream_writer(fRaw)
+        return io.TextIOWrapper(oStream, encoding='utf-8', newline='')
+    return io.open(flName, sMode, encoding='utf-8', newline='')
+
+# ----------------------------------------------------------------------------------
+# Name :    IdWriter
+# Goal :    Replace party and speaker by their stable ids before the rows go to
+#           [writer]; the names are written to the lookup table [flLookup] on close
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class IdWriter:
+    """Write party and speaker ids instead of names"""
+
+    def __init__(self, writer, oSchema, flLookup):
+        self.writer = writer
+        self.file = flLookup
+        self.lookup = speakers.Lookup()
+        self.columns = [(oSchema.getIndex(sColumn), sKind) for sColumn, sKind in oIdColumns.items()]
+
+    def convert(self, row):
+        getId = self.lookup.getId
+        # Rows may be shared with the result cache: do not change them in place
+        row = list(row)
+        for iCol, sKind in self.columns:
+            row[iCol] = getId(sKind, row[iCol])
+        return row
+
+    def writerow(self, row):
+        self.writer.writerow(self.convert(row))
+
+    def writerows(self, lRows):
+        self.writer.writerows([self.convert(row) for row in lRows])
+
+    def close(self):
+        self.writer.close()
+        self.lookup.write(self.file)
+
+# ----------------------------------------------------------------------------------
+# Name :    TsvSink
+# Goal :    Tab-separated text, optionally gzip or zstd compressed
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class TsvSink:
+    """Write rows as tab-separated text"""
+
+    def __init__(self, flOutput, oSchema, sFormat = "tsv"):
+        self.schema = oSchema
+        self.file = open_text(flOutput, sFormat, "w")
+        self.writer = csv.writer(self.file, csv.excel_tab, lineterminator='\n')
+        # Create the first row with the headings
+        self.writer.writerow(oSchema.getFields())
+
+    def writerow(self, row):
+        self.writer.writerow(row)
+
+    def writerows(self, lRows):
+        self.writer.writerows(lRows)
+
+    def close(self):
+        self.file.close()
+
+# ----------------------------------------------------------------------------------
+# Name :    ArrowSink
+# Goal :    Arrow IPC stream or Parquet, written in batches of [iBatch] rows
+#           Party and speaker are dictionary-encoded (or 32-bit ids in --ids mode);
+#           the counts are stored sparsely
+#           as two list columns: the count column numbers and their counts.
+#           The names of the count columns are in the schema metadata.
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class ArrowSink:
+    """Write rows as Arrow record batches"""
+
+    def __init__(self, flOutput, oSchema, sFormat = "arrow", iBatch = 10000):
+        import pyarrow
+        self.pa = pyarrow
+        self.schema = oSchema
+        self.batch = iBatch
+        self.format = sFormat
+        self.base = len(oSchema.base)
+        self.dictionary = []
+        self.ids = []
+        if oSchema.ids:
+            self.ids = [oSchema.getIndex('Partij'), oSchema.getIndex('Aanspreek')]
+        else:
+            self.dictionary = [oSchema.getIndex('Partij'), oSchema.getIndex('Aanspreek')]
+        self.floats = [oSchema.getIndex('Subjectivity'), oSchema.getIndex('Polarity')]
+        # Dedup mode: the duplicate group id is a 63-bit number
+        self.ints = [oSchema.getIndex('Dup_group')] if 'Dup_group' in oSchema.base else []
+        lFields = []
+        for iCol, sName in enumerate(oSchema.base):
+            if iCol in self.dictionary:
+                oType = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+            elif iCol in self.ids:
+                oType = pyarrow.int64()
+            elif iCol in self.floats:
+                oType = pyarrow.float64()
+            elif iCol in self.ints:
+                oType = pyarrow.int64()
+            else:
+                oType = pyarrow.string()
+            lFields.append(pyarrow.field(sName, oType))
+        lFields.append(pyarrow.field("Count_col", pyarrow.list_(pyarrow.int32())))
+        lFields.append(pyarrow.field("Count_n", pyarrow.list_(pyarrow.int32())))
+        self.arrowschema = pyarrow.schema(lFields, metadata={"count_columns": json.dumps(oSchema.counts)})
+        if sFormat == "parquet":
+            import pyarrow.parquet
+            self.writer = pyarrow.parquet.ParquetWriter(flOutput, self.arrowschema)
+        else:
+            # The stream format allows each batch to have its own dictionaries
+            self.writer = pyarrow.ipc.new_stream(flOutput, self.arrowschema)
+        self.columns = [[] for i in range(len(lFields))]
+        self.rows = 0
+
+    def writerow(self, row):
+        iBase = self.base
+        lColumns = self.columns
+        for iCol in range(iBase):
+            oValue = row[iCol]
+            if iCol in self.floats:
+                # Rows from the result cache are text; sentiment 'off' gives empty values
+                oValue = None if oValue == None or oValue == "" else float(oValue)
+            elif iCol in self.ints:
+                oValue = int(oValue)
+            lColumns[iCol].append(oValue)
+        lCol = []
+        lCount = []
+        for iCol in range(iBase, len(row)):
+            iCount = int(row[iCol])
+            if iCount != 0:
+                lCol.append(iCol - iBase)
+                lCount.append(iCount)
+        lColumns[iBase].append(lCol)
+        lColumns[iBase + 1].append(lCount)
+        self.rows += 1
+        if self.rows >= self.batch:
+            self.flush()
+
+    def writerows(self, lRows):
+        for row in lRows:
+            self.writerow(row)
+
+    def flush(self):
+        """Write the collected rows as one record batch"""
+
+        if self.rows == 0:
+            return
+        pa = self.pa
+        lArrays = []
+        for iCol, oField in enumerate(self.arrowschema):
+            if iCol in self.dictionary:
+                lArrays.append(pa.array(self.columns[iCol], pa.string()).dictionary_encode())
+            else:
+                lArrays.append(pa.array(self.columns[iCol], oField.type))
+        oBatch = pa.RecordBatch.from_arrays(lArrays, schema=self.arrowschema)
+        if self.format == "parquet":
+            self.writer.write_table(pa.Table.from_batches([oBatch]))
+        else:
+            self.writer.write_batch(oBatch)
+        self.columns = [[] for oField in self.arrowschema]
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
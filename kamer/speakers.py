@@ -0,0 +1,114 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    speakers
+# Goal :    Speaker turn records that are shared by all sentences of a turn, and stable
+#           integer ids for the speaker and party names
+#           The id of a name is a function of the name alone, so that worker processes,
+#           cached rows, shards and later runs all give the same name the same id
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import sys, io, csv, hashlib
+
+# ============================= LOCAL VARIABLES ====================================
+lKinds = ["party", "speaker"]   # Kinds of names that get an id
+lLookup = ["Kind", "Id", "Name"]    # Columns of the lookup table
+
+# ----------------------------------------------------------------------------------
+# Name :    name_id
+# Goal :    Get the stable id of name [sName]: 63 bits of its BLAKE2 hash
+#           A missing or empty name has id 0
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def name_id(sName):
+    if sName == None or sName == "":
+        return 0
+    bDigest = hashlib.blake2b(sName.encode("utf-8"), digest_size=8).digest()
+    return (int.from_bytes(bDigest, "big") >> 1) or 1
+
+# ----------------------------------------------------------------------------------
+# Name :    Lookup
+# Goal :    The names that were given an id, per kind; written next to the output
+#           Ids are not probed: two names of one kind with the same 63-bit hash are an
+#           error rather than an id that depends on which name came first
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Lookup:
+    """Table of name ids"""
+
+    def __init__(self):
+        self.ids = {sKind: {} for sKind in lKinds}      # Kind -> name -> id
+        self.names = {sKind: {} for sKind in lKinds}    # Kind -> id -> name
+
+    def getId(self, sKind, sName):
+        """Get the id of name [sName] of kind [sKind], adding it to the table if it is new"""
+
+        oIds = self.ids[sKind]
+        iId = oIds.get(sName)
+        if iId is None:
+            iId = name_id(sName)
+            oNames = self.names[sKind]
+            if oNames.get(iId, sName or "") != (sName or ""):
+                raise ValueError("The " + sKind + " names " + oNames[iId] + " and " + sName + " have the same id")
+            oIds[sName] = iId
+            oNames[iId] = sName or ""
+        return iId
+
+    def write(self, flOut):
+        """Write the table as tab-separated text: kind, id, name"""
+
+        with io.open(flOut, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, csv.excel_tab, lineterminator="\n")
+            writer.writerow(lLookup)
+            for sKind in lKinds:
+                oNames = self.names[sKind]
+                for iId in sorted(oNames, key=lambda iId: oNames[iId]):
+                    writer.writerow([sKind, iId, oNames[iId]])
+        return sum(len(oNames) for oNames in self.names.values())
+
+# ----------------------------------------------------------------------------------
+# Name :    Turn
+# Goal :    Metadata of one speaker turn: every sentence of the turn refers to it
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Turn:
+    """Years, speaker and party of a speaker turn"""
+
+    __slots__ = ('jaar_van', 'jaar_tot', 'aanspr', 'partij')
+
+    def __init__(self, jaar_van, jaar_tot, aanspr, partij):
+        self.jaar_van = jaar_van
+        self.jaar_tot = jaar_tot
+        self.aanspr = aanspr
+        self.partij = partij
+
+# ----------------------------------------------------------------------------------
+# Name :    Turns
+# Goal :    Hand out one Turn record per distinct (years, speaker, party), with the
+#           strings interned: a speaker who speaks a hundred times is stored once
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Turns:
+    """Registry of shared turn records"""
+
+    def __init__(self):
+        self.records = {}       # (jaar_van, jaar_tot, aanspr, partij) -> Turn
+
+    def get(self, jaar_van, jaar_tot, aanspr, partij):
+        """Get the record of a turn with these years, speaker and party"""
+
+        tKey = (jaar_van, jaar_tot, aanspr, partij)
+        oTurn = self.records.get(tKey)
+        if oTurn is None:
+            lValues = [sys.intern(sValue) if isinstance(sValue, str) else sValue for sValue in tKey]
+            oTurn = Turn(lValues[0], lValues[1], lValues[2], lValues[3])
+            self.records[tuple(lValues)] = oTurn
+        return oTurn
+
+    def __len__(self):
+        return len(self.records)
@@ -0,0 +1,193 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    store
+# Goal :    SQLite store of the utterances, to query them without re-parsing the XML
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import os, sqlite3, json
+
+# ============================= LOCAL VARIABLES ====================================
+lTables = ["""CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)""",
+           """CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, key TEXT)""",
+           """CREATE TABLE IF NOT EXISTS forms (id INTEGER PRIMARY KEY, name TEXT, word TEXT)""",
+           """CREATE TABLE IF NOT EXISTS sentences (id INTEGER PRIMARY KEY, file_id INTEGER,
+                  jaar_van INTEGER, jaar_tot INTEGER, partij TEXT, aanspr TEXT, sentence TEXT,
+                  subj REAL, polar REAL)""",
+           """CREATE TABLE IF NOT EXISTS counts (sentence_id INTEGER, form_id INTEGER, n INTEGER,
+                  PRIMARY KEY (sentence_id, form_id)) WITHOUT ROWID""",
+           """CREATE INDEX IF NOT EXISTS sentences_file ON sentences (file_id)""",
+           """CREATE INDEX IF NOT EXISTS sentences_year ON sentences (jaar_van, jaar_tot)""",
+           """CREATE INDEX IF NOT EXISTS sentences_party ON sentences (partij)""",
+           """CREATE INDEX IF NOT EXISTS counts_form ON counts (form_id, sentence_id)""",
+           """CREATE INDEX IF NOT EXISTS forms_word ON forms (word)"""]
+# Full text search on the sentences, kept up to date by triggers
+lSearch = ["""CREATE VIRTUAL TABLE IF NOT EXISTS sentences_fts
+                  USING fts5(sentence, content='sentences', content_rowid='id')""",
+           """CREATE TRIGGER IF NOT EXISTS sentences_ai AFTER INSERT ON sentences BEGIN
+                  INSERT INTO sentences_fts (rowid, sentence) VALUES (new.id, new.sentence); END""",
+           """CREATE TRIGGER IF NOT EXISTS sentences_ad AFTER DELETE ON sentences BEGIN
+                  INSERT INTO sentences_fts (sentences_fts, rowid, sentence)
+                  VALUES ('delete', old.id, old.sentence); END"""]
+
+# ----------------------------------------------------------------------------------
+# Name :    file_path
+# Goal :    Get the path under which input file [flThis] is stored: the real absolute path,
+#           so that one file is one row however the input directory was given
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def file_path(flThis):
+    return os.path.realpath(flThis)
+
+# ----------------------------------------------------------------------------------
+# Name :    Store
+# Goal :    Read and write the SQLite utterance store
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class Store:
+    """SQLite store of utterances with per-form counts"""
+
+    search = True       # Whether the FTS5 table is available
+
+    # ======================= CLASS INITIALIZER ========================================
+    def __init__(self, oErr, flDatabase):
+        self.errHandle = oErr
+        self.db = sqlite3.connect(flDatabase)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for sSql in lTables:
+            self.db.execute(sSql)
+        try:
+            for sSql in lSearch:
+                self.db.execute(sSql)
+            self.search = True
+        except sqlite3.OperationalError:
+            # This SQLite has no FTS5: text queries fall back to LIKE
+            self.search = False
+        self.db.commit()
+        self.forms = {}
+
+    def getMeta(self, sName):
+        oRow = self.db.execute("SELECT value FROM meta WHERE name = ?", (sName,)).fetchone()
+        return None if oRow == None else oRow[0]
+
+    def setMeta(self, sName, sValue):
+        self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (sName, sValue))
+
+    def prepare(self, oSchema, sBaseKey):
+        """Get ready for ingesting rows with columns [oSchema], made with options [sBaseKey]
+
+        When the adverbs or options differ from the ones the store was made with, all
+        stored rows are removed: they can no longer be compared with new ones.
+        """
+
+        self.schema = oSchema
+        if self.getMeta("basekey") != sBaseKey:
+            self.db.execute("DELETE FROM counts")
+            self.db.execute("DELETE FROM sentences")
+            self.db.execute("DELETE FROM files")
+            self.db.execute("DELETE FROM forms")
+            for iCol, sName in enumerate(oSchema.counts):
+                # The word is the form in "full" (type.form) and the type in "compact"
+                self.db.execute("INSERT INTO forms (id, name, word) VALUES (?, ?, ?)",
+                                (iCol, sName, sName.split(".", 1)[-1]))
+            self.setMeta("basekey", sBaseKey)
+            self.setMeta("columns", json.dumps(oSchema.getFields()))
+            self.db.commit()
+
+    def isCurrent(self, flThis, sKey):
+        """Check whether the rows of [flThis] in the store were made from the same input"""
+        oRow = self.db.execute("SELECT key FROM files WHERE path = ?", (file_path(flThis),)).fetchone()
+        return oRow != None and oRow[0] == sKey
+
+    def putFile(self, flThis, sKey, lRows, fnOk):
+        """Replace the rows of [flThis] by [lRows]; keep them if fnOk() says all went well"""
+
+        oDb = self.db
+        iBase = len(self.schema.base)
+        try:
+            sPath = file_path(flThis)
+            # Stores made before the paths were normalized may have the path as it was given
+            for oRow in oDb.execute("SELECT id FROM files WHERE path IN (?, ?)", (sPath, flThis)).fetchall():
+                # Re-ingest: remove what we had for this file
+                oDb.execute("DELETE FROM counts WHERE sentence_id IN (SELECT id FROM sentences WHERE file_id = ?)",
+                            (oRow[0],))
+                oDb.execute("DELETE FROM sentences WHERE file_id = ?", (oRow[0],))
+                oDb.execute("DELETE FROM files WHERE id = ?", (oRow[0],))
+            iFile = oDb.execute("INSERT INTO files (path, key) VALUES (?, ?)", (sPath, sKey)).lastrowid
+            for row in lRows:
+                iSent = oDb.execute("INSERT INTO sentences (file_id, jaar_van, jaar_tot, partij, aanspr, sentence, subj, polar) " +
+                                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                    (iFile, to_int(row[0]), to_int(row[1]), row[2], row[3], row[4],
+                                     to_float(row[5]), to_float(row[6]))).lastrowid
+                lCounts = []
+                for iCol in range(iBase, len(row)):
+                    iCount = int(row[iCol])
+                    if iCount != 0:
+                        lCounts.append((iSent, iCol - iBase, iCount))
+                if len(lCounts) > 0:
+                    oDb.executemany("INSERT INTO counts (sentence_id, form_id, n) VALUES (?, ?, ?)", lCounts)
+            if fnOk():
+                oDb.commit()
+                return True
+            oDb.rollback()
+            return False
+        except:
+            oDb.rollback()
+            self.errHandle.DoError("Store/putFile: " + flThis)
+            return False
+
+    def query(self, sParty = None, iFrom = None, iTo = None, sForm = None, sText = None, iLimit = None):
+        """Yield (jaar_van, jaar_tot, partij, aanspr, sentence, subj, polar, path) rows that match"""
+
+        lWhere = []
+        lArgs = []
+        sFrom = "sentences s JOIN files f ON f.id = s.file_id"
+        if sText != None:
+            if self.search:
+                sFrom += " JOIN sentences_fts ON sentences_fts.rowid = s.id"
+                lWhere.append("sentences_fts MATCH ?")
+                lArgs.append(sText)
+            else:
+                lWhere.append("s.sentence LIKE ?")
+                lArgs.append("%" + sText + "%")
+        if sParty != None:
+            lWhere.append("s.partij = ?")
+            lArgs.append(sParty)
+        if iFrom != None:
+            lWhere.append("s.jaar_tot >= ?")
+            lArgs.append(iFrom)
+        if iTo != None:
+            lWhere.append("s.jaar_van <= ?")
+            lArgs.append(iTo)
+        if sForm != None:
+            lWhere.append("s.id IN (SELECT c.sentence_id FROM counts c JOIN forms w ON w.id = c.form_id " +
+                          "WHERE w.word = ? OR w.name = ?)")
+            lArgs.extend([sForm, sForm])
+        sSql = "SELECT s.jaar_van, s.jaar_tot, s.partij, s.aanspr, s.sentence, s.subj, s.polar, f.path FROM " + sFrom
+        if len(lWhere) > 0:
+            sSql += " WHERE " + " AND ".join(lWhere)
+        sSql += " ORDER BY s.id"
+        if iLimit != None:
+            sSql += " LIMIT ?"
+            lArgs.append(iLimit)
+        for oRow in self.db.execute(sSql, lArgs):
+            yield oRow
+
+    def close(self):
+        self.db.close()
+
+# ----------------------------------------------------------------------------------
+# Name :    to_int, to_float
+# Goal :    Convert a value of an output row; rows from the result cache are text
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def to_int(oValue):
+    return None if oValue == None or oValue == "" else int(oValue)
+
+def to_float(oValue):
+    return None if oValue == None or oValue == "" else float(oValue)
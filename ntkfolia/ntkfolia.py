@@ -0,0 +1,377 @@
+#! /usr/bin/env python3
+# -*- coding: utf8 -*-
+# ==========================================================================================================
+# Name :    ntkfolia
+# Goal :    Export the NTK debates as FoLiA XML: one document per session, with the speaker
+#           turns, paragraphs, sentences and tokens as ntk segments them, the intensifiers
+#           as entities and the sentiment of each sentence as metrics
+#           The FoLiA text is written while the session is read, one paragraph at a time:
+#           no document tree is built, so the memory use does not grow with the session
+# History:
+# 18/oct/2026    ERK Created
+# ==========================================================================================================
+import sys, os, getopt, time, re
+from xml.sax.saxutils import escape, quoteattr
+# The NTK reader is part of the kamer project next to this one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "kamer"))
+import util, advhandle, ntk, discover
+
+# ============================= LOCAL VARIABLES ====================================
+errHandle = util.ErrHandle()
+sFoliaNs = "http://ilk.uvt.nl/folia"
+sFoliaVersion = "2.0.0"
+sTurnSet = "ntk-turns"          # Set of the division classes (speaker turns)
+sTokenSet = "ntk-tokens"        # Set of the token classes: WORD or PUNCTUATION
+sEntitySet = "ntk-intensifiers" # Set of the entity classes: the intensifier types of the lexicon
+sMetricSet = "ntk-metrics"      # Set of the metric classes: party, polarity, subjectivity
+sSuffix = ".folia.xml"          # Output file of a session: <session name>.folia.xml
+iBuffer = 1 << 16               # Bytes buffered before the output file is written to
+# A word is what ntk counts as a token; punctuation is kept as tokens of its own
+reToken = re.compile(r"(?P<w>\w+)|[^\w\s]")
+reNotId = re.compile(r"[^\w.-]")
+oWorker = {}        # Per-process objects of a worker in the --jobs pool
+
+# ----------------------------------------------------------------------------------
+# Name :    folia_id
+# Goal :    Make a valid xml:id of [sName]: a name that starts with a letter or _,
+#           with only word characters, . and -
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def folia_id(sName):
+    sId = reNotId.sub("_", sName)
+    if sId == "" or not (sId[0].isalpha() or sId[0] == "_"):
+        sId = "ntk." + sId
+    return sId
+
+# ----------------------------------------------------------------------------------
+# Name :    output_name
+# Goal :    Get the FoLiA file of input file [flThis] in input directory [flInput]: the
+#           same relative path in output directory [flOutput], with the suffix .folia.xml
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def output_name(flThis, flInput, flOutput):
+    sRel = os.path.relpath(flThis, flInput)
+    for sInput in discover.lSuffixes:
+        if sRel.endswith(sInput):
+            sRel = sRel[:-len(sInput)]
+            break
+    return os.path.join(flOutput, sRel + sSuffix)
+
+# ----------------------------------------------------------------------------------
+# Name :    FoliaWriter
+# Goal :    Write one FoLiA document to text file [f] in a single pass
+#           The header is written with the first paragraph (it holds the years of the
+#           session); each speaker turn becomes a <div>, opened and closed as the
+#           paragraphs come in
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+class FoliaWriter:
+    """Streaming writer of a FoLiA document"""
+
+    def __init__(self, f, sDocId, sSource = "", sLexicon = ""):
+        self.file = f
+        self.id = folia_id(sDocId)
+        self.source = sSource
+        self.lexicon = sLexicon
+        self.started = False
+        self.turn = None        # Number of the speaker turn whose <div> is open
+        self.div = ""           # xml:id of that <div>
+        self.paragraph = 0      # Paragraphs in that <div>
+        self.turns = 0
+        self.paragraphs = 0
+        self.sentences = 0
+        self.tokens = 0
+        self.hits = 0
+
+    def begin(self, oTurn = None):
+        """Write the header: declarations and metadata"""
+
+        lOut = ['<?xml version="1.0" encoding="utf-8"?>\n',
+                '<FoLiA xmlns="%s" xml:id=%s version="%s" generator="ntkfolia">\n' %
+                (sFoliaNs, quoteattr(self.id), sFoliaVersion),
+                ' <metadata type="native">\n',
+                '  <annotations>\n',
+                '   <text-annotation/>\n',
+                '   <division-annotation set="%s"/>\n' % sTurnSet,
+                '   <paragraph-annotation/>\n',
+                '   <sentence-annotation/>\n',
+                '   <token-annotation set="%s"/>\n' % sTokenSet,
+                '   <entity-annotation set="%s"/>\n' % sEntitySet,
+                '   <metric-annotation set="%s"/>\n' % sMetricSet,
+                '  </annotations>\n']
+        if self.source != "":
+            lOut.append('  <meta id="source">%s</meta>\n' % escape(self.source))
+        if self.lexicon != "":
+            lOut.append('  <meta id="lexicon">%s</meta>\n' % escape(self.lexicon))
+        if oTurn != None:
+            sYears = oTurn.jaar_van if oTurn.jaar_van == oTurn.jaar_tot else oTurn.jaar_van + "-" + oTurn.jaar_tot
+            lOut.append('  <meta id="years">%s</meta>\n' % escape(sYears))
+        lOut.append(' </metadata>\n <text xml:id=%s>\n' % quoteattr(self.id + ".text"))
+        self.file.write("".join(lOut))
+        self.started = True
+
+    def write_paragraph(self, iTurn, oTurn, lSentences):
+        """Write one paragraph of speaker turn [iTurn]; [lSentences] as ntk.iterParagraphs gives them"""
+
+        if not self.started:
+            self.begin(oTurn)
+        lOut = []
+        if iTurn != self.turn:
+            if self.turn != None:
+                lOut.append('  </div>\n')
+            self.turn = iTurn
+            self.turns += 1
+            self.div = self.id + ".div." + str(iTurn)
+            self.paragraph = 0
+            sSpeaker = "" if oTurn.aanspr == None else " speaker=" + quoteattr(oTurn.aanspr)
+            lOut.append('  <div xml:id=%s class="turn"%s>\n' % (quoteattr(self.div), sSpeaker))
+            if oTurn.partij != None:
+                lOut.append('   <metric class="party" value=%s/>\n' % quoteattr(oTurn.partij))
+        self.paragraph += 1
+        self.paragraphs += 1
+        sPar = self.div + ".p." + str(self.paragraph)
+        lOut.append('   <p xml:id=%s>\n' % quoteattr(sPar))
+        for iSent, (sText, wList, lHits, polar, subj, sEnd) in enumerate(lSentences, 1):
+            sSent = sPar + ".s." + str(iSent)
+            # The text with the sentence breakers that ntk split on, and single spaces only:
+            #   the tokens and their space flags must give back exactly this text
+            sText = " ".join((sText + sEnd).split())
+            lOut.append('    <s xml:id=%s>\n     <t>%s</t>\n' % (quoteattr(sSent), escape(sText)))
+            # The words are the tokens ntk found; the hits point into those
+            lWords = []
+            iTok = 0
+            iLen = len(sText)
+            for oMatch in reToken.finditer(sText):
+                iTok += 1
+                sTok = sSent + ".w." + str(iTok)
+                iEnd = oMatch.end()
+                sSpace = "" if iEnd == iLen or sText[iEnd].isspace() else ' space="no"'
+                if oMatch.lastgroup == "w":
+                    lWords.append((sTok, oMatch.group()))
+                    sClass = "WORD"
+                else:
+                    sClass = "PUNCTUATION"
+                lOut.append('     <w xml:id=%s class="%s"%s><t>%s</t></w>\n' %
+                            (quoteattr(sTok), sClass, sSpace, escape(oMatch.group())))
+            self.tokens += iTok
+            if len(lHits) > 0:
+                lOut.append('     <entities>\n')
+                for iHit, (iStart, iEnd, sForm, sType, iCol) in enumerate(lHits, 1):
+                    lOut.append('      <entity xml:id=%s class=%s>' % (quoteattr(sSent + ".entity." + str(iHit)),
+                                                                     quoteattr(sType)))
+                    for sTok, sWord in lWords[iStart:iEnd]:
+                        lOut.append('<wref id=%s t=%s/>' % (quoteattr(sTok), quoteattr(sWord)))
+                    lOut.append('</entity>\n')
+                lOut.append('     </entities>\n')
+                self.hits += len(lHits)
+            if polar != None:
+                lOut.append('     <metric class="polarity" value="%r"/>\n' % polar)
+            if subj != None:
+                lOut.append('     <metric class="subjectivity" value="%r"/>\n' % subj)
+            lOut.append('    </s>\n')
+        lOut.append('   </p>\n')
+        self.sentences += len(lSentences)
+        self.file.write("".join(lOut))
+
+    def end(self):
+        """Close the open elements: the document is complete, also after an error"""
+
+        if not self.started:
+            self.begin()
+        sEnd = '  </div>\n' if self.turn != None else ''
+        self.file.write(sEnd + ' </text>\n</FoLiA>\n')
+
+    def get_counts(self):
+        return {'turns': self.turns, 'paragraphs': self.paragraphs, 'sentences': self.sentences,
+                'tokens': self.tokens, 'hits': self.hits}
+
+# ----------------------------------------------------------------------------------
+# Name :    export_file
+# Goal :    Export session [flThis] to FoLiA file [flOut] with handler [oNtk]
+#           The file is written under a temporary name and renamed when it is complete
+#           A session that fails halfway keeps what was read, whether the reader raised
+#           or not; only when the FoLiA file itself cannot be written, nothing is left
+#           Returns (ok, counts)
+# History:
+# 18/oct/2026    ERK Created
+# 18/oct/2026    ERK One behaviour for both kinds of failing sessions
+# ----------------------------------------------------------------------------------
+def export_file(oNtk, oAdv, flThis, flOut, sLexicon = ""):
+    oCounts = {}
+    bOk = False
+    flTemp = flOut + ".tmp"
+    try:
+        sDir = os.path.dirname(flOut)
+        if sDir != "" and not os.path.isdir(sDir):
+            os.makedirs(sDir, exist_ok=True)
+        sName = os.path.basename(flOut)[:-len(sSuffix)]
+        bRead = False
+        with open(flTemp, "w", encoding="utf-8", newline="\n", buffering=iBuffer) as f:
+            oWriter = FoliaWriter(f, sName, os.path.basename(flThis), sLexicon)
+            try:
+                for iTurn, oTurn, lSentences in oNtk.iterParagraphs(flThis, oAdv):
+                    oWriter.write_paragraph(iTurn, oTurn, lSentences)
+                bRead = True
+            except:
+                # act: like the rows of a file that fails halfway, what was read is kept
+                errHandle.DoError("export_file: " + flThis)
+            oWriter.end()
+        os.replace(flTemp, flOut)
+        oCounts = oWriter.get_counts()
+        oCounts['bytes'] = os.path.getsize(flOut)
+        bOk = bRead and oNtk.ok
+    except:
+        # act
+        errHandle.DoError("export_file: " + flThis)
+        if os.path.exists(flTemp):
+            os.remove(flTemp)
+    return bOk, oCounts
+
+# ----------------------------------------------------------------------------------
+# Name :    worker_init, worker_export
+# Goal :    The worker processes of a parallel export: each loads the lexicon and makes
+#           its handler once, and exports whole sessions
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def worker_init(flAdverb, sSentiment, sXml):
+    oAdv = advhandle.AdvHandle(errHandle)
+    oAdv.Load(flAdverb)
+    oWorker['adv'] = oAdv
+    oWorker['ntk'] = ntk.ntk(errHandle, "full", "all", sSentiment, sXml)
+    oWorker['lexicon'] = os.path.basename(flAdverb)
+
+def worker_export(tJob):
+    flThis, flOut = tJob
+    bOk, oCounts = export_file(oWorker['ntk'], oWorker['adv'], flThis, flOut, oWorker['lexicon'])
+    return flThis, bOk, oCounts
+
+# ----------------------------------------------------------------------------------
+# Name :    export_files
+# Goal :    Export the sessions [lJobs] (input file, FoLiA file), serially or with a pool
+#           of [iJobs] worker processes; yields (input file, ok, counts) as they are ready
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def export_files(lJobs, flAdverb, sSentiment = "pattern", sXml = "auto", iJobs = 1):
+    if iJobs > 1:
+        # Only imported here: a serial export does not need it
+        import multiprocessing
+        oPool = multiprocessing.Pool(iJobs, worker_init, (flAdverb, sSentiment, sXml))
+        try:
+            # Every session is a document of its own: the order of the results does not matter
+            for oResult in oPool.imap_unordered(worker_export, lJobs):
+                yield oResult
+        finally:
+            oPool.close()
+            oPool.join()
+    else:
+        worker_init(flAdverb, sSentiment, sXml)
+        for tJob in lJobs:
+            yield worker_export(tJob)
+
+# ----------------------------------------------------------------------------------
+# Name :    main
+# Goal :    Main body of the function
+# History:
+# 18/oct/2026    ERK Created
+# ----------------------------------------------------------------------------------
+def main(prgName, argv) :
+  flInput = ''        # input directory name
+  flOutput = ''       # output directory: one FoLiA file per session
+  flAdverb = ''       # intensifier adverb JSON file
+  iJobs = 1           # Number of worker processes
+  sSentiment = 'pattern'  # Sentiment backend: "off", "pattern" or a plugin module name
+  sXml = 'auto'       # XML parser backend: "auto" (etree), "etree" or "lxml"
+  bRecursive = False  # Also look for input files in the subdirectories of the input directory
+  lInclude = []       # Only take input files that match one of these globs
+  lExclude = []       # Skip input files and directories that match one of these globs
+
+  try:
+    sSyntax = prgName + ' [-j <jobs>] [-e <sentiment: off|pattern|plugin>] [-x <xml: auto|etree|lxml>] [-R] [--include <glob>] [--exclude <glob>] -a <adverb file> -i <input directory> -o <output directory>'
+    try:
+      opts, args = getopt.getopt(argv, "hj:e:x:Ra:i:o:", ["jobs=","sentiment=","xml=","recursive","include=","exclude=","adverbs=","inputdir=","outputdir="])
+    except getopt.GetoptError:
+      print(sSyntax)
+      sys.exit(2)
+    for opt, arg in opts:
+      if opt == '-h':
+        print(sSyntax)
+        sys.exit(0)
+      elif opt in ("-j", "--jobs"):
+        iJobs = int(arg)
+      elif opt in ("-e", "--sentiment"):
+        sSentiment = arg
+      elif opt in ("-x", "--xml"):
+        sXml = arg
+      elif opt in ("-R", "--recursive"):
+        bRecursive = True
+      elif opt == "--include":
+        lInclude.append(arg)
+      elif opt == "--exclude":
+        lExclude.append(arg)
+      elif opt in ("-a", "--adverbs"):
+        flAdverb = arg
+      elif opt in ("-i", "--ifile", "--inputdir"):
+        flInput = arg
+      elif opt in ("-o", "--ofile", "--outputdir"):
+        flOutput = arg
+    if flInput == '' or flOutput == '' or flAdverb == '':
+      errHandle.Status(sSyntax)
+      return False
+    if not os.path.isdir(flInput):
+      errHandle.Status("Please specify an input DIRECTORY")
+      return False
+    if os.path.isfile(flOutput):
+      errHandle.Status("Please specify an output DIRECTORY")
+      return False
+    sMsg = ntk.check_xml(sXml)
+    if sMsg != "":
+      errHandle.Status(sMsg)
+      return False
+    if not ntk.SentiAna(errHandle, sSentiment).check_backend():
+      errHandle.Status("Cannot find sentiment backend: " + sSentiment)
+      return False
+    errHandle.Status('Input is "' + flInput + '"' + (' (recursive)' if bRecursive else ''))
+    errHandle.Status('Output is "' + flOutput + '"')
+    errHandle.Status('Adverb definition file is "' + flAdverb + '"')
+    errHandle.Status('Number of jobs is ' + str(iJobs))
+    errHandle.Status('Sentiment is "' + sSentiment + '"')
+    fStart = time.perf_counter()
+    lFound, bManifest = discover.find_files(flInput, bRecursive, lInclude, lExclude)
+    # The big sessions go first, so that no worker is left with one at the end
+    lJobs = [(flThis, output_name(flThis, flInput, flOutput)) for flThis, iSize in discover.largest_first(lFound)]
+    oTotal = {'turns': 0, 'paragraphs': 0, 'sentences': 0, 'tokens': 0, 'hits': 0, 'bytes': 0}
+    iFailed = 0
+    for flThis, bOk, oCounts in export_files(lJobs, flAdverb, sSentiment, sXml, iJobs):
+      if bOk:
+        errHandle.Status("Exported file: " + flThis)
+      else:
+        errHandle.Status("Could not export file: " + flThis)
+        iFailed += 1
+      for sKey, iCount in oCounts.items():
+        oTotal[sKey] += iCount
+    fSeconds = time.perf_counter() - fStart
+    errHandle.Status("FoLiA: %d sessions (%d failed), %d turns, %d paragraphs, %d sentences, %d tokens, %d intensifiers" %
+                     (len(lJobs), iFailed, oTotal['turns'], oTotal['paragraphs'], oTotal['sentences'],
+                      oTotal['tokens'], oTotal['hits']))
+    errHandle.Status("Time: %.2f seconds, %.0f tokens/s, %.1f MB/s of FoLiA" %
+                     (fSeconds, oTotal['tokens'] / max(fSeconds, 1e-9), oTotal['bytes'] / (1024 * 1024) / max(fSeconds, 1e-9)))
+    errHandle.Status("Ready")
+    return iFailed == 0
+  except SystemExit:
+    raise
+  except:
+    # act
+    errHandle.DoError("main")
+    return False
+
+# ----------------------------------------------------------------------------------
+# Goal :  If user calls this as main, then follow up on it
+# ----------------------------------------------------------------------------------
+if __name__ == "__main__":
+  # Call the main function with two arguments: program name + remainder
+  sys.exit(0 if main(sys.argv[0], sys.argv[1:]) else 1)